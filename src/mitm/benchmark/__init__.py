@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Init package
+"""
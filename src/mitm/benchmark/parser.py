@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Micro-benchmark of the decoder of the parser. It compares the previous decoding, which slices the rest of the data on
+every read, with the compiled decoders of the protocol which read with a cursor over a memoryview. The time of the
+whole parser, handlers included, is shown too, with and without the decoding of the runs of positions in batches.
+
+Run it from the mitm directory:
+    python3 -m benchmark.parser
+    python3 -m benchmark.parser --server server.hex --client client.hex
+    python3 -m benchmark.parser --check
+
+With --check nothing is measured: each chunk, and a stream of actions whose optional status ends the reads, is split at
+every offset and parsed in two reads through a reassembler. The messages must be the same as the parse of the whole
+chunk, otherwise the exit code is 1.
+
+The files have one chunk per line in hexadecimal.
+"""
+from argparse import ArgumentParser, Namespace
+from functools import partial
+from struct import calcsize, pack, unpack
+from sys import exit
+from timeit import Timer
+from typing import Callable
+
+from core.framing import Incomplete, Reassembler
+from core.batch import numpy
+from core.parser import CLIENT, CLIENT_RESYNC, Parse, SERVER, SERVER_RESYNC, USHORT
+from core.protocol import PROTOCOL
+from core.queue import Queue
+from core.schema import Fixed, Message, OptionalBool, String
+
+
+def legacy_decode(message: Message, data: bytes) -> tuple:
+    """
+    Decode a message like the previous parser: every read slices the rest of the data.
+
+    :type message: Message
+    :param message: The declaration of the message.
+
+    :type data: bytes
+    :param data: Raw data after the packet ID.
+
+    :rtype: tuple
+    :return: The values and the rest of the data.
+    """
+    values = []
+    for field in message.fields:
+        if isinstance(field, Fixed):
+            size = calcsize(f'<{field.fmt}')
+            if len(data) < size:
+                raise Incomplete()
+            values += unpack(f'<{field.fmt}', data[:size])
+            data = data[size:]
+        elif isinstance(field, OptionalBool):
+            value = None
+            if len(data) > 0 and data[0] < 2:
+                value, = unpack('<?', data[:1])
+                data = data[1:]
+            values.append(value)
+        else:
+            size = 2 if isinstance(field, String) else 1
+            length, = unpack('<H' if size == 2 else '<B', data[:size])
+            data = data[size:]
+            if len(data) < length:
+                raise Incomplete()
+            value = data[:length]
+            data = data[length:]
+            values.append(str(value, 'UTF-8') if isinstance(field, String) else value)
+    return tuple(values), data
+
+
+def decode_legacy(chunks: list, messages: dict) -> None:
+    """
+    Decode all the messages of the chunks slicing the data.
+
+    :type chunks: list
+    :param chunks: The raw data.
+
+    :type messages: dict
+    :param messages: The messages of the direction by opcode.
+
+    :rtype: None
+    """
+    for chunk in chunks:
+        data = chunk
+        while len(data) > 1:
+            packet_id, = unpack('<H', data[:2])
+            if packet_id not in messages:
+                data = data[1:]
+                continue
+            try:
+                _, data = legacy_decode(messages[packet_id], data[2:])
+            except Incomplete:
+                break
+
+
+def decode_compiled(chunks: list, messages: dict) -> None:
+    """
+    Decode all the messages of the chunks with the compiled decoders and a cursor.
+
+    :type chunks: list
+    :param chunks: The raw data.
+
+    :type messages: dict
+    :param messages: The messages of the direction by opcode.
+
+    :rtype: None
+    """
+    decoders = {opcode: message.decode for opcode, message in messages.items()}
+    for chunk in chunks:
+        data = memoryview(chunk)
+        size = len(data)
+        offset = 0
+        while offset < size - 1:
+            packet_id, = USHORT.unpack_from(data, offset)
+            if packet_id not in decoders:
+                offset += 1
+                continue
+            try:
+                _, offset = decoders[packet_id](data, offset + 2, size)
+            except Incomplete:
+                break
+
+
+def _position() -> bytes:
+    """
+    Build the position and the view of a character.
+
+    :rtype: bytes
+    :return: Raw data.
+    """
+    return pack('<fff', -39602.8, -18288.0, 2300.4) + bytes.fromhex('0a0b0c0d') + pack('<hbb', 1200, 3, -7)
+
+
+def server_chunk(count: int) -> bytes:
+    """
+    Build a chunk of the server, most of the messages are positions of the characters like in the game.
+
+    :type count: int
+    :param count: Number of messages.
+
+    :rtype: bytes
+    :return: Raw data.
+    """
+    chunk = bytearray()
+    for i in range(count):
+        kind = i % 10
+        if kind < 7:
+            chunk += pack('<HI', 29552, 100 + i) + _position() + pack('<I', 0)
+        elif kind == 7:
+            chunk += pack('<HIi', 11051, 100 + i, 80)
+        elif kind == 8:
+            chunk += pack('<HIH', 29811, 100 + i, 6) + b'Attack' + b'\x01'
+        else:
+            name = b'GiantRat'
+            chunk += pack('<HIIbH', 27501, 100 + i, 0, 1, len(name)) + name + _position()[:16] + b'\x00\x00' + \
+                pack('<I', 2)
+    return bytes(chunk)
+
+
+def client_chunk(count: int) -> bytes:
+    """
+    Build a chunk of the client, most of the messages are positions of my character.
+
+    :type count: int
+    :param count: Number of messages.
+
+    :rtype: bytes
+    :return: Raw data.
+    """
+    chunk = bytearray()
+    for i in range(count):
+        if i % 5:
+            chunk += pack('<H', 30317) + _position()
+        else:
+            chunk += pack('<H', 29286) + b'\x01'
+    return bytes(chunk)
+
+
+def action_chunk() -> bytes:
+    """
+    Build a chunk of actions of the characters with and without the optional status, between other messages.
+
+    :rtype: bytes
+    :return: Raw data.
+    """
+    action = PROTOCOL.server[29811]
+    health = PROTOCOL.server[11051]
+    return action.encode(1, 'Attack', True) + action.encode(2, 'Run', None) + health.encode(2, 80) + \
+        action.encode(3, 'Idle', False) + action.encode(4, 'Attack', True)
+
+
+def _read(path: str) -> list:
+    """
+    Read the recorded chunks.
+
+    :type path: str
+    :param path: File with one chunk per line in hexadecimal.
+
+    :rtype: list
+    :return: The chunks.
+    """
+    with open(path) as file:
+        return [bytes.fromhex(line.strip()) for line in file if line.strip()]
+
+
+def measure(function: Callable, number: int) -> float:
+    """
+    Measure the time of a function.
+
+    :type function: Callable
+    :param function: The function without arguments.
+
+    :type number: int
+    :param number: Repetitions of the measure.
+
+    :rtype: float
+    :return: The best time in seconds of one execution.
+    """
+    return min(Timer(function).repeat(repeat=5, number=number)) / number
+
+
+def parse(chunks: list, is_server: bool, batches: bool = True) -> None:
+    """
+    Parse all the chunks with the parser, including the handlers.
+
+    :type chunks: list
+    :param chunks: The raw data.
+
+    :type is_server: bool
+    :param is_server: True for the data of the server.
+
+    :type batches: bool
+    :param batches: Decode the runs of positions in batches.
+
+    :rtype: None
+    """
+    for chunk in chunks:
+        if batches and is_server:
+            Parse(chunk).server(3000)
+        elif batches:
+            Parse(chunk).client(3000)
+        elif is_server:
+            Parse(chunk)._parse(SERVER, SERVER_RESYNC, {})
+        else:
+            Parse(chunk)._parse(CLIENT, CLIENT_RESYNC, {})
+    Queue.clear()
+
+
+def split_parse(data: bytes, is_server: bool, split: int) -> list:
+    """
+    Parse the data in two reads through a reassembler, like a message split by TCP. The parse is detached, so the
+    handlers are not run.
+
+    :type data: bytes
+    :param data: Raw data.
+
+    :type is_server: bool
+    :param is_server: True for the data of the server.
+
+    :type split: int
+    :param split: Size of the first read.
+
+    :rtype: list
+    :return: The ID and the size of each complete message.
+    """
+    reassembler = Reassembler()
+    messages = []
+    for part in (data[:split], data[split:]):
+        parse = Parse(reassembler.feed(part))
+        parse.detached = True
+        if is_server:
+            parse.server(3000)
+        else:
+            parse.client(3000)
+        messages += parse.messages
+        consumed = parse.consumed
+        del parse
+        reassembler.consume(consumed)
+    return messages
+
+
+def check(chunks: list, is_server: bool) -> list:
+    """
+    Compare the parse of each chunk split at every offset with the parse of the whole chunk.
+
+    :type chunks: list
+    :param chunks: The raw data.
+
+    :type is_server: bool
+    :param is_server: True for the data of the server.
+
+    :rtype: list
+    :return: The description of each split whose messages are different.
+    """
+    errors = []
+    for chunk in dict.fromkeys(chunks):
+        whole = split_parse(chunk, is_server, len(chunk))
+        for split in range(1, len(chunk)):
+            messages = split_parse(chunk, is_server, split)
+            if messages != whole:
+                index = next((idx for idx, pair in enumerate(zip(whole, messages)) if pair[0] != pair[1]),
+                             min(len(whole), len(messages)))
+                errors.append(f'split at {split} of {len(chunk)} bytes: message {index} is '
+                              f'{whole[index:index + 1]} in the whole parse and {messages[index:index + 2]} in two '
+                              f'reads')
+    return errors
+
+
+def get_arguments() -> Namespace:
+    """
+    Read the arguments of the command line.
+
+    :rtype: Namespace
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description='Compare the previous decoder with the compiled decoders.')
+    parser.add_argument('--server', help='File with the recorded chunks of the server.')
+    parser.add_argument('--client', help='File with the recorded chunks of the client.')
+    parser.add_argument('--messages', type=int, default=150, help='Messages for each synthetic chunk.')
+    parser.add_argument('--number', type=int, default=20, help='Repetitions of each measure.')
+    parser.add_argument('--check', action='store_true',
+                        help='Check the parse of the chunks split at every offset instead of measuring.')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the results.
+
+    :rtype: None
+    """
+    arguments = get_arguments()
+    server = _read(arguments.server) if arguments.server else [server_chunk(arguments.messages)] * 20
+    client = _read(arguments.client) if arguments.client else [client_chunk(arguments.messages)] * 20
+
+    if arguments.check:
+        errors = 0
+        for name, chunks, is_server in (('server', [*server, action_chunk()], True), ('client', client, False)):
+            for error in check(chunks, is_server):
+                print(f'ERROR: {name}: {error}')
+                errors += 1
+        print(f'Check: {errors} errors')
+        exit(1 if errors else 0)
+
+    for name, chunks, is_server in (('server', server, True), ('client', client, False)):
+        messages = PROTOCOL.server if is_server else PROTOCOL.client
+        size = sum(len(chunk) for chunk in chunks)
+        legacy = measure(partial(decode_legacy, chunks, messages), arguments.number)
+        compiled = measure(partial(decode_compiled, chunks, messages), arguments.number)
+        single = measure(partial(parse, chunks, is_server, False), arguments.number)
+        full = measure(partial(parse, chunks, is_server), arguments.number)
+        print(f'| {name:>6} | {len(chunks):>5} chunks | {size:>8} bytes | '
+              f'Slice {legacy * 1e6 / len(chunks):>8.1f} us/chunk | '
+              f'Compiled {compiled * 1e6 / len(chunks):>8.1f} us/chunk | x{legacy / compiled:.2f} | '
+              f'Parse {single * 1e6 / len(chunks):>8.1f} us/chunk | '
+              f'Batches {full * 1e6 / len(chunks):>8.1f} us/chunk | x{single / full:.2f} |')
+    print(f'Batches decoded with {"NumPy" if numpy is not None else "Struct.iter_unpack, NumPy is not installed"}')
+
+
+if __name__ == '__main__':
+    main()
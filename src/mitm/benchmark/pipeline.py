@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Benchmark of the path of each read in the proxy: injection, queue, parse and logging. The synthetic traffic of
+benchmark.traffic is fed to a client and a server Package, without sockets and without the game.
+
+Run it from the mitm directory:
+    python3 -m benchmark.pipeline
+    python3 -m benchmark.pipeline --save baseline.json
+    python3 -m benchmark.pipeline --compare baseline.json --tolerance 0.25
+    python3 -m benchmark.pipeline --rules 100
+    python3 -m benchmark.pipeline --workers 4
+
+The logging stage sends the read in hexadecimal to the writer of core.log, like a verbose debug.log. The console
+output of the parser is discarded during the measure. With --compare the exit code is 1 if the p50 of a stage is slower
+than the baseline plus the tolerance. With --workers the parse stage is only the copy to the shared memory of the
+workers.
+"""
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from json import dump, load
+from logging import debug
+from os import devnull, path
+from sys import exit
+from tempfile import TemporaryDirectory
+from time import perf_counter_ns, sleep
+
+from benchmark.traffic import Traffic
+from core.log import LOG
+from core.package import Package
+from core.queue import Queue
+from core.rules import RULES, Rule
+from core.workers import Workers
+
+STAGES = ('inject', 'queue', 'parse', 'log', 'total')
+
+
+def percentile(values: list, ratio: float) -> float:
+    """
+    Get the percentile of the sorted values.
+
+    :type values: list
+    :param values: Sorted values.
+
+    :type ratio: float
+    :param ratio: Percentile between 0 and 1.
+
+    :rtype: float
+    :return: The value of the percentile.
+    """
+    return values[min(int(ratio * len(values)), len(values) - 1)]
+
+
+def run(chunks: list) -> tuple:
+    """
+    Feed the chunks to the packages and measure each stage.
+
+    :type chunks: list
+    :param chunks: Tuples with True for the data of the server and the raw data.
+
+    :rtype: tuple
+    :return: The times in nanoseconds of each stage and the total of bytes.
+    """
+    packages = {True: Package(True, None, None, 3000), False: Package(False, None, None, 3000)}
+    times = {stage: [] for stage in STAGES}
+    size = 0
+
+    for is_server, data in chunks:
+        package = packages[is_server]
+        start = perf_counter_ns()
+        data = package.inject_data(data)
+        injected = perf_counter_ns()
+        package.drain_queue()
+        drained = perf_counter_ns()
+        package.submit(data)
+        parsed = perf_counter_ns()
+        debug(f'{package.source_name}[{package.port}]: {data.hex()}')
+        logged = perf_counter_ns()
+
+        times['inject'].append(injected - start)
+        times['queue'].append(drained - injected)
+        times['parse'].append(parsed - drained)
+        times['log'].append(logged - parsed)
+        times['total'].append(logged - start)
+        size += len(data)
+
+    for package in packages.values():
+        package.release()
+    Queue.clear()
+    return times, size
+
+
+def summarize(times: dict, size: int) -> dict:
+    """
+    Calculate the percentiles of each stage and the throughput.
+
+    :type times: dict
+    :param times: The times in nanoseconds of each stage.
+
+    :type size: int
+    :param size: Total of bytes.
+
+    :rtype: dict
+    :return: The results.
+    """
+    results = {}
+    for stage, values in times.items():
+        values = sorted(values)
+        results[stage] = {
+            'p50': percentile(values, 0.50) / 1000,
+            'p99': percentile(values, 0.99) / 1000,
+            'mean': sum(values) / len(values) / 1000,
+            'total': sum(values) / 1e6,
+        }
+    seconds = sum(times['total']) / 1e9
+    results['throughput'] = {'chunks': len(times['total']) / seconds, 'megabytes': size / seconds / 1e6}
+    return results
+
+
+def get_arguments() -> Namespace:
+    """
+    Read the arguments of the command line.
+
+    :rtype: Namespace
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description='Measure the cost of each stage for each read of the proxy.')
+    parser.add_argument('--chunks', type=int, default=2000, help='Chunks of each direction.')
+    parser.add_argument('--size', type=int, default=4096, help='Maximum size of each chunk.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic traffic.')
+    parser.add_argument('--rules', type=int, default=0,
+                        help='Number of injection rules of packets which are not in the traffic, they must not '
+                             'change the time of the inject stage.')
+    parser.add_argument('--workers', type=int, default=0, help='Parse in worker processes, see core.workers.')
+    parser.add_argument('--save', metavar='FILE', help='Save the results as JSON.')
+    parser.add_argument('--compare', metavar='FILE', help='Compare the p50 of each stage with saved results.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown ratio for --compare.')
+    return parser.parse_args()
+
+
+def main() -> int:
+    """
+    Run the benchmark and print the results.
+
+    :rtype: int
+    :return: The exit code.
+    """
+    arguments = get_arguments()
+    for opcode in range(arguments.rules):
+        RULES.add(Rule('server' if opcode % 2 else 'client', 65535 - opcode, 'drop'))
+    traffic = Traffic(arguments.seed)
+    server = traffic.chunks(True, arguments.chunks, arguments.size)
+    client = traffic.chunks(False, arguments.chunks, arguments.size)
+    chunks = [chunk for pair in zip(((True, data) for data in server), ((False, data) for data in client))
+              for chunk in pair]
+
+    if arguments.workers > 0:
+        Package.workers = Workers(arguments.workers)
+        Package.workers.start()
+
+    with TemporaryDirectory() as directory:
+        LOG.start(path.join(directory, 'debug.log'))
+        with open(devnull, 'w') as null, redirect_stdout(null):
+            times, size = run(chunks)
+            start = perf_counter_ns()
+            while Package.workers is not None and Package.workers.depth:
+                sleep(0.001)
+            waited = perf_counter_ns() - start
+        LOG.stop()
+    results = summarize(times, size)
+    if Package.workers is not None:
+        Package.workers.terminate()
+        print(f'Workers: {arguments.workers} | Processed {Package.workers.processed} | '
+              f'Dropped {Package.workers.dropped} | Drained {waited / 1e6:.1f} ms after the last chunk')
+
+    print(f'| {"stage":>6} | {"p50 us":>9} | {"p99 us":>9} | {"mean us":>9} | {"total ms":>9} |')
+    for stage in STAGES:
+        result = results[stage]
+        print(f'| {stage:>6} | {result["p50"]:>9.1f} | {result["p99"]:>9.1f} | {result["mean"]:>9.1f} | '
+              f'{result["total"]:>9.1f} |')
+    print(f'Throughput: {results["throughput"]["chunks"]:,.0f} chunks/s | '
+          f'{results["throughput"]["megabytes"]:,.2f} MB/s | {len(chunks)} chunks | {size} bytes')
+
+    if arguments.save:
+        with open(arguments.save, 'w') as file:
+            dump(results, file, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = load(file)
+        failed = False
+        for stage in STAGES:
+            limit = baseline[stage]['p50'] * (1 + arguments.tolerance)
+            if results[stage]['p50'] > limit:
+                failed = True
+                print(f'REGRESSION: {stage} p50 {results[stage]["p50"]:.1f} us > {limit:.1f} us')
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Benchmark of the spatial index of the world. The entities are spread in the map like the synthetic traffic, then the
+updates, the radius and the nearest queries are measured and checked against a linear scan.
+
+Run it from the mitm directory:
+    python3 -m benchmark.spatial
+    python3 -m benchmark.spatial --entities 50000 --cell 500
+"""
+from argparse import ArgumentParser, Namespace
+from math import dist
+from random import Random
+from time import perf_counter_ns
+
+from core.spatial import Grid
+
+
+def measure(name: str, function, arguments: list) -> list:
+    """
+    Call the function with each argument and print the time of each call.
+
+    :type name: str
+    :param name: Name of the operation.
+
+    :type function: Callable
+    :param function: The operation.
+
+    :type arguments: list
+    :param arguments: Tuples with the arguments of each call.
+
+    :rtype: list
+    :return: The results.
+    """
+    results = []
+    start = perf_counter_ns()
+    for argument in arguments:
+        results.append(function(*argument))
+    elapsed = perf_counter_ns() - start
+    print(f'| {name:>12} | {len(arguments):>7} calls | {elapsed / len(arguments) / 1000:>9.2f} us/call |')
+    return results
+
+
+def get_arguments() -> Namespace:
+    """
+    Read the arguments of the command line.
+
+    :rtype: Namespace
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description='Measure the spatial index of the entities.')
+    parser.add_argument('--entities', type=int, default=10000, help='Number of entities.')
+    parser.add_argument('--queries', type=int, default=2000, help='Number of queries of each type.')
+    parser.add_argument('--cell', type=float, default=1000.0, help='Size of the cells of the grid.')
+    parser.add_argument('--size', type=float, default=50000.0, help='The map goes from -SIZE to SIZE.')
+    parser.add_argument('--radius', type=float, default=2000.0, help='Radius of the radius queries.')
+    parser.add_argument('--k', type=int, default=5, help='Number of entities of the nearest queries.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random positions.')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the results.
+
+    :rtype: None
+    """
+    arguments = get_arguments()
+    random = Random(arguments.seed)
+    size = arguments.size
+
+    def point() -> tuple:
+        return random.uniform(-size, size), random.uniform(-size, size), random.uniform(-size / 10, size / 10)
+
+    grid = Grid(arguments.cell)
+    spawns = [(idx, *point()) for idx in range(arguments.entities)]
+    measure('spawn', grid.update, spawns)
+    # The characters move a little between two position packages.
+    moves = []
+    for _ in range(arguments.queries * 5):
+        idx, x, y, z = spawns[random.randrange(arguments.entities)]
+        moves.append((idx, x + random.uniform(-300, 300), y + random.uniform(-300, 300), z))
+    measure('move', grid.update, moves)
+
+    centers = [point() for _ in range(arguments.queries)]
+    radius = measure('radius', grid.radius, [(*center, arguments.radius) for center in centers])
+    nearest = measure('nearest', grid.nearest, [(*center, arguments.k) for center in centers])
+    measure('nearest 1', grid.nearest, [(*center, 1) for center in centers])
+
+    points = [(idx, values[:3]) for idx, values in grid.points.items()]
+    brute = centers[:min(len(centers), 100)]
+    for center, found_radius, found_nearest in zip(brute, radius, nearest):
+        distances = sorted((dist(center, position), idx) for idx, position in points)
+        expected = [idx for distance, idx in distances if distance <= arguments.radius]
+        assert sorted(idx for _, idx in found_radius) == sorted(expected), 'radius query differs from a linear scan'
+        assert [round(distance, 6) for distance, _ in found_nearest] == \
+               [round(distance, 6) for distance, _ in distances[:arguments.k]], \
+               'nearest query differs from a linear scan'
+    print(f'Checked {len(brute)} queries against a linear scan of {len(points)} entities | '
+          f'Cells {len(grid.cells)} | Mean radius results {sum(map(len, radius)) / len(radius):.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Synthetic traffic of the game. The messages are encoded with the declarations of core.protocol and mixed with weights
+similar to a real session, where the positions of the characters are most of the traffic.
+"""
+from random import Random
+from re import findall
+from typing import Iterator
+
+from core.protocol import PROTOCOL
+from core.schema import Blob, Fixed, Message, String
+
+SERVER_MIX = {
+    29552: 60,  # 0x7073 character position
+    30317: 6,  # 0x6d76 my position
+    11051: 8,  # 0x2b2b health
+    29811: 6,  # 0x7374 character action
+    27501: 5,  # 0x6d6b init
+    28784: 4,  # 0x7070 constant information
+    788: 3,  # 0x1403 constant information
+    24940: 2,  # 0x6c61 gun shoot
+    24941: 2,  # 0x6d61 magic shoot
+    29300: 1,  # 0x7472 character events
+    28771: 1,  # 0x6370 item recollection
+    30840: 1,  # 0x7878 monsters list
+    27762: 1,  # 0x726C weapon reload
+}
+
+CLIENT_MIX = {
+    30317: 75,  # 0x6D76 position
+    29286: 8,  # 0x6672 shooting
+    28778: 5,  # 0x6A70 jump
+    26922: 5,  # 0x2A69 shoot
+    789: 4,  # 0x1503 constant information
+    15731: 1,  # 0x733D weapon slot
+    25957: 1,  # 0x6565 item
+    15729: 1,  # 0x713D quest selected
+}
+
+NAMES = ('GiantRat', 'Bear', 'AngryBear', 'MagmaSpider', 'CowKing', 'GreatBallsOfFire', 'ZeroCool', 'Pistol',
+         'PistolAmmo', 'Attack', 'Idle', 'Death', 'Rat', 'Unbearable Woods')
+
+
+class Traffic:
+    """
+    Generator of the chunks of the client and of the server.
+    """
+
+    def __init__(self, seed: int = 0, drops: float = 0.05) -> None:
+        """
+        Constructor which init the class.
+
+        :type seed: int
+        :param seed: Seed of the random values, the same seed builds the same traffic.
+
+        :type drops: float
+        :param drops: Ratio of the init messages which are drops, they are picked up by the auto loot.
+
+        :rtype: Traffic
+        :return: The object instanced of this class.
+        """
+        self.random = Random(seed)
+        self.drops = drops
+        self.entities = 200
+
+    def _value(self, code: str, count: int) -> list:
+        """
+        Build random values of one code of a struct format.
+
+        :type code: str
+        :param code: The code of the struct format.
+
+        :type count: int
+        :param count: The repetitions of the code.
+
+        :rtype: list
+        :return: The values.
+        """
+        random = self.random
+        if code == 's':
+            return [bytes(random.getrandbits(8) for _ in range(count))]
+        if code == 'f':
+            return [random.uniform(-50000.0, 50000.0) for _ in range(count)]
+        if code == '?':
+            return [random.random() < 0.5 for _ in range(count)]
+        if code in 'bh':
+            return [random.randint(-100, 100) for _ in range(count)]
+        if code in 'i':
+            return [random.randint(-1000, 1000) for _ in range(count)]
+        return [random.randint(1, self.entities) for _ in range(count)]
+
+    def message(self, message: Message) -> bytes:
+        """
+        Build a message with random values.
+
+        :type message: Message
+        :param message: The declaration of the message.
+
+        :rtype: bytes
+        :return: Raw data.
+        """
+        values = []
+        for field in message.fields:
+            if isinstance(field, Fixed):
+                for count, code in findall(r'(\d*)([a-zA-Z?])', field.fmt):
+                    values += self._value(code, int(count or 1))
+            elif isinstance(field, String):
+                name = self.random.choice(NAMES)
+                if message.name == 'server_init' and self.random.random() < self.drops:
+                    name = f'Drop{name}'
+                values.append(name)
+            elif isinstance(field, Blob):
+                values.append(bytes(self.random.getrandbits(8) for _ in range(self.random.randint(0, 16))))
+            else:
+                values.append(self.random.choice((True, False, None)))
+        return message.encode(*values)
+
+    def stream(self, is_server: bool, size: int) -> bytes:
+        """
+        Build a stream of messages.
+
+        :type is_server: bool
+        :param is_server: True for the messages of the server.
+
+        :type size: int
+        :param size: Minimum size of the stream.
+
+        :rtype: bytes
+        :return: Raw data.
+        """
+        messages = PROTOCOL.server if is_server else PROTOCOL.client
+        mix = SERVER_MIX if is_server else CLIENT_MIX
+        opcodes = list(mix)
+        weights = list(mix.values())
+        data = bytearray()
+        while len(data) < size:
+            for opcode in self.random.choices(opcodes, weights, k=64):
+                data += self.message(messages[opcode])
+        return bytes(data)
+
+    def chunks(self, is_server: bool, count: int, size: int = 4096, random_size: bool = True) -> Iterator[bytes]:
+        """
+        Build the chunks of the reads of a socket.
+
+        :type is_server: bool
+        :param is_server: True for the messages of the server.
+
+        :type count: int
+        :param count: Number of chunks.
+
+        :type size: int
+        :param size: Maximum size of each chunk, like the buffer of recv.
+
+        :type random_size: bool
+        :param random_size: Cut the chunks at random sizes instead of the maximum size. In both cases the messages
+                            are split between reads like in TCP.
+
+        :rtype: Iterator[bytes]
+        :return: The chunks.
+        """
+        data = self.stream(is_server, count * size)
+        offset = 0
+        for _ in range(count):
+            length = self.random.randint(size // 4, size) if random_size else size
+            yield data[offset:offset + length]
+            offset += length
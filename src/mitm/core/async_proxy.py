@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Create a Proxy based on asyncio. All the ports are served by one event loop running in a single thread, instead of one
+thread for each port and direction. The packages are handled by the same inject, parse and queue hooks of the threaded
+proxy. The injected packages are written by the event loop as soon as they are queued. The connection to the server
+is taken from the pool of the upstream when it is warm, asyncio sets TCP_NODELAY in all its connections.
+
+The sessions are identified by the port and the address of the client, a session is forgotten when its pipes finish.
+"""
+from asyncio import (CancelledError, StreamReader, StreamWriter, all_tasks, current_task, gather, new_event_loop,
+                     open_connection, start_server, wait)
+from functools import partial
+from threading import Thread
+from time import perf_counter_ns
+from typing import Optional
+
+from core.lifecycle import JOIN_TIMEOUT
+from core.metrics import METRICS
+from core.package import Package
+from core.queue import Queue, session_key
+from core.topology import Route, Topology
+from core.upstream import Upstream
+from core.world import WORLDS
+
+
+class AsyncProxy(Thread):
+    """
+    Start the communication between both, the client and server, for all the ports in one event loop.
+    """
+
+    def __init__(self, topology: Topology, upstream: Optional[Upstream] = None) -> None:
+        """
+        Constructor which init the class.
+
+        :type topology: Topology
+        :param topology: The ports and the addresses of each one.
+
+        :type upstream: Upstream
+        :param upstream: The pool of connections to the servers, without pool by default.
+
+        :rtype: AsyncProxy
+        :return: The object instanced of this class.
+        """
+        super(AsyncProxy, self).__init__()
+        self.name = 'Async Proxy'
+        self.daemon = True
+        self.topology = topology
+        self.upstream = upstream if upstream is not None else Upstream(topology)
+        self.sessions = {}
+        self.loop = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if there is at least one connection established.
+
+        :rtype: bool
+        :return: True if some port has a session.
+        """
+        return len(self.sessions) > 0
+
+    def run(self) -> None:
+        """
+        Start the event loop which serves all the ports.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        self.loop = new_event_loop()
+        self._task = self.loop.create_task(self._serve())
+        try:
+            self.loop.run_until_complete(self._task)
+        except CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    def terminate(self) -> None:
+        """
+        Stop listening and close the established connections, the thread ends when their pipes are finished.
+
+        :rtype: None
+        """
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._task.cancel)
+
+    async def _serve(self) -> None:
+        """
+        Listen in all the ports.
+
+        :rtype: None
+        """
+        servers = []
+        for route in self.topology:
+            try:
+                server = await start_server(partial(self._connect, route), route.listen, route.port,
+                                            reuse_address=True)
+            except OSError as e:
+                print(f'ERROR: Async Proxy [{route.port}]: {e}')
+                continue
+            servers.append(server)
+        print(f'Async Proxy: Listening {len(servers)} ports')
+        try:
+            await gather(*(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            for session in list(self.sessions.values()):
+                self._terminate(session)
+            pipes = [task for task in all_tasks() if task is not current_task()]
+            if pipes:
+                await wait(pipes, timeout=JOIN_TIMEOUT)
+
+    async def _connect(self, route: Route, client_reader: StreamReader, client_writer: StreamWriter) -> None:
+        """
+        Connect a new client with the server and pipe the data in both directions.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :type client_reader: StreamReader
+        :param client_reader: Stream with the data from the client.
+
+        :type client_writer: StreamWriter
+        :param client_writer: Stream to send the data to the client.
+
+        :rtype: None
+        """
+        port = route.port
+        try:
+            sock = self.upstream.take(route)
+            if sock is not None:
+                server_reader, server_writer = await open_connection(sock=sock)
+            else:
+                self.upstream.misses += 1
+                server_reader, server_writer = await open_connection(route.upstream, port)
+        except OSError as e:
+            print(f'ERROR: Async Proxy [{port}]: {route.upstream} {e}')
+            client_writer.close()
+            return
+
+        print(f'Async Proxy [{port}]: Connection established')
+        METRICS.connected(port)
+        key = session_key(port, client_writer.get_extra_info('peername'))
+        client_to_server = Package(False, None, None, port, key)
+        server_to_client = Package(True, None, None, port, key)
+        session = (client_to_server, server_to_client, client_writer, server_writer)
+        for package, writer in ((client_to_server, server_writer), (server_to_client, client_writer)):
+            package.queue.notify = partial(self.loop.call_soon_threadsafe, self._flush, package, writer)
+            if package.queue.depth:
+                self._flush(package, writer)
+
+        self.sessions[key] = session
+
+        try:
+            await gather(self._pipe(client_to_server, client_reader, server_writer),
+                         self._pipe(server_to_client, server_reader, client_writer))
+        finally:
+            del self.sessions[key]
+            # The packages queued for this session are not sent to the next connection of the port.
+            Queue.remove(key)
+            WORLDS.remove(key)
+
+    @staticmethod
+    async def _pipe(package: Package, reader: StreamReader, writer: StreamWriter) -> None:
+        """
+        Read from one side, handle the packages and write to the other side.
+
+        :type package: Package
+        :param package: The handler of the packages for this direction.
+
+        :type reader: StreamReader
+        :param reader: Stream of the source.
+
+        :type writer: StreamWriter
+        :param writer: Stream of the destination.
+
+        :rtype: None
+        """
+        try:
+            while package.running:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffers = package.handle(data)
+                start = perf_counter_ns()
+                for buffer in package.coalesce(buffers):
+                    writer.write(buffer)
+                await writer.drain()
+                package.metrics.send.observe(perf_counter_ns() - start)
+        except (ConnectionError, OSError) as e:
+            print(f'ERROR: {package.source_name}[{package.port}]: {e}')
+        finally:
+            package.terminate()
+            package.release()
+            writer.close()
+
+    @staticmethod
+    def _flush(package: Package, writer: StreamWriter) -> None:
+        """
+        Write the packages queued for the destination. It runs in the event loop, so it does not interleave with the
+        writes of the forwarded data.
+
+        :type package: Package
+        :param package: The handler of the packages for this direction.
+
+        :type writer: StreamWriter
+        :param writer: Stream of the destination.
+
+        :rtype: None
+        """
+        if not package.running or writer.is_closing():
+            return
+        for buffer in package.coalesce(package.drain_queue()):
+            writer.write(buffer)
+
+    @staticmethod
+    def _terminate(session: tuple) -> None:
+        """
+        Stop a session, its pipes finish when the writers are closed.
+
+        :type session: tuple
+        :param session: The packages and writers of the session.
+
+        :rtype: None
+        """
+        client_to_server, server_to_client, client_writer, server_writer = session
+        client_to_server.terminate()
+        server_to_client.terminate()
+        client_writer.close()
+        server_writer.close()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Decode the runs of messages with a fixed size at once. The positions of the characters come in floods of the same
+message one after another, so the run is decoded in one call and the handler receives columns of values instead of
+one call for each message. Since the events are rendered lazily a message alone is cheap, so only the long runs pay
+the batch: with the fallback of iter_unpack, 'python3 -m benchmark.parser' measures x1.33 on the server mix, with runs
+of 7 positions.
+
+Only the messages of the server are decoded in batches, in runs of at least MINIMUM (6) messages: the character
+position (0x7073) and my position (0x6d76). The position of the client (0x6d76) has no batch handler, its runs are
+shorter than the minimum.
+
+With NumPy the run is read with numpy.frombuffer and a structured dtype, the columns are arrays. Without it the run is
+read with Struct.iter_unpack and the columns are tuples. NumPy is optional:
+    pip3 install numpy
+"""
+from re import findall
+from struct import Struct
+from typing import Any
+
+from core.protocol import PROTOCOL
+from core.schema import Message
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+USHORT = Struct('<H')
+# Shorter runs are slower in batch than one by one, the break even is about 4 positions of the characters.
+MINIMUM = 6
+DTYPES = {}
+CODES = {'b': 'i1', 'B': 'u1', '?': '?', 'h': '<i2', 'H': '<u2', 'i': '<i4', 'I': '<u4', 'l': '<i4', 'L': '<u4',
+         'q': '<i8', 'Q': '<u8', 'f': '<f4', 'd': '<f8'}
+
+
+class Batch:
+    """
+    Values of a run of messages by column.
+    """
+
+    def __init__(self, message: Message, count: int, columns: dict) -> None:
+        """
+        Constructor which init the class.
+
+        :type message: Message
+        :param message: The declaration of the messages.
+
+        :type count: int
+        :param count: Number of messages.
+
+        :type columns: dict
+        :param columns: The values of each name of the message, arrays with NumPy or tuples without it.
+
+        :rtype: Batch
+        :return: The object instanced of this class.
+        """
+        self.message = message
+        self.count = count
+        self.columns = columns
+
+    def __getitem__(self, name: str) -> Any:
+        """
+        Get the column of a name.
+
+        :type name: str
+        :param name: Name of the value in the message.
+
+        :rtype: Any
+        :return: The array or the tuple of the values.
+        """
+        return self.columns[name]
+
+    def __reduce__(self) -> tuple:
+        """
+        Pickle the batch with the name of its message, the compiled decoder of the message can not be pickled.
+
+        :rtype: tuple
+        :return: The function which restores the batch and its arguments.
+        """
+        return restore, (self.message.name, self.count, self.columns)
+
+    def values(self, name: str) -> list:
+        """
+        Get the column of a name as Python values.
+
+        :type name: str
+        :param name: Name of the value in the message.
+
+        :rtype: list
+        :return: The values.
+        """
+        column = self.columns[name]
+        return column.tolist() if numpy is not None else list(column)
+
+    def row(self, index: int = -1) -> tuple:
+        """
+        Get the values of one message as Python values.
+
+        :type index: int
+        :param index: Position of the message in the run, the last one by default.
+
+        :rtype: tuple
+        :return: The values in the order of the names of the message.
+        """
+        if numpy is not None:
+            return tuple(self.columns[name][index].item() for name in self.message.names)
+        return tuple(self.columns[name][index] for name in self.message.names)
+
+
+def restore(name: str, count: int, columns: dict) -> Batch:
+    """
+    Build a batch which was pickled, see Batch.__reduce__.
+
+    :type name: str
+    :param name: Name of the message.
+
+    :type count: int
+    :param count: Number of messages.
+
+    :type columns: dict
+    :param columns: The values of each name of the message.
+
+    :rtype: Batch
+    :return: The batch.
+    """
+    message = next(message for message in (*PROTOCOL.client.values(), *PROTOCOL.server.values())
+                   if message.name == name)
+    return Batch(message, count, columns)
+
+
+def dtype(message: Message) -> Any:
+    """
+    Build the structured dtype of a message with a fixed size, the packet ID included.
+
+    :type message: Message
+    :param message: The declaration of the message.
+
+    :rtype: numpy.dtype
+    :return: The dtype, it is cached for each message.
+    """
+    result = DTYPES.get(message.opcode, (None, None))
+    if result[0] is message:
+        return result[1]
+
+    names = list(message.names)
+    fields = [('opcode', '<u2')]
+    for field in message.fields:
+        for count, code in findall(r'(\d*)([a-zA-Z?])', field.fmt):
+            if code == 's':
+                fields.append((names.pop(0), f'V{count or 1}'))
+                continue
+            for _ in range(int(count or 1)):
+                fields.append((names.pop(0), CODES[code]))
+    result = numpy.dtype(fields)
+    DTYPES[message.opcode] = (message, result)
+    return result
+
+
+def run_length(message: Message, data: memoryview, offset: int, size: int, minimum: int = MINIMUM) -> int:
+    """
+    Count the complete messages of the same type one after another. The message at the minimum length is checked
+    first, so most of the messages which are not in a run are discarded with one read.
+
+    :type message: Message
+    :param message: The declaration of the message, it must have a fixed size.
+
+    :type data: memoryview
+    :param data: Raw data.
+
+    :type offset: int
+    :param offset: Offset of the packet ID of the first message.
+
+    :type size: int
+    :param size: Size of the data.
+
+    :type minimum: int
+    :param minimum: Minimum length of a run.
+
+    :rtype: int
+    :return: The number of messages, zero if it is less than the minimum.
+    """
+    step = message.record.size
+    opcode = message.opcode
+    unpack = USHORT.unpack_from
+    last = offset + (minimum - 1) * step
+    if last + step > size or unpack(data, last)[0] != opcode:
+        return 0
+    count = 0
+    while offset + step <= size and unpack(data, offset)[0] == opcode:
+        count += 1
+        offset += step
+    return count if count >= minimum else 0
+
+
+def decode(message: Message, data: memoryview, offset: int, count: int) -> Batch:
+    """
+    Decode a run of messages. The data is copied, so the buffer of the connection is not held by the columns.
+
+    :type message: Message
+    :param message: The declaration of the message, it must have a fixed size.
+
+    :type data: memoryview
+    :param data: Raw data.
+
+    :type offset: int
+    :param offset: Offset of the packet ID of the first message.
+
+    :type count: int
+    :param count: Number of messages.
+
+    :rtype: Batch
+    :return: The columns of the values.
+    """
+    end = offset + count * message.record.size
+    if numpy is not None:
+        records = numpy.frombuffer(data[offset:end], dtype(message)).copy()
+        return Batch(message, count, {name: records[name] for name in message.names})
+
+    rows = list(message.record.iter_unpack(data[offset:end]))
+    columns = list(zip(*rows))[1:]
+    return Batch(message, count, dict(zip(message.names, columns)))
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Record the raw traffic in a compact binary file which could be read again, and read it with a memory map so the
+captures of long sessions are iterated without loading them in memory.
+
+The file has a header, then blocks of records and at the end an index of the blocks:
+    header: magic 'PA3CAP' and version (<6sH)
+    record: timestamp, port, direction and size (<dHBI) followed by the raw data
+    index:  for each block its offset, the timestamp of its first record, the number of records and its size (<QdII)
+    footer: offset of the index, number of blocks and magic 'PA3IDX' (<QI6s)
+
+The direction is 0 for the data sent by the client and 1 for the data sent by the server. If the capture was not
+closed, the index is missing and the records are read from the start until the last complete one.
+"""
+from bisect import bisect_right
+from mmap import mmap, ACCESS_READ
+from os import fstat
+from struct import Struct
+from threading import Lock
+from time import time
+from typing import Iterator, NamedTuple, Optional
+
+HEADER = Struct('<6sH')
+RECORD = Struct('<dHBI')
+INDEX = Struct('<QdII')
+FOOTER = Struct('<QI6s')
+MAGIC = b'PA3CAP'
+MAGIC_INDEX = b'PA3IDX'
+VERSION = 1
+
+
+class Record(NamedTuple):
+    """
+    One read of a socket.
+    """
+    timestamp: float
+    port: int
+    is_server: bool
+    data: memoryview
+
+
+class Capture:
+    """
+    Write the records in blocks. It is shared by all the connections, so the writes are serialized with a lock.
+    """
+
+    def __init__(self, path: str, block_size: int = 65536) -> None:
+        """
+        Constructor which init the class.
+
+        :type path: str
+        :param path: The file of the capture, it is overwritten.
+
+        :type block_size: int
+        :param block_size: Size of the buffer which is written as one block.
+
+        :rtype: Capture
+        :return: The object instanced of this class.
+        """
+        self.path = path
+        self.block_size = block_size
+        self.records = 0
+        self.size = HEADER.size
+        self._lock = Lock()
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION))
+        self._index = []
+        self._block = bytearray()
+        self._block_records = 0
+        self._block_timestamp = 0.0
+
+    def write(self, port: int, is_server: bool, data: bytes, timestamp: Optional[float] = None) -> None:
+        """
+        Add a record to the current block.
+
+        :type port: int
+        :param port: The number of the port of the communication.
+
+        :type is_server: bool
+        :param is_server: True if the data was sent by the server.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :type timestamp: float
+        :param timestamp: Seconds since the epoch, by default the current time.
+
+        :rtype: None
+        """
+        if timestamp is None:
+            timestamp = time()
+        with self._lock:
+            if self._file is None:
+                return
+            if not self._block_records:
+                self._block_timestamp = timestamp
+            self._block += RECORD.pack(timestamp, port, is_server, len(data))
+            self._block += data
+            self._block_records += 1
+            self.records += 1
+            if len(self._block) >= self.block_size:
+                self._write_block()
+
+    def flush(self) -> None:
+        """
+        Write the current block to the disk.
+
+        :rtype: None
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_block()
+            self._file.flush()
+
+    def close(self) -> None:
+        """
+        Write the last block, the index and close the file.
+
+        :rtype: None
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._write_block()
+            offset = self._file.tell()
+            for entry in self._index:
+                self._file.write(INDEX.pack(*entry))
+            self._file.write(FOOTER.pack(offset, len(self._index), MAGIC_INDEX))
+            self._file.close()
+            self._file = None
+
+    def _write_block(self) -> None:
+        """
+        Write the current block and add it to the index. The lock must be acquired.
+
+        :rtype: None
+        """
+        if not self._block_records:
+            return
+        self._index.append((self.size, self._block_timestamp, self._block_records, len(self._block)))
+        self._file.write(self._block)
+        self.size += len(self._block)
+        self._block = bytearray()
+        self._block_records = 0
+
+
+class CaptureReader:
+    """
+    Read a capture with a memory map. The data of the records are views of the map, they are not copied.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type path: str
+        :param path: The file of the capture.
+
+        :rtype: CaptureReader
+        :return: The object instanced of this class.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        if fstat(self._file.fileno()).st_size < HEADER.size:
+            raise ValueError(f'{path} is not a capture')
+        self._map = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        self.data = memoryview(self._map)
+
+        magic, version = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a capture of version {VERSION}')
+
+        self.end = len(self.data)
+        self.blocks = []
+        if self.end >= HEADER.size + FOOTER.size:
+            offset, count, magic = FOOTER.unpack_from(self.data, self.end - FOOTER.size)
+            if magic == MAGIC_INDEX:
+                self.blocks = [INDEX.unpack_from(self.data, offset + i * INDEX.size) for i in range(count)]
+                self.end = offset
+        self._timestamps = [block[1] for block in self.blocks]
+
+    def __enter__(self) -> 'CaptureReader':
+        """
+        Use the reader in a with statement.
+
+        :rtype: CaptureReader
+        :return: This reader.
+        """
+        return self
+
+    def __exit__(self, *_) -> None:
+        """
+        Close the reader at the end of the with statement.
+
+        :rtype: None
+        """
+        self.close()
+
+    def __iter__(self) -> Iterator[Record]:
+        """
+        Iterate all the records.
+
+        :rtype: Iterator[Record]
+        :return: The records in the order which they were written.
+        """
+        return self.records()
+
+    def records(self, start: Optional[float] = None) -> Iterator[Record]:
+        """
+        Iterate the records. With a start time the blocks before it are skipped with the index.
+
+        :type start: float
+        :param start: Seconds since the epoch of the first record.
+
+        :rtype: Iterator[Record]
+        :return: The records in the order which they were written.
+        """
+        offset = HEADER.size
+        if start is not None and self.blocks:
+            block = max(bisect_right(self._timestamps, start) - 1, 0)
+            offset = self.blocks[block][0]
+
+        data = self.data
+        end = self.end
+        while offset + RECORD.size <= end:
+            timestamp, port, is_server, size = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + size > end:
+                break
+            if start is None or timestamp >= start:
+                yield Record(timestamp, port, bool(is_server), data[offset:offset + size])
+            offset += size
+
+    def close(self) -> None:
+        """
+        Release the memory map and close the file.
+
+        :rtype: None
+        """
+        self.data.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Some record is still used, the map is released when it is collected.
+            pass
+        self._file.close()
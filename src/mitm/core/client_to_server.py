@@ -6,9 +6,11 @@ Manage the connection from the Client to the Server.
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR
+from socket import socket
 from threading import Thread
+from typing import Optional
 
+from core.lifecycle import shutdown
 from core.package import Package
 
 
@@ -17,16 +19,19 @@ class ClientToServer(Thread):
     Get, analyze and modify the data from client and send to the server.
     """
 
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, client: socket, port: int, session: Optional[tuple] = None) -> None:
         """
         Constructor which init the class.
 
-        :type host: str
-        :param host: The client's IP.
+        :type client: socket
+        :param client: The connection accepted from the client.
 
         :type port: int
         :param port: The number of the port for the communication.
 
+        :type session: tuple
+        :param session: The key of the session of the connection, the port, the host and the port of the client.
+
         :rtype: ClientToServer
         :return: The object instanced of this class.
         """
@@ -35,21 +40,20 @@ class ClientToServer(Thread):
         self._running = True
         self.server = None
         self.port = port
+        self.session = session
         self.package = None
-        sock = socket(AF_INET, SOCK_STREAM)
-        sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
-        sock.bind((host, port))
-        sock.listen(1)
-        # Waiting for a connection
-        self.client, addr = sock.accept()
+        self.client = client
 
     def terminate(self) -> None:
         """
-        Stop the execution of the current thread proxy.
+        Stop the execution of the current thread proxy. The client is shut down, so the thread stops even if its
+        package was not created yet.
 
         :rtype: None
         """
-        self.package.terminate()
+        if self.package is not None:
+            self.package.terminate()
+        shutdown(self.client)
 
     def run(self) -> None:
         """
@@ -58,5 +62,5 @@ class ClientToServer(Thread):
 
         :rtype: None
         """
-        self.package = Package(False, self.client, self.server, self.port)
+        self.package = Package(False, self.client, self.server, self.port, self.session)
         self.package.start()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Events decoded by the parser and the verbosity of each message. The parser keeps the decoded values of each message as
+an event, and the text is rendered only when the events are shown.
+
+The verbosity of a message is one of:
+    off:  never shown.
+    auto: shown with the data which has unknown patterns, it is the default.
+    on:   always shown.
+
+The verbosity is a module singleton, it is kept when the parser is reloaded.
+"""
+from struct import unpack
+
+from core.protocol import PROTOCOL
+
+OFF = 'off'
+AUTO = 'auto'
+ON = 'on'
+LEVELS = (OFF, AUTO, ON)
+UNKNOWN = 'unknown'
+
+
+class Event:
+    """
+    Decoded values of one message, or of a run of messages in a batch.
+    """
+    __slots__ = ('name', 'values', 'batch')
+
+    def __init__(self, name: str, values: tuple, batch: bool = False) -> None:
+        """
+        Constructor which init the class.
+
+        :type name: str
+        :param name: Name of the message, 'unknown' for the data without a known pattern.
+
+        :type values: tuple
+        :param values: The decoded values.
+
+        :type batch: bool
+        :param batch: True if the values are a Batch of a run of messages.
+
+        :rtype: Event
+        :return: The object instanced of this class.
+        """
+        self.name = name
+        self.values = values
+        self.batch = batch
+
+
+class Verbosity:
+    """
+    Keep the verbosity of each message by its name.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Verbosity
+        :return: The object instanced of this class.
+        """
+        self.levels = {}
+        self.forced = set()
+
+    def level(self, name: str) -> str:
+        """
+        Get the verbosity of a message.
+
+        :type name: str
+        :param name: Name of the message.
+
+        :rtype: str
+        :return: The verbosity.
+        """
+        return self.levels.get(name, AUTO)
+
+    def set(self, name: str, level: str) -> None:
+        """
+        Change the verbosity of a message.
+
+        :type name: str
+        :param name: Name of the message.
+
+        :type level: str
+        :param level: The verbosity: 'off', 'auto' or 'on'.
+
+        :rtype: None
+        """
+        if level not in LEVELS:
+            raise ValueError(f'The verbosity must be one of {", ".join(LEVELS)}')
+        if level == AUTO:
+            self.levels.pop(name, None)
+        else:
+            self.levels[name] = level
+        self.forced = {key for key, value in self.levels.items() if value == ON}
+
+    def reset(self) -> None:
+        """
+        Change the verbosity of all the messages to the default.
+
+        :rtype: None
+        """
+        self.levels.clear()
+        self.forced = set()
+
+    def report(self) -> str:
+        """
+        Build the list of the messages which do not have the default verbosity.
+
+        :rtype: str
+        :return: The list.
+        """
+        if not self.levels:
+            return f'Verbosity: all the messages are {AUTO}'
+        return '\n'.join(f'| {name:>30} | {level:>4} |' for name, level in sorted(self.levels.items()))
+
+
+def find_names(term: str) -> list:
+    """
+    Find the names of the messages of a term of the console. The term is 'all', 'unknown', a name or part of it, or
+    the packet ID in decimal or in hexadecimal like it comes in the network (0x7073).
+
+    :type term: str
+    :param term: The term.
+
+    :rtype: list
+    :return: The names of the messages.
+    """
+    messages = [*PROTOCOL.client.values(), *PROTOCOL.server.values()]
+    if term == 'all':
+        return sorted({message.name for message in messages} | {UNKNOWN})
+    if term == UNKNOWN:
+        return [UNKNOWN]
+    if term.startswith('0x'):
+        opcode, = unpack('<H', bytes.fromhex(term[2:].zfill(4)))
+        return sorted({message.name for message in messages if message.opcode == opcode})
+    if term.isdigit():
+        return sorted({message.name for message in messages if message.opcode == int(term)})
+    names = {message.name for message in messages}
+    if term in names:
+        return [term]
+    return sorted(name for name in names if term in name)
+
+
+VERBOSITY = Verbosity()
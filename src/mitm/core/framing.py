@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Reassemble the stream of each connection. TCP could split a message between two reads or merge several messages in
+one read, so the incomplete trailing message is kept and it is completed with the data of the next read.
+"""
+
+
+class Incomplete(Exception):
+    """
+    The message is not complete, the rest of it will come in the next read.
+    """
+
+
+class Reassembler:
+    """
+    Buffer of one connection and direction. The data is stored in a bytearray with a read cursor, the parser gets a
+    memoryview of the pending bytes so the messages are never copied.
+    """
+
+    def __init__(self, limit: int = 65536) -> None:
+        """
+        Constructor which init the class.
+
+        :type limit: int
+        :param limit: Maximum number of pending bytes, beyond that the buffer is discarded.
+
+        :rtype: Reassembler
+        :return: The object instanced of this class.
+        """
+        self.limit = limit
+        self.discarded = 0
+        self._buffer = bytearray()
+        self._start = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of bytes waiting to complete a message.
+
+        :rtype: int
+        :return: The size of the pending data.
+        """
+        return len(self._buffer) - self._start
+
+    def feed(self, data: bytes) -> memoryview:
+        """
+        Append the data of a new read.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: memoryview
+        :return: View of the pending bytes followed by the new data.
+        """
+        if self._start == len(self._buffer) and self._start > 0:
+            self._reset()
+        try:
+            self._buffer += data
+        except BufferError:
+            # A view of the previous read is still alive, the buffer can not be resized.
+            self._buffer = self._buffer[self._start:] + data
+            self._start = 0
+        return memoryview(self._buffer)[self._start:]
+
+    def consume(self, size: int) -> int:
+        """
+        Move the cursor after the complete messages.
+
+        :type size: int
+        :param size: Number of bytes which were parsed.
+
+        :rtype: int
+        :return: Number of pending bytes discarded because they exceeded the limit.
+        """
+        self._start += size
+        pending = self.pending
+        if pending > self.limit:
+            self._start = len(self._buffer)
+            self.discarded += pending
+            return pending
+
+        if self._start > len(self._buffer) // 2:
+            try:
+                del self._buffer[:self._start]
+                self._start = 0
+            except BufferError:
+                pass
+        return 0
+
+    def _reset(self) -> None:
+        """
+        Empty the buffer.
+
+        :rtype: None
+        """
+        try:
+            self._buffer.clear()
+        except BufferError:
+            self._buffer = bytearray()
+        self._start = 0
@@ -1,12 +1,34 @@
 #!/usr/bin/env python3
 # -*- coding: UTF-8 -*-
 """
-Contain the mapping of the hacks.
+Contain the mapping of the hacks and the rules of each one, see core.rules.
 """
 
 
 class Hack:
     """
-    Keep the Queue of the packages.
+    Keep the names of the hacks and their rules.
     """
     fire_balls = 'FireBalls'
+
+    rules = {
+        # Teleport next to the fire balls and pick them up.
+        fire_balls: ('server 0x6d76 rewrite 2 34972ac7f26a5ac766bca143',
+                     'server 0x6d76 prepend 656501000000'),
+    }
+
+    @classmethod
+    def find(cls, target: str) -> str:
+        """
+        Find the name of a hack without case.
+
+        :type target: str
+        :param target: Name of the hack.
+
+        :rtype: str
+        :return: The name of the hack, or an empty string if it does not exist.
+        """
+        for name in cls.rules:
+            if name.lower() == target.lower():
+                return name
+        return ''
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Send the injected packages as soon as they are queued. Without it a queued package waits until the source of its
+connection sends something, because the queue is drained only after a read.
+
+The channels of the queue wake the writer when a package is added. The writer sends all the pending packages of the
+channel with the package of the connection, which drains the channel and sends it inside the lock of the socket, the
+same lock which the thread of the source holds to drain and send with the forwarded data, so the order is kept.
+"""
+from logging import debug
+from sys import exc_info
+from threading import Condition, Thread
+from traceback import format_exception
+
+
+class Injector(Thread):
+    """
+    Writer which flushes the queues of the connections when they are woken.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Injector
+        :return: The object instanced of this class.
+        """
+        super(Injector, self).__init__()
+        self.name = 'Injector'
+        self.daemon = True
+        self.flushes = 0
+        self._running = True
+        self._packages = {}
+        self._pending = set()
+        self._condition = Condition()
+
+    def register(self, package) -> None:
+        """
+        Flush the queue of the package when a package is added to it. The packages are registered by the session of
+        their connection, so the sessions of the same port do not receive the packages of each other.
+
+        :type package: Package
+        :param package: The handler of the packages of one connection and destination.
+
+        :rtype: None
+        """
+        key = (package.session, package.destination_name)
+        with self._condition:
+            self._packages[key] = package
+        package.queue.notify = lambda: self.wake(key)
+        if package.queue.depth:
+            self.wake(key)
+
+    def unregister(self, package) -> None:
+        """
+        Forget a package whose connection is finished, its queue is not flushed anymore.
+
+        :type package: Package
+        :param package: The handler of the packages of one connection and destination.
+
+        :rtype: None
+        """
+        key = (package.session, package.destination_name)
+        with self._condition:
+            if self._packages.get(key) is not package:
+                return
+            del self._packages[key]
+            self._pending.discard(key)
+        package.queue.notify = None
+
+    def wake(self, key: tuple) -> None:
+        """
+        Request the flush of the queue of a connection.
+
+        :type key: tuple
+        :param key: The session and the destination of the connection.
+
+        :rtype: None
+        """
+        with self._condition:
+            self._pending.add(key)
+            self._condition.notify()
+
+    def terminate(self) -> None:
+        """
+        Stop the execution of the writer.
+
+        :rtype: None
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def run(self) -> None:
+        """
+        Flush the queues which were woken.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                packages = [self._packages.get(key) for key in self._pending]
+                self._pending.clear()
+
+            for package in packages:
+                if package is None or not package.running:
+                    continue
+                try:
+                    package.flush_queue()
+                except OSError as e:
+                    # The connection was closed while the packages were sent.
+                    if package.running:
+                        message = f'ERROR: Injector: {package.destination_name}[{package.port}]: {e}'
+                        print(message)
+                        debug(message)
+                except Exception as e:
+                    error_type, value, traceback = exc_info()
+                    print(f'ERROR: Injector: {package.destination_name}[{package.port}]: {e}\n'
+                          f'{"".join(format_exception(error_type, value, traceback))}')
+                self.flushes += 1
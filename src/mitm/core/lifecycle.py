@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Stop the proxy without killing the process. The components are added in the order they are started and stopped in
+the reverse order: first the proxy, so no new data arrives, then the threads which process it, and at the end the
+capture and the log, so they keep everything written until the last moment.
+
+The threads which read a socket are stopped with a shutdown of the socket, which wakes the blocking recv at once.
+After the stop, the threads which are still alive and the sockets which are still open are reported as leaked.
+"""
+from os import listdir, path, readlink
+from signal import signal, SIGTERM
+from socket import socket, SHUT_RDWR
+from threading import Thread, current_thread, enumerate as threading_enumerate, main_thread
+from time import monotonic
+from typing import Callable, Optional
+
+JOIN_TIMEOUT = 5.0
+FDS = '/proc/self/fd'
+
+
+def shutdown(sock: Optional[socket]) -> None:
+    """
+    Shut down both directions of a socket, a thread blocked in its recv gets the end of the data. The socket is not
+    closed, its thread closes it.
+
+    :type sock: socket
+    :param sock: The connection, None or a closed socket are ignored.
+
+    :rtype: None
+    """
+    if sock is None:
+        return
+    try:
+        sock.shutdown(SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def open_sockets() -> int:
+    """
+    Count the sockets opened by the process.
+
+    :rtype: int
+    :return: The number of sockets, -1 if the system does not list the descriptors of the process.
+    """
+    if not path.isdir(FDS):
+        return -1
+    count = 0
+    for fd in listdir(FDS):
+        try:
+            count += readlink(path.join(FDS, fd)).startswith('socket:')
+        except OSError:
+            continue
+    return count
+
+
+def _exit(*_) -> None:
+    """
+    Handle SIGTERM in the main thread like Ctrl+C.
+
+    :rtype: None
+    """
+    raise KeyboardInterrupt
+
+
+class Lifecycle:
+    """
+    The components of the application and the order to stop them.
+    """
+
+    def __init__(self, timeout: float = JOIN_TIMEOUT) -> None:
+        """
+        Constructor which init the class.
+
+        :type timeout: float
+        :param timeout: Seconds to wait for the threads of all the components.
+
+        :rtype: Lifecycle
+        :return: The object instanced of this class.
+        """
+        self.timeout = timeout
+        self.stopped = False
+        self._components = []
+
+    def add(self, name: str, stop: Callable[[], None], *threads: Thread) -> None:
+        """
+        Add a component, it is stopped before the components which were added before it.
+
+        :type name: str
+        :param name: The name of the component for the report.
+
+        :type stop: Callable
+        :param stop: Function which stops the component or requests its stop.
+
+        :type threads: Thread
+        :param threads: The threads which are joined after the stop.
+
+        :rtype: None
+        """
+        self._components.append((name, stop, threads))
+
+    def handle_signals(self) -> None:
+        """
+        Stop with SIGTERM like with the quit command: the signal raises KeyboardInterrupt in the main thread, which
+        leaves the console and stops the components.
+
+        :rtype: None
+        """
+        signal(SIGTERM, _exit)
+
+    def stop(self) -> str:
+        """
+        Stop all the components in the reverse order which they were added, and wait for their threads.
+
+        :rtype: str
+        :return: The report of the stop, with the threads and the sockets which were leaked.
+        """
+        if self.stopped:
+            return 'Lifecycle: already stopped'
+        self.stopped = True
+        deadline = monotonic() + self.timeout
+        lines = []
+        for name, stop, threads in reversed(self._components):
+            try:
+                stop()
+            except Exception as e:
+                lines.append(f'ERROR: {name}: {e}')
+            for thread in threads:
+                if thread.ident is not None:
+                    thread.join(max(deadline - monotonic(), 0))
+            alive = [thread.name for thread in threads if thread.is_alive()]
+            lines.append(f'| {name:>12} | {"Leaked " + ", ".join(alive) if alive else "Stopped"} |')
+        lines.append(self.report(leaks=True))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def report(leaks: bool = False) -> str:
+        """
+        Build the state of the threads and the sockets of the process.
+
+        :type leaks: bool
+        :param leaks: True to list the threads which are alive, after the stop they are leaked.
+
+        :rtype: str
+        :return: The state.
+        """
+        threads = [thread for thread in threading_enumerate() if thread not in (main_thread(), current_thread())]
+        sockets = open_sockets()
+        message = f'Threads: {len(threads)} | Sockets: {sockets if sockets >= 0 else "unknown"}'
+        if leaks and threads:
+            message += f'\nLeaked threads: {", ".join(thread.name for thread in threads)}'
+        return message
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Logging of the proxy in a background thread. The threads of the sockets only put the records in a bounded queue, a
+QueueListener writes them to the file. When the queue is full the record is dropped and counted instead of blocking
+the socket.
+
+The file is rotated by size and the old files could be compressed with gzip:
+    debug.log, debug.log.1.gz, debug.log.2.gz, ...
+
+The records are written as the plain message or as JSON lines with the time, the thread and the level.
+"""
+from gzip import open as gzip_open
+from json import dumps
+from logging import DEBUG, Formatter, LogRecord, getLogger
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from os import path, remove
+from queue import Full, Queue
+from shutil import copyfileobj
+from typing import Optional
+
+
+class JsonFormatter(Formatter):
+    """
+    Format each record as one JSON object by line.
+    """
+
+    def format(self, record: LogRecord) -> str:
+        """
+        Format the record.
+
+        :type record: LogRecord
+        :param record: The record of the log.
+
+        :rtype: str
+        :return: The JSON line.
+        """
+        return dumps({'time': record.created, 'thread': record.threadName, 'level': record.levelname,
+                      'message': record.getMessage()})
+
+
+class DropHandler(QueueHandler):
+    """
+    Put the records in a bounded queue without blocking, the records which do not fit are dropped.
+    """
+
+    def __init__(self, queue: Queue) -> None:
+        """
+        Constructor which init the class.
+
+        :type queue: Queue
+        :param queue: The queue of the listener.
+
+        :rtype: DropHandler
+        :return: The object instanced of this class.
+        """
+        super(DropHandler, self).__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        """
+        Keep the record as it is, the message is formatted by the writer thread instead of the socket thread.
+
+        :type record: LogRecord
+        :param record: The record of the log.
+
+        :rtype: LogRecord
+        :return: The same record.
+        """
+        return record
+
+    def enqueue(self, record: LogRecord) -> None:
+        """
+        Put the record in the queue, or count it as dropped if the queue is full.
+
+        :type record: LogRecord
+        :param record: The record of the log.
+
+        :rtype: None
+        """
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+def compress(source: str, destination: str) -> None:
+    """
+    Rotator of the files which compress the old file with gzip.
+
+    :type source: str
+    :param source: The file which is rotated.
+
+    :type destination: str
+    :param destination: The name of the rotated file.
+
+    :rtype: None
+    """
+    with open(source, 'rb') as file, gzip_open(destination, 'wb') as compressed:
+        copyfileobj(file, compressed)
+    remove(source)
+
+
+class Log:
+    """
+    Configure the root logger with the queue and the writer thread.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Log
+        :return: The object instanced of this class.
+        """
+        self.path = ''
+        self.handler: Optional[DropHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.writer: Optional[RotatingFileHandler] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the writer is running.
+
+        :rtype: bool
+        :return: True if the records are written.
+        """
+        return self.listener is not None
+
+    def start(self, filename: str = './debug.log', max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+              compressed: bool = False, json_lines: bool = False, size: int = 10000) -> None:
+        """
+        Start writing the records of the root logger. The file of the previous session is rotated, so it is kept as
+        the first backup.
+
+        :type filename: str
+        :param filename: The file of the log.
+
+        :type max_bytes: int
+        :param max_bytes: Size of the file which is rotated, 0 never rotates.
+
+        :type backups: int
+        :param backups: Number of old files which are kept.
+
+        :type compressed: bool
+        :param compressed: True to compress the old files with gzip.
+
+        :type json_lines: bool
+        :param json_lines: True to write JSON lines instead of the plain message.
+
+        :type size: int
+        :param size: Maximum number of records waiting in the queue.
+
+        :rtype: None
+        """
+        self.stop()
+        self.path = filename
+        self.writer = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backups, encoding='utf-8',
+                                          delay=True)
+        self.writer.setFormatter(JsonFormatter() if json_lines else Formatter('%(message)s'))
+        if compressed:
+            self.writer.namer = lambda name: f'{name}.gz'
+            self.writer.rotator = compress
+        if backups > 0 and path.isfile(filename) and path.getsize(filename) > 0:
+            self.writer.doRollover()
+
+        self.handler = DropHandler(Queue(size))
+        self.listener = QueueListener(self.handler.queue, self.writer)
+        root = getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(DEBUG)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """
+        Write the records which are waiting and close the file.
+
+        :rtype: None
+        """
+        if self.listener is None:
+            return
+        getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        self.writer.close()
+        self.listener = None
+
+    def report(self) -> str:
+        """
+        Build the state of the log.
+
+        :rtype: str
+        :return: The state.
+        """
+        if self.listener is None:
+            return 'Log: disabled'
+        return f'Log: {self.path} | Waiting {self.handler.queue.qsize()} | Dropped {self.handler.dropped}'
+
+
+LOG = Log()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Metrics of each connection: bytes, reads, messages by packet ID and histograms of the time of the inject, the parse
+and the send. The connections are identified by the port and the source of the data, 'client' or 'server', so the
+sessions of the same port are added together, the depth of the queue too.
+
+The histograms have fixed buckets, so the observation is one bisect and an increment. The metrics are exported as
+JSON or as the text format of Prometheus:
+    mitm_parse_seconds_bucket{port="3000",source="server",le="0.0001"} 42
+
+One connection could be profiled with cProfile while it is running, the profile only runs in the thread which handles
+the data of that connection.
+"""
+from bisect import bisect_left
+from collections import Counter
+from cProfile import Profile
+from io import StringIO
+from json import dump
+from pstats import Stats
+from typing import Optional
+
+from core.queue import Queue
+
+# Upper bounds of the buckets in nanoseconds, from 1 us to 100 ms.
+BUCKETS = (1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000, 1000000, 2000000, 5000000, 10000000,
+           20000000, 50000000, 100000000)
+STAGES = ('inject', 'parse', 'send')
+
+
+def packet_name(packet_id: Optional[int]) -> str:
+    """
+    Show a packet ID in hexadecimal like it comes in the network.
+
+    :type packet_id: int
+    :param packet_id: The packet ID read as little endian, None for the unknown data.
+
+    :rtype: str
+    :return: The packet ID like 0x6d76, or 'unknown'.
+    """
+    return 'unknown' if packet_id is None else f'0x{packet_id.to_bytes(2, "little").hex()}'
+
+
+class Histogram:
+    """
+    Distribution of durations in nanoseconds.
+    """
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Histogram
+        :return: The object instanced of this class.
+        """
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value: int) -> None:
+        """
+        Add a duration.
+
+        :type value: int
+        :param value: Duration in nanoseconds.
+
+        :rtype: None
+        """
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, ratio: float) -> float:
+        """
+        Estimate a quantile with the upper bound of its bucket.
+
+        :type ratio: float
+        :param ratio: Quantile between 0 and 1.
+
+        :rtype: float
+        :return: The duration in nanoseconds, the maximum for the last bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = ratio * self.count
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            if total >= rank:
+                return float(min(bound, self.max))
+        return float(self.max)
+
+    @property
+    def mean(self) -> float:
+        """
+        Mean of the durations.
+
+        :rtype: float
+        :return: The mean in nanoseconds.
+        """
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        """
+        Build the values of the histogram for JSON.
+
+        :rtype: dict
+        :return: The count, the sum, the maximum, p50, p99 and the buckets in nanoseconds.
+        """
+        return {'count': self.count, 'sum': self.sum, 'max': self.max, 'p50': self.quantile(0.5),
+                'p99': self.quantile(0.99), 'buckets': dict(zip([*map(str, BUCKETS), '+Inf'], self.counts))}
+
+
+class ConnectionMetrics:
+    """
+    Counters and histograms of one port and source.
+    """
+
+    def __init__(self, port: int, source: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type port: int
+        :param port: The number of the port of the connection.
+
+        :type source: str
+        :param source: The source of the data, 'client' or 'server'.
+
+        :rtype: ConnectionMetrics
+        :return: The object instanced of this class.
+        """
+        self.port = port
+        self.source = source
+        self.profiler: Optional[Profile] = None
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Set the counters and the histograms to zero. The object is kept, the connections hold it.
+
+        :rtype: None
+        """
+        self.bytes = 0
+        self.reads = 0
+        self.packets = Counter()
+        self.inject = Histogram()
+        self.parse = Histogram()
+        self.send = Histogram()
+
+    @property
+    def destination(self) -> str:
+        """
+        Destination of the data.
+
+        :rtype: str
+        :return: 'server' or 'client'.
+        """
+        return 'client' if self.source == 'server' else 'server'
+
+    def to_dict(self) -> dict:
+        """
+        Build the metrics for JSON.
+
+        :rtype: dict
+        :return: The counters and the histograms.
+        """
+        packets = {packet_name(packet_id): count for packet_id, count in self.packets.most_common()}
+        return {'port': self.port, 'source': self.source, 'bytes': self.bytes, 'reads': self.reads,
+                'queue_depth': Queue.depth(self.port, self.destination), 'packets': packets,
+                **{stage: getattr(self, stage).to_dict() for stage in STAGES}}
+
+
+class Metrics:
+    """
+    The metrics of all the connections and the number of connections of each port.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Metrics
+        :return: The object instanced of this class.
+        """
+        self.connections = {}
+        self.sessions = Counter()
+
+    def connection(self, port: int, source: str) -> ConnectionMetrics:
+        """
+        Get the metrics of a connection, they are created the first time.
+
+        :type port: int
+        :param port: The number of the port of the connection.
+
+        :type source: str
+        :param source: The source of the data, 'client' or 'server'.
+
+        :rtype: ConnectionMetrics
+        :return: The metrics.
+        """
+        metrics = self.connections.get((port, source))
+        if metrics is None:
+            metrics = self.connections.setdefault((port, source), ConnectionMetrics(port, source))
+        return metrics
+
+    def connected(self, port: int) -> None:
+        """
+        Count a connection established by the proxy, the second one of a port is a reconnection.
+
+        :type port: int
+        :param port: The number of the port.
+
+        :rtype: None
+        """
+        self.sessions[port] += 1
+
+    def reconnects(self, port: int) -> int:
+        """
+        Get the number of reconnections of a port.
+
+        :type port: int
+        :param port: The number of the port.
+
+        :rtype: int
+        :return: The connections after the first one.
+        """
+        return max(self.sessions[port] - 1, 0)
+
+    def reset(self) -> None:
+        """
+        Set all the metrics to zero, the profiles keep running.
+
+        :rtype: None
+        """
+        for metrics in list(self.connections.values()):
+            metrics.reset()
+        self.sessions = Counter()
+
+    def profile(self, port: int, source: str, limit: int = 20) -> str:
+        """
+        Start the profile of a connection, or stop it and build the report of the functions with more time.
+
+        :type port: int
+        :param port: The number of the port of the connection.
+
+        :type source: str
+        :param source: The source of the data, 'client' or 'server'.
+
+        :type limit: int
+        :param limit: Number of functions of the report.
+
+        :rtype: str
+        :return: The state of the profile or its report.
+        """
+        metrics = self.connection(port, source)
+        if metrics.profiler is None:
+            metrics.profiler = Profile()
+            return f'Profile {source}[{port}]: started'
+
+        # The profiler is enabled and disabled by the thread of the connection around each read, see Package.handle.
+        profiler, metrics.profiler = metrics.profiler, None
+        filename = f'./profile-{source}-{port}.prof'
+        output = StringIO()
+        try:
+            stats = Stats(profiler, stream=output)
+        except TypeError:
+            return f'Profile {source}[{port}]: stopped without data'
+        stats.dump_stats(filename)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return f'{output.getvalue()}Profile {source}[{port}]: saved in {filename}'
+
+    def report(self) -> str:
+        """
+        Build the table of the metrics of the connections.
+
+        :rtype: str
+        :return: The table.
+        """
+        lines = []
+        for (port, source), metrics in sorted(self.connections.items()):
+            times = ' | '.join(f'{stage} p50 {getattr(metrics, stage).quantile(0.5) / 1000:>7.1f} '
+                               f'p99 {getattr(metrics, stage).quantile(0.99) / 1000:>7.1f} us' for stage in STAGES)
+            top = ', '.join(f'{packet_name(packet_id)} {count}' for packet_id, count in metrics.packets.most_common(3))
+            lines.append(f'| {source:>6}[{port}] | Bytes {metrics.bytes:>10} | Reads {metrics.reads:>7} | '
+                         f'Depth {Queue.depth(port, metrics.destination):>4} | '
+                         f'Reconnects {self.reconnects(port):>3} | {times} | Top {top} |'
+                         f'{" Profiling |" if metrics.profiler is not None else ""}')
+        return '\n'.join(lines) if lines else 'Metrics: no connection'
+
+    def to_dict(self) -> dict:
+        """
+        Build the metrics of all the connections for JSON.
+
+        :rtype: dict
+        :return: The metrics.
+        """
+        return {'connections': [metrics.to_dict() for _, metrics in sorted(self.connections.items())],
+                'sessions': {str(port): count for port, count in sorted(self.sessions.items())}}
+
+    def prometheus(self) -> str:
+        """
+        Build the metrics in the text format of Prometheus, the samples of each metric are together after its type.
+
+        :rtype: str
+        :return: The text.
+        """
+        connections = sorted(self.connections.items())
+        labels = {key: f'port="{key[0]}",source="{key[1]}"' for key, _ in connections}
+        lines = ['# TYPE mitm_bytes_total counter']
+        lines += [f'mitm_bytes_total{{{labels[key]}}} {metrics.bytes}' for key, metrics in connections]
+        lines.append('# TYPE mitm_reads_total counter')
+        lines += [f'mitm_reads_total{{{labels[key]}}} {metrics.reads}' for key, metrics in connections]
+        lines.append('# TYPE mitm_queue_depth gauge')
+        lines += [f'mitm_queue_depth{{{labels[key]}}} {Queue.depth(metrics.port, metrics.destination)}'
+                  for key, metrics in connections]
+        lines.append('# TYPE mitm_packets_total counter')
+        for key, metrics in connections:
+            for packet_id, count in metrics.packets.most_common():
+                lines.append(f'mitm_packets_total{{{labels[key]},packet="{packet_name(packet_id)}"}} {count}')
+        for stage in STAGES:
+            lines.append(f'# TYPE mitm_{stage}_seconds histogram')
+            for key, metrics in connections:
+                histogram = getattr(metrics, stage)
+                total = 0
+                for bound, count in zip([*(f'{bound / 1e9:g}' for bound in BUCKETS), '+Inf'], histogram.counts):
+                    total += count
+                    lines.append(f'mitm_{stage}_seconds_bucket{{{labels[key]},le="{bound}"}} {total}')
+                lines.append(f'mitm_{stage}_seconds_sum{{{labels[key]}}} {histogram.sum / 1e9:g}')
+                lines.append(f'mitm_{stage}_seconds_count{{{labels[key]}}} {histogram.count}')
+        lines.append('# TYPE mitm_sessions_total counter')
+        lines += [f'mitm_sessions_total{{port="{port}"}} {count}' for port, count in sorted(self.sessions.items())]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, filename: str) -> None:
+        """
+        Write the metrics in a file, as JSON if its extension is .json, otherwise in the text format of Prometheus.
+
+        :type filename: str
+        :param filename: The file, it is overwritten.
+
+        :rtype: None
+        """
+        with open(filename, 'w') as file:
+            if filename.endswith('.json'):
+                dump(self.to_dict(), file, indent=2)
+            else:
+                file.write(self.prometheus())
+
+
+METRICS = Metrics()
@@ -7,24 +7,41 @@ can modify as you wish.
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from importlib import reload
+from collections import Counter
 from logging import debug
 from socket import socket
 from sys import exc_info
+from threading import Lock
+from time import perf_counter_ns
 from traceback import format_exception
+from typing import Optional
 
-import core.parser
-from core.hack import Hack
-from core.inject import Inject
-from core.queue import Queue
+from core.capture import Capture
+from core.framing import Reassembler
+from core.injector import Injector
+from core.lifecycle import shutdown
+from core.metrics import METRICS
+from core.pipeline import Pipeline
+from core.queue import Queue, session_key
+from core.reloader import PARSER
+from core.rules import RULES
+from core.statistics import TrafficStatistics
+from core.workers import Workers
 
 
 class Package:
     """
     Manage the packages. It could be receive, send and inject.
     """
+    pipeline: Optional[Pipeline] = None
+    capture: Optional[Capture] = None
+    injector: Optional[Injector] = None
+    workers: Optional[Workers] = None
+    traffic: Optional[TrafficStatistics] = None
+    coalesce_size: int = 65536
 
-    def __init__(self, is_server: bool, source: socket, destination: socket, port: int) -> None:
+    def __init__(self, is_server: bool, source: socket, destination: socket, port: int,
+                 session: Optional[tuple] = None) -> None:
         """
         Constructor which init the class.
 
@@ -40,6 +57,10 @@ class Package:
         :type port: int
         :param port: The number of the port for the communication.
 
+        :type session: tuple
+        :param session: The key of the session of the connection, see core.queue.session_key. One session for each port
+            by default.
+
         :rtype: Package
         :return: The object instanced of this class.
         """
@@ -48,65 +69,284 @@ class Package:
         self.source = source
         self.destination = destination
         self.port = port
+        self.session = session if session is not None else session_key(port)
+        self.reassembler = Reassembler()
+        self.messages = []
+        self.lock = Lock()
+
+        if self.is_server:
+            self.source_name = 'server'
+            self.destination_name = 'client'
+        else:
+            self.source_name = 'client'
+            self.destination_name = 'server'
+        self.queue = Queue.channel(self.session, self.destination_name)
+        self.metrics = METRICS.connection(port, self.source_name)
+        if self.injector is not None:
+            self.injector.register(self)
 
     def terminate(self) -> None:
         """
-        Stop the execution.
+        Stop the execution. The source is shut down, so a blocking recv returns at once.
 
         :rtype: None
         """
         self.running = False
+        shutdown(self.source)
 
-    def start(self) -> None:
+    def handle(self, data: bytes) -> list:
+        """
+        Inject and prepare the data received from the source. The sockets are not used, so the same hooks can be
+        driven by any engine. If there is a capture the received data is recorded before any injection. If the
+        connection is being profiled the profile runs while the data is handled.
+
+        :type data: bytes
+        :param data: Raw data received from the source.
+
+        :rtype: list
+        :return: The buffers which must be sent to the destination, in order.
+        """
+        metrics = self.metrics
+        metrics.bytes += len(data)
+        metrics.reads += 1
+        profiler = metrics.profiler
+        if profiler is not None:
+            profiler.enable()
+        if self.capture is not None:
+            self.capture.write(self.port, self.is_server, data)
+
+        buffers = []
+        try:
+            start = perf_counter_ns()
+            data = self.inject_data(data)
+            metrics.inject.observe(perf_counter_ns() - start)
+            buffers += self.drain_queue()
+        except Exception as e:
+            self._error(e, data)
+        buffers.append(data)
+        self.submit(data)
+        if profiler is not None:
+            profiler.disable()
+        return buffers
+
+    def submit(self, data: bytes) -> None:
         """
-        Handle the packages.
+        Parse the data. If there are worker processes or a pipeline the data is parsed by them, otherwise it is parsed
+        here.
+
+        :type data: bytes
+        :param data: Raw data.
 
         :rtype: None
         """
-        if self.is_server:
-            source = 'server'
-            destination = 'client'
-            queue = Queue.CLIENT_QUEUE
+        if self.workers is not None:
+            self.workers.put(self.session, self.is_server, data)
+        elif self.pipeline is None:
+            self.messages = self.parse(data)
         else:
-            source = 'client'
-            destination = 'server'
-            queue = Queue.SERVER_QUEUE
-
-        inject = Inject()
-
-        while self.running:
-            data: bytes = self.source.recv(4096)
-            if data:
-                try:
-                    data = inject.run(data, destination)
-
-                    if len(Queue.HACKS):
-                        target, retries = Queue.HACKS.pop(0)
-                        if target.lower() == Hack.fire_balls.lower():
-                            inject.get_fire_balls(retries)
-
-                    if len(queue) > 0:
-                        packet: bytes = queue.pop(0)
-                        message = f'--*-- Send to {destination}: {packet.hex()}'
-                        print(message)
-                        debug(message)
-                        self.destination.sendall(packet)
-
-                    reload(core.parser)
-                    parse = core.parser.Parse(data)
-
-                    if self.is_server:
-                        parse.server(self.port)
-                    else:
-                        parse.client(self.port)
-
-                except Exception as e:
-                    error_type, value, traceback = exc_info()
-                    message = f'ERROR: {source}[{self.port}]: {e}\n' \
-                              f'{"".join(format_exception(error_type, value, traceback))}' \
-                              f'  -> {data.hex()}\n' \
-                              f'\n\n'
-                    print(message)
-                    debug(message)
-                self.destination.sendall(data)
-        self.source.close()
+            self.pipeline.put(self.parse, data, self.resync)
+
+    def inject_data(self, data: bytes) -> bytes:
+        """
+        Apply the rules of the packet at the start of the data, see core.rules.
+
+        :type data: bytes
+        :param data: Raw data received from the source.
+
+        :rtype: bytes
+        :return: The injected data.
+        """
+        return RULES.apply(self.destination_name, data)
+
+    def drain_queue(self) -> list:
+        """
+        Take all the packages queued for the destination of this connection.
+
+        :rtype: list
+        :return: The packages which must be sent before the data.
+        """
+        packets = self.queue.drain()
+        for packet in packets:
+            message = f'--*-- Send to {self.destination_name}: {packet.hex()}'
+            print(message)
+            debug(message)
+        return packets
+
+    def flush_queue(self) -> None:
+        """
+        Send the packages queued for the destination without waiting for data from the source. The queue is drained
+        inside the lock of the destination, so the packages are sent in the order which they were queued. Nothing is
+        sent when the connection is finished.
+
+        :rtype: None
+        """
+        with self.lock:
+            if self.running:
+                self._send(self.drain_queue())
+
+    def forward(self, data: bytes) -> None:
+        """
+        Handle the data received from the source and send it. The lock of the destination is held from the drain of
+        the queue in handle to the send, so the injector does not send the packages queued later before them.
+
+        :type data: bytes
+        :param data: Raw data received from the source.
+
+        :rtype: None
+        """
+        with self.lock:
+            self._send(self.handle(data))
+
+    def coalesce(self, buffers: list) -> list:
+        """
+        Join the consecutive buffers up to the coalesce size, so the injected packages and the forwarded data are sent
+        with one syscall. A buffer bigger than the size is sent alone. The syscalls saved are counted in the queue of
+        the destination.
+
+        :type buffers: list
+        :param buffers: Raw data.
+
+        :rtype: list
+        :return: The joined buffers, in order.
+        """
+        if len(buffers) < 2 or self.coalesce_size <= 0:
+            self.queue.sends += len(buffers)
+            return buffers
+
+        batches = []
+        batch = []
+        size = 0
+        for buffer in buffers:
+            if batch and size + len(buffer) > self.coalesce_size:
+                batches.append(b''.join(batch) if len(batch) > 1 else batch[0])
+                batch = []
+                size = 0
+            batch.append(buffer)
+            size += len(buffer)
+        batches.append(b''.join(batch) if len(batch) > 1 else batch[0])
+
+        self.queue.sends += len(batches)
+        self.queue.saved += len(buffers) - len(batches)
+        return batches
+
+    def _send(self, buffers: list) -> None:
+        """
+        Send the buffers to the destination. The lock must be acquired.
+
+        :type buffers: list
+        :param buffers: Raw data.
+
+        :rtype: None
+        """
+        if not buffers:
+            return
+        start = perf_counter_ns()
+        for buffer in self.coalesce(buffers):
+            self.destination.sendall(buffer)
+        self.metrics.send.observe(perf_counter_ns() - start)
+
+    def parse(self, data: bytes) -> list:
+        """
+        Parse the data to display the useful information. The data is appended to the stream of the connection, so a
+        message split between two reads is parsed once it is complete.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: list
+        :return: The ID and the size of each complete message, the ID is None for the unknown data.
+        """
+        messages = []
+        start = perf_counter_ns()
+        try:
+            parse = PARSER.get()(self.reassembler.feed(data))
+
+            if self.is_server:
+                parse.server(self.port, self.session)
+            else:
+                parse.client(self.port, self.session)
+
+            consumed = parse.consumed
+            messages = parse.messages
+            self.metrics.packets.update(parse.packets)
+            del parse
+            self.metrics.parse.observe(perf_counter_ns() - start)
+            if self.traffic is not None:
+                self.traffic.add(self.is_server, Counter(messages))
+            discarded = self.reassembler.consume(consumed)
+            if discarded:
+                message = f'--*-- Discard {discarded} bytes from {self.source_name}[{self.port}]: incomplete message'
+                print(message)
+                debug(message)
+
+        except Exception as e:
+            self.reassembler.consume(self.reassembler.pending)
+            self._error(e, data)
+        return messages
+
+    def resync(self) -> None:
+        """
+        Discard the pending data of the stream, a read was not parsed so the next read does not complete it.
+
+        :rtype: None
+        """
+        discarded = self.reassembler.pending
+        self.reassembler.consume(discarded)
+        message = f'--*-- Resync {self.source_name}[{self.port}]: a read was dropped, discard {discarded} bytes'
+        print(message)
+        debug(message)
+
+    def release(self) -> None:
+        """
+        Forget the stream of the connection in the workers, it does not receive more data.
+
+        :rtype: None
+        """
+        if self.workers is not None:
+            self.workers.release(self.session, self.is_server)
+
+    def _error(self, e: Exception, data: bytes) -> None:
+        """
+        Display the error and the data which produced it.
+
+        :type e: Exception
+        :param e: The exception raised.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: None
+        """
+        error_type, value, traceback = exc_info()
+        message = f'ERROR: {self.source_name}[{self.port}]: {e}\n' \
+                  f'{"".join(format_exception(error_type, value, traceback))}' \
+                  f'  -> {data.hex()}\n' \
+                  f'\n\n'
+        print(message)
+        debug(message)
+
+    def start(self) -> None:
+        """
+        Handle the packages. When the source or the destination is closed the destination is shut down, so the other
+        direction of the connection stops too, and the package is removed from the injector and the workers.
+
+        :rtype: None
+        """
+        try:
+            while self.running:
+                data: bytes = self.source.recv(4096)
+                if not data:
+                    break
+                self.forward(data)
+        except OSError as e:
+            if self.running:
+                message = f'ERROR: {self.source_name}[{self.port}]: {e}'
+                print(message)
+                debug(message)
+        finally:
+            self.running = False
+            if self.injector is not None:
+                self.injector.unregister(self)
+            self.release()
+            shutdown(self.destination)
+            self.source.close()
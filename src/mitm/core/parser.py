@@ -4,14 +4,28 @@
 Parse the raw data. It is an intent of analyze the patterns for print useful information.
 The patterns which are not discovered yet, will show the raw data in hexadecimal.
 
+The fields of each message are declared in core.protocol, its compiled decoder reads them and the handler of this class
+receives the values to update the world of its session and queue the hacks. The values are kept as events and the
+methods _show_* build the text only when the events are shown. In a worker process (core.workers) the parse is
+detached: it only decodes the events, and the main process runs their handlers with apply.
+
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
 from datetime import datetime
-from logging import basicConfig, DEBUG, debug
-from struct import unpack, pack
+from logging import debug
+from re import Pattern
+from struct import Struct, pack
+from typing import Optional
+
+from core.batch import Batch, decode as decode_batch, run_length
+from core.events import Event, OFF, AUTO, ON, UNKNOWN, VERBOSITY
+from core.framing import Incomplete
+from core.protocol import PROTOCOL
+from core.queue import Queue, session_key
+from core.world import World, WORLDS
 
-from core.queue import Queue
+USHORT = Struct('<H')
 
 
 class Parse:
@@ -24,495 +38,865 @@ class Parse:
         Constructor which init the class.
 
         :type data: bytes
-        :param data: Raw data.
+        :param data: Raw data. It could be a memoryview of the buffer of the connection.
 
         :rtype: None
         """
-        basicConfig(filename='./debug.log', filemode='a', level=DEBUG, format='%(message)s')
-        self.message = ''
-        self.should_display_message = False
-        self.show_data = False
+        self.events = []
+        self.direction = ''
+        self.unknown = False
+        self.detached = False
         self.data_original: bytes = data
-        self.data: bytes = data
+        self.data = memoryview(data)
+        self.size = len(self.data)
+        self.offset = 0
+        self.consumed = 0
+        self.messages = []
+        self.packets = {}
+        self.port = 0
+        self.session = session_key(0)
 
-    def _get_number_int_unsigned(self) -> int:
+    def _client_position(self, *position) -> None:
         """
-        Convert Raw data to int unsigned number.
+        Get the position of your player.
 
-        :rtype: int
-        :return: Return the extracted value.
+        :type position: tuple
+        :param position: The values of the position, see _show_position.
+
+        :rtype: None
         """
-        return unpack('<I', self._get_data(4))[0]
+        self.world.locate(*position[:3])
 
-    def _get_number_short_unsigned(self) -> int:
+    def _client_item(self, idx: int) -> None:
         """
-        Convert Raw data to short unsigned number.
+        Get the information when your character pick up the items, the server confirms it with the recollection.
+
+        :type idx: int
+        :param idx: ID of the item.
 
-        :rtype: int
-        :return: Return the extracted value.
+        :rtype: None
         """
-        return unpack('<H', self._get_data(2))[0]
+        self.world.request(idx)
 
-    def _get_data(self, size: int) -> bytes:
+    def _general_weapon_slot(self, weapon_slot: int) -> None:
         """
-        Split the data in two parts.
-        The first one is returned the second is updated in the global data.
+        Reload the weapon when it is changed.
 
-        :type size: int
-        :param size: Size of data which will split.
+        :type weapon_slot: int
+        :param weapon_slot: The slot of the weapon starting in zero.
 
-        :rtype: bytes
-        :return: The split data.
+        :rtype: None
         """
-        data = self.data[:size]
-        self.data = self.data[size:]
-        return data
+        Queue.send(self.session, 'server', b'\x72\x6C')
 
-    def _general_position(self) -> None:
+    def _server_my_position(self, *values) -> None:
         """
-        Get the position with AXIS (x,y,z) and the camera view.
+        Get the positions of my character.
+
+        :type values: tuple
+        :param values: The values of the character position, a second position and the ID #3.
 
         :rtype: None
         """
-        x, y, z, = unpack('<fff', self._get_data(4 * 3))
-        view = self.data[:4]
-        self._get_data(4)
-        view_limit, dy, dx = unpack('<hbb', self._get_data(4))
-        message = f'{x:10.2f} X | {y:10.2f} Y | {z:10.2f} Z | Direction X: {dx:4} | Y: {dy:4} | ' \
-                  f'View: {view.hex()} | View limit: {view_limit}'
+        self.world.locate(*values[1:4], values[0])
 
-        self.message += f'    |-> {message}\n'
+    def _server_my_position_batch(self, batch: Batch) -> None:
+        """
+        Get a run of positions of my character.
+
+        :type batch: Batch
+        :param batch: The columns of the positions.
 
-    def _client_position(self) -> None:
+        :rtype: None
         """
-        Get the position of your player.
+        values = batch.row()
+        world = self.world
+        world.move_many(batch.values('idx'), batch.values('x'), batch.values('y'), batch.values('z'))
+        world.locate(*values[1:4], values[0])
+
+    def _server_character_position(self, idx: int, *values) -> None:
+        """
+        Get the positions of the character.
+
+        :type idx: int
+        :param idx: ID of the character.
+
+        :type values: tuple
+        :param values: The values of the position, see _show_position, and the ID #2.
 
         :rtype: None
         """
-        self.message += f'  |-> My Position\n'
-        self._general_position()
+        self.world.move(idx, *values[:3])
 
-    def _client_shoot(self) -> None:
+    def _server_character_position_batch(self, batch: Batch) -> None:
         """
-        Get the information when the your character shoots.
+        Get a run of positions of the characters.
+
+        :type batch: Batch
+        :param batch: The columns of the positions.
 
         :rtype: None
         """
-        length = self._get_number_short_unsigned()
-        name, = unpack('%ds' % length, self._get_data(length))
-        name = str(name, 'UTF-8')
-        x, y, z = unpack('<fff', self._get_data(4 * 3))
+        self.world.move_many(batch.values('idx'), batch.values('x'), batch.values('y'), batch.values('z'))
 
-        self.message += f'  |-> Shoot\n'
-        self.message += f'    |-> Name: {name}\n'
-        self.message += f'    |-> Position: X: {x:{2}f} | Y: {y:{2}f} | Z: {z:{2}f}\n'
+    def _server_gun_shoot(self, weapon: str, bullets: int) -> None:
+        """
+        Reload the gun when it is empty.
 
-    def _client_shooting(self) -> None:
+        :type weapon: str
+        :param weapon: Name of the weapon.
+
+        :type bullets: int
+        :param bullets: Number of bullets left.
+
+        :rtype: None
+        """
+        if bullets == 0:
+            Queue.send(self.session, 'server', b'\x72\x6C')
+
+    def _server_init(self, idx: int, unknown_1: bytes, boolean: int, name: str, x: float, y: float, z: float,
+                     d: bytes, unknown_2: bytes, type_object: int) -> None:
         """
-        Get the information when the your character is shooting.
+        Server send initial information in some specific events during the game. The drops are requested to pick up.
+
+        :type idx: int
+        :param idx: ID of the object.
+
+        :type unknown_1: bytes
+        :param unknown_1: Raw data not discovered yet.
+
+        :type boolean: int
+        :param boolean: Flag not discovered yet.
+
+        :type name: str
+        :param name: Name of the object.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :type d: bytes
+        :param d: Raw data not discovered yet.
+
+        :type unknown_2: bytes
+        :param unknown_2: Raw data not discovered yet.
+
+        :type type_object: int
+        :param type_object: Type of the object.
 
         :rtype: None
         """
-        value, = unpack('<?', self._get_data(1))
+        self.world.spawn(idx, name, x, y, z, type_object)
 
-        self.message += f'  |-> Shooting\n'
-        self.message += f'    |-> Automatic: {value}\n'
+        # Auto loot
+        if 'Drop' in name:
+            pickup = pack('=HI', 0x6565, idx)
+            Queue.send(self.session, 'server', pickup)
+            self.world.request(idx)
+            pickup_message = f'--*-- Pickup the {name} -> ID: {idx} | Hex: {pickup.hex()}\n'
+            print(pickup_message)
+            debug(pickup_message)
 
-    def _client_jump(self) -> None:
+    def _server_item_recollection(self, name: str, amount: int) -> None:
         """
-        Get the information when the your character jumps.
+        Server confirms that an item was picked up.
+
+        :type name: str
+        :param name: Name of the item.
+
+        :type amount: int
+        :param amount: Amount of the item.
 
         :rtype: None
         """
-        ready, = unpack('<?', self._get_data(1))
+        self.world.pick_up(name)
+
+    def _server_health(self, idx: int, health: int) -> None:
+        """
+        Server send the health of a character.
+
+        :type idx: int
+        :param idx: ID of the character.
+
+        :type health: int
+        :param health: Health of the character.
 
-        self.message += f'  |-> Jump\n'
-        self.message += f'    |-> Ready: {ready}\n'
+        :rtype: None
+        """
+        self.world.health(idx, health)
 
-    def _client_item(self) -> None:
+    def _server_character_action(self, idx: int, action: str, status: bool) -> None:
         """
-        Get the information when your character pick up the items.
+        Server send information about the action of the character specific the NPC.
+
+        :type idx: int
+        :param idx: ID of the character.
+
+        :type action: str
+        :param action: Name of the action.
+
+        :type status: bool
+        :param status: Status of the action, None if it is not present.
 
         :rtype: None
         """
-        idx = self._get_number_int_unsigned()
+        self.world.action(idx, action)
 
-        self.message += f'  |-> Item\n'
-        self.message += f'    |-> ID: {idx}\n'
+    @staticmethod
+    def _show_position(x: float, y: float, z: float, view: bytes, view_limit: int, dy: int, dx: int) -> str:
+        """
+        Display the position with AXIS (x,y,z) and the camera view.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :type view: bytes
+        :param view: Raw data of the camera view.
+
+        :type view_limit: int
+        :param view_limit: Limit of the camera view.
 
-    def _general_weapon_slot(self) -> None:
+        :type dy: int
+        :param dy: Direction in the axis Y.
+
+        :type dx: int
+        :param dx: Direction in the axis X.
+
+        :rtype: str
+        :return: The text.
         """
-        Get the information when the weapon of your character is changed.
+        message = f'{x:10.2f} X | {y:10.2f} Y | {z:10.2f} Z | Direction X: {dx:4} | Y: {dy:4} | ' \
+                  f'View: {view.hex()} | View limit: {view_limit}'
+        return f'    |-> {message}\n'
 
-        :rtype: None
+    def _show_client_position(self, *position) -> str:
         """
-        weapon_slot, = unpack('<b', self._get_data(1))
+        Display the position of your player.
 
-        self.message += f'  |-> Weapon\n'
-        self.message += f'    |-> Slot: {weapon_slot + 1}\n'
-        Queue.SERVER_QUEUE.append(b'\x72\x6C')
+        :type position: tuple
+        :param position: The values of the position, see _show_position.
 
-    def _client_weapon_reload(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Get the information when the weapon of your character is reloaded.
+        return f'  |-> My Position\n' + self._show_position(*position)
 
-        :rtype: None
+    @staticmethod
+    def _show_client_shoot(name: str, x: float, y: float, z: float) -> str:
         """
-        self.message += f'  |-> Weapon Reload\n'
+        Display the information when the your character shoots.
+
+        :type name: str
+        :param name: Name of the weapon.
+
+        :type x: float
+        :param x: Position in the axis X.
 
-    def _server_weapon_reload(self) -> None:
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: str
+        :return: The text.
         """
-        Get the information when the weapon of your character is reloaded.
+        return f'  |-> Shoot\n' \
+               f'    |-> Name: {name}\n' \
+               f'    |-> Position: X: {x:{2}f} | Y: {y:{2}f} | Z: {z:{2}f}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_client_shooting(value: bool) -> str:
         """
-        weapon_length = self._get_number_short_unsigned()
-        weapon = str(self.data[:weapon_length], 'UTF-8')
-        self._get_data(weapon_length)
-        ammo_length = self._get_number_short_unsigned()
-        ammo = str(self.data[:ammo_length], 'UTF-8')
-        self._get_data(ammo_length)
-        bullets = self._get_number_int_unsigned()
+        Display the information when the your character is shooting.
 
-        self.message += f'  |-> Weapon Reload\n'
-        self.message += f'    |-> Name: {weapon}\n'
-        self.message += f'    |-> Ammo: {ammo}\n'
-        self.message += f'    |-> Bullets: {bullets}\n'
+        :type value: bool
+        :param value: True if the shoot is automatic.
 
-    def _client_quest_selected(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Get the information when you change the quest.
+        return f'  |-> Shooting\n' \
+               f'    |-> Automatic: {value}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_client_jump(ready: bool) -> str:
         """
-        length = self._get_number_short_unsigned()
-        name = self.data[:length]
-        name = str(name, 'UTF-8')
-        self._get_data(length)
+        Display the information when the your character jumps.
 
-        self.message += f'  |-> Quest Selected\n'
-        self.message += f'    |-> Name: {name}\n'
+        :type ready: bool
+        :param ready: True when the jump starts.
 
-    def _general_constant_information(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Send constant information to the server.
+        return f'  |-> Jump\n' \
+               f'    |-> Ready: {ready}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_client_item(idx: int) -> str:
         """
-        unknown_1 = self.data[:2]
-        self._get_data(2)
-        length, = unpack('<b', self._get_data(1))
-        unknown_2 = self.data[:length]
-        self._get_data(length)
+        Display the information when your character pick up the items.
 
-        self.message += f'  |-> Constant Information\n'
-        self.message += f'    |-> Unknown #1: {unknown_1.hex()}\n'
-        self.message += f'    |-> Unknown #2: {unknown_2.hex()}\n'
+        :type idx: int
+        :param idx: ID of the item.
 
-    def _server_my_position(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Get the positions of my character.
+        return f'  |-> Item\n' \
+               f'    |-> ID: {idx}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_general_weapon_slot(weapon_slot: int) -> str:
+        """
+        Display the information when the weapon of your character is changed.
+
+        :type weapon_slot: int
+        :param weapon_slot: The slot of the weapon starting in zero.
+
+        :rtype: str
+        :return: The text.
         """
-        self.message += f'  |-> My Character\n'
-        self._server_character_position()
-        self._general_position()
-        idx_3 = self._get_number_int_unsigned()
-        self.message += f'    |-> ID #3: {idx_3}\n'
+        return f'  |-> Weapon\n' \
+               f'    |-> Slot: {weapon_slot + 1}\n'
 
-    def _server_character_position(self) -> None:
+    @staticmethod
+    def _show_client_weapon_reload() -> str:
         """
-        Get the positions of the character.
+        Display the information when the weapon of your character is reloaded.
 
-        :rtype: None
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Weapon Reload\n'
+
+    @staticmethod
+    def _show_server_weapon_reload(weapon: str, ammo: str, bullets: int) -> str:
         """
-        idx = self._get_number_int_unsigned()
+        Display the information when the weapon of your character is reloaded.
 
-        self.message += f'  |-> Character Position\n'
-        self.message += f'    |-> ID #1: {idx}\n'
-        self._general_position()
-        idx_2 = self._get_number_int_unsigned()
-        self.message += f'    |-> ID #2: {idx_2}\n'
+        :type weapon: str
+        :param weapon: Name of the weapon.
 
-    def _server_monsters_list(self) -> None:
+        :type ammo: str
+        :param ammo: Name of the ammo.
+
+        :type bullets: int
+        :param bullets: Number of bullets.
+
+        :rtype: str
+        :return: The text.
         """
-        Server send the list of monsters.
+        return f'  |-> Weapon Reload\n' \
+               f'    |-> Name: {weapon}\n' \
+               f'    |-> Ammo: {ammo}\n' \
+               f'    |-> Bullets: {bullets}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_client_quest_selected(name: str) -> str:
         """
-        idx = self._get_number_int_unsigned()
+        Display the information when you change the quest.
 
-        self.message += f'  |-> Monster List\n'
-        self.message += f'    |-> ID: {idx}\n'
+        :type name: str
+        :param name: Name of the quest.
 
-    def _server_gun_shoot(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Server send the information of the gun shoot.
+        return f'  |-> Quest Selected\n' \
+               f'    |-> Name: {name}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_general_constant_information(unknown_1: bytes, unknown_2: bytes) -> str:
         """
-        length = self._get_number_short_unsigned()
-        weapon = self.data[:length]
-        weapon = str(weapon, 'UTF-8')
-        self._get_data(length)
-        bullets = self._get_number_int_unsigned()
+        Display the constant information.
 
-        self.message += f'  |-> Gun Shoot\n'
-        self.message += f'    |-> Name: {weapon}\n'
-        self.message += f'    |-> Bullets: {bullets}\n'
-        if bullets == 0:
-            Queue.SERVER_QUEUE.append(b'\x72\x6C')
+        :type unknown_1: bytes
+        :param unknown_1: Raw data not discovered yet.
 
-    def _server_magic_shoot(self) -> None:
+        :type unknown_2: bytes
+        :param unknown_2: Raw data not discovered yet.
+
+        :rtype: str
+        :return: The text.
         """
-        Server send the information of the magic shoot.
+        return f'  |-> Constant Information\n' \
+               f'    |-> Unknown #1: {unknown_1.hex()}\n' \
+               f'    |-> Unknown #2: {unknown_2.hex()}\n'
 
-        :rtype: None
+    def _show_server_my_position(self, *values) -> str:
         """
-        counter = self._get_number_int_unsigned()
+        Display the positions of my character.
 
-        self.message += f'  |-> Magic Shoot\n'
-        self.message += f'    |-> Counter: {counter}\n'
+        :type values: tuple
+        :param values: The values of the character position, a second position and the ID #3.
 
-    def _server_constant_information(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Server send constant information.
+        return f'  |-> My Character\n' + \
+            self._show_server_character_position(*values[:9]) + \
+            self._show_position(*values[9:16]) + \
+            f'    |-> ID #3: {values[16]}\n'
 
-        :rtype: None
+    def _show_server_my_position_batch(self, batch: Batch) -> str:
         """
-        data = self.data[:32]
-        # print(f'_server_constant_information: {data.hex()}')
-        self._get_data(32)
+        Display a run of positions of my character, only the last one.
 
-        self.message += f'  |-> Constant Information\n'
-        self.message += f'    |-> Counter: {data.hex()}\n'
+        :type batch: Batch
+        :param batch: The columns of the positions.
 
-    def _server_init(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Server send initial information in some specific events during the game.
+        values = batch.row()
+        return f'  |-> My Character x{batch.count}\n' \
+               f'    |-> ID #1: {values[0]}\n' + \
+            self._show_position(*values[1:8])
 
-        :rtype: None
+    def _show_server_character_position(self, idx: int, *values) -> str:
         """
-        idx = self._get_number_int_unsigned()
-        unknown_1 = self.data[:4]
-        self._get_data(4)
-        boolean, = unpack('<b', self._get_data(1))
-        length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
-        x, y, z, = unpack('<fff', self._get_data(12))
-        d1 = self.data[:1]
-        d2 = self.data[1:2]
-        d3 = self.data[2:3]
-        d4 = self.data[3:4]
-        self._get_data(4)
-        unknown_2 = self.data[:2]
-        self._get_data(2)
-        type_object = self._get_number_int_unsigned()
+        Display the positions of the character.
 
-        # Auto loot
-        if 'Drop' in name:
-            pickup = pack('=HI', 0x6565, idx)
-            Queue.SERVER_QUEUE.append(pickup)
-            pickup_message = f'--*-- Pickup the {name} -> ID: {idx} | Hex: {pickup.hex()}\n'
-            print(pickup_message)
-            debug(pickup_message)
+        :type idx: int
+        :param idx: ID of the character.
+
+        :type values: tuple
+        :param values: The values of the position, see _show_position, and the ID #2.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Character Position\n' \
+               f'    |-> ID #1: {idx}\n' + \
+            self._show_position(*values[:7]) + \
+            f'    |-> ID #2: {values[7]}\n'
+
+    @staticmethod
+    def _show_server_character_position_batch(batch: Batch) -> str:
+        """
+        Display a run of positions of the characters.
+
+        :type batch: Batch
+        :param batch: The columns of the positions.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Character Position x{batch.count}\n' \
+               f'    |-> IDs: {" ".join(map(str, batch.values("idx")))}\n'
+
+    @staticmethod
+    def _show_server_monsters_list(idx: int) -> str:
+        """
+        Display the list of monsters.
+
+        :type idx: int
+        :param idx: ID of the monster.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Monster List\n' \
+               f'    |-> ID: {idx}\n'
 
+    @staticmethod
+    def _show_server_gun_shoot(weapon: str, bullets: int) -> str:
+        """
+        Display the information of the gun shoot.
+
+        :type weapon: str
+        :param weapon: Name of the weapon.
+
+        :type bullets: int
+        :param bullets: Number of bullets left.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Gun Shoot\n' \
+               f'    |-> Name: {weapon}\n' \
+               f'    |-> Bullets: {bullets}\n'
+
+    @staticmethod
+    def _show_server_magic_shoot(counter: int) -> str:
+        """
+        Display the information of the magic shoot.
+
+        :type counter: int
+        :param counter: Counter of the magic.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Magic Shoot\n' \
+               f'    |-> Counter: {counter}\n'
+
+    @staticmethod
+    def _show_server_constant_information(data: bytes) -> str:
+        """
+        Display the constant information of the server.
+
+        :type data: bytes
+        :param data: Raw data not discovered yet.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Constant Information\n' \
+               f'    |-> Counter: {data.hex()}\n'
+
+    @staticmethod
+    def _show_server_init(idx: int, unknown_1: bytes, boolean: int, name: str, x: float, y: float, z: float,
+                          d: bytes, unknown_2: bytes, type_object: int) -> str:
+        """
+        Display the initial information, see _server_init.
+
+        :rtype: str
+        :return: The text.
+        """
         message = f'ID: {idx:<{5}} | True: {boolean} | Type: {type_object:<{5}} | ' \
                   f'{unknown_1.hex()} {unknown_2.hex()} | ' \
-                  f'{x:10.2f} X | {y:10.2f} Y | {z:10.2f} Z | D: {d1.hex()} {d2.hex()} {d3.hex()} {d4.hex()} | ' \
-                  f'{name}'
-        self.message += f'  |-> Init Information\n'
-        self.message += f'    |-> {message}\n'
+                  f'{x:10.2f} X | {y:10.2f} Y | {z:10.2f} Z | D: {d[:1].hex()} {d[1:2].hex()} {d[2:3].hex()} ' \
+                  f'{d[3:4].hex()} | {name}'
+        return f'  |-> Init Information\n' \
+               f'    |-> {message}\n'
 
-    def _server_health(self) -> None:
+    @staticmethod
+    def _show_server_health(idx: int, health: int) -> str:
         """
-        Server send initial information in some specific events during the game.
+        Display the health of a character.
 
-        :rtype: None
+        :type idx: int
+        :param idx: ID of the character.
+
+        :type health: int
+        :param health: Health of the character.
+
+        :rtype: str
+        :return: The text.
+        """
+        return f'  |-> Health\n' \
+               f'    |-> Character: {idx}\n' \
+               f'    |-> Health: {health}\n'
+
+    @staticmethod
+    def _show_server_character_action(idx: int, action: str, status: bool) -> str:
         """
-        idx, health, = unpack('<Ii', self._get_data(8))
+        Display the action of the character specific the NPC.
 
-        self.message += f'  |-> Health\n'
-        self.message += f'    |-> Character: {idx}\n'
-        self.message += f'    |-> Health: {health}\n'
+        :type idx: int
+        :param idx: ID of the character.
 
-    def _server_character_action(self) -> None:
+        :type action: str
+        :param action: Name of the action.
+
+        :type status: bool
+        :param status: Status of the action, None if it is not present.
+
+        :rtype: str
+        :return: The text.
         """
-        Server send information about the action of the character specific the NPC.
+        return f'  |-> Action\n' \
+               f'    |-> Character: {idx} | {action} | {status}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_server_item(name: str, amount: int) -> str:
         """
-        status = None
-        idx, length, = unpack('<IH', self._get_data(6))
-        action = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
-        if len(self.data) > 0:
-            last_digit = self.data[:1].hex()
-            if last_digit in ('00', '01'):
-                status, = unpack('<?', self._get_data(1))
+        Display the information about the item.
+
+        :type name: str
+        :param name: Name of the item.
 
-        self.message += f'  |-> Action\n'
-        self.message += f'    |-> Character: {idx} | {action} | {status}\n'
+        :type amount: int
+        :param amount: Amount of the item.
 
-    def _server_item(self) -> None:
+        :rtype: str
+        :return: The text.
         """
-        Server send information about the item.
+        return f'  |-> Item\n' \
+               f'    |-> Name: {name}\n' \
+               f'    |-> Amount: {amount}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_server_item_recollection(name: str, amount: int) -> str:
         """
-        length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
-        amount = self._get_number_int_unsigned()
+        Display the information about the item recollected.
 
-        self.message += f'  |-> Item\n'
-        self.message += f'    |-> Name: {name}\n'
-        self.message += f'    |-> Amount: {amount}\n'
+        :type name: str
+        :param name: Name of the item.
 
-    def _server_item_recollection(self) -> None:
+        :type amount: int
+        :param amount: Amount of the item.
+
+        :rtype: str
+        :return: The text.
         """
-        Server send information about the item recollected.
+        return f'  |-> Item Recollected\n' \
+               f'    |-> Name: {name}\n' \
+               f'    |-> Amount: {amount}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_server_character_events(idx: int, name: str, data: bytes) -> str:
         """
-        length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
-        amount = self._get_number_int_unsigned()
+        Display the information about the characters events.
 
-        self.message += f'  |-> Item Recollected\n'
-        self.message += f'    |-> Name: {name}\n'
-        self.message += f'    |-> Amount: {amount}\n'
+        :type idx: int
+        :param idx: ID of the character.
 
-    def _server_character_events(self) -> None:
+        :type name: str
+        :param name: Name of the event.
+
+        :type data: bytes
+        :param data: Raw data not discovered yet.
+
+        :rtype: str
+        :return: The text.
         """
-        Server send information about the characters events.
+        value = int.from_bytes(data, 'little')
+        return f'  |-> Character Event\n' \
+               f'    |-> Character: {idx}\n' \
+               f'    |-> Event: {name}\n' \
+               f'    |-> Unknown #1: {data.hex()} = {value}\n'
 
-        :rtype: None
+    @staticmethod
+    def _show_unknown(unknown_data: bytes) -> str:
         """
-        idx = self._get_number_int_unsigned()
-        length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
-        data = self.data[:4]
-        value = self._get_number_int_unsigned()
+        Display the data which has not a known pattern.
+
+        :type unknown_data: bytes
+        :param unknown_data: Raw data without a known pattern.
 
-        self.message += f'  |-> Character Event\n'
-        self.message += f'    |-> Character: {idx}\n'
-        self.message += f'    |-> Event: {name}\n'
-        self.message += f'    |-> Unknown #1: {data.hex()} = {value}\n'
+        :rtype: str
+        :return: The text.
+        """
+        return f'|-> Unknown ---> Hex: {unknown_data.hex()}\n' \
+               f'|-> Unknown ---> Raw: {unknown_data}\n' \
+               f'|-> -----------------\n'
 
-    def client(self, port: int) -> None:
+    @property
+    def world(self) -> World:
+        """
+        World of the session of the data.
+
+        :rtype: World
+        :return: The world.
+        """
+        return WORLDS.get(self.session)
+
+    def client(self, port: int, session: Optional[tuple] = None) -> None:
         """
         Start to parse the data of the client.
 
         :type port: int
         :param port: The number of the port of the communication.
 
+        :type session: tuple
+        :param session: The key of the session where the hacks are queued, one session for each port by default.
+
         :rtype: None
         """
-        ids = {
-            15729: self._client_quest_selected,  # 0x713D
-            15731: self._general_weapon_slot,  # 0x733D
-            25957: self._client_item,  # 0x6565
-            26922: self._client_shoot,  # 0x2A69
-            27762: self._client_weapon_reload,  # 0x726C
-            28778: self._client_jump,  # 0x6A70
-            29286: self._client_shooting,  # 0x6672
-            30317: self._client_position,  # 0x6D76
-            788: self._general_constant_information,  # 0x1403
-            789: self._general_constant_information,  # 0x1503
-            790: self._general_constant_information,  # 0x1603
-            791: self._general_constant_information,  # 0x1703
-        }
-
-        self.message += f'Client -> Server [{port}]: {datetime.now()}\n'
-        self._parse(ids)
-
-    def server(self, port: int) -> None:
+        self.port = port
+        self.session = session if session is not None else session_key(port)
+        self.direction = 'Client -> Server'
+        self._parse(CLIENT, CLIENT_RESYNC, CLIENT_BATCH)
+
+    def server(self, port: int, session: Optional[tuple] = None) -> None:
         """
         Start to parse the data of the server.
 
         :type port: int
         :param port: The number of the port of the communication.
 
+        :type session: tuple
+        :param session: The key of the session where the hacks are queued, one session for each port by default.
+
         :rtype: None
         """
-        self.data = self.data[:-2]
-        self.data_original = self.data_original[:-2]
         if len(self.data) == 0:
             return
 
-        ids = {
-            11051: self._server_health,  # 0x2b2b
-            15731: self._general_weapon_slot,  # 0x733D
-            24940: self._server_gun_shoot,  # 0x6c61
-            24941: self._server_magic_shoot,  # 0x6d61
-            27501: self._server_init,  # 0x6d6b
-            27762: self._server_weapon_reload,  # 0x726C
-            28771: self._server_item_recollection,  # 0x6370
-            28784: self._server_constant_information,  # 0x7070
-            29300: self._server_character_events,  # 0x7472
-            29552: self._server_character_position,  # 0x7073
-            29811: self._server_character_action,  # 0x7374
-            30317: self._server_my_position,  # 0x6d76
-            30840: self._server_monsters_list,  # 0x7878
-            788: self._general_constant_information,  # 0x1403
-            789: self._general_constant_information,  # 0x1503
-            790: self._general_constant_information,  # 0x1603
-            791: self._general_constant_information,  # 0x1703
-        }
-
-        self.message += f'Server -> Client [{port}]: {datetime.now()}\n'
-        self._parse(ids)
-
-    def _parse(self, ids: dict) -> None:
-        """
-        Start to parse the data.
+        self.port = port
+        self.session = session if session is not None else session_key(port)
+        self.direction = 'Server -> Client'
+        self._parse(SERVER, SERVER_RESYNC, SERVER_BATCH)
+
+    def _parse(self, ids: dict, resync: Pattern, batches: dict) -> None:
+        """
+        Start to parse the data. The parse stops before a message which is not complete, the number of bytes of the
+        complete messages is kept in the consumed attribute. The ID and the size of each message are kept in the
+        messages attribute and the number of messages of each ID in the packets attribute, the ID is None for the
+        unknown data. The runs of messages with a batch handler are decoded at once, only the server has them: the runs
+        of positions of the client are too short to pay the batch. The decoded values are kept as events, the handlers
+        only do the side effects.
 
         :type ids: dict
-        :param ids: List of the unique ID for each package.
+        :param ids: The decoder, the handler and the name for each unique ID of the package.
+
+        :type resync: Pattern
+        :param resync: Pattern of the known IDs, used to jump over the unknown data in one scan.
+
+        :type batches: dict
+        :param batches: The message and the batch handler for each ID decoded in runs.
 
         :rtype: None
         """
-        is_unknown = False
-        unknown_data = bytearray()
+        data = self.data
+        size = self.size
+        events = self.events
+        packets = self.packets
+        detached = self.detached
+
+        while self.offset < size - 1:
+            packet_id, = USHORT.unpack_from(data, self.offset)
+            entry = ids.get(packet_id)
+
+            if entry is None:
+                self.unknown = True
+                match = resync.search(data, self.offset + 1)
+                end = match.start() if match else size - 1
+                events.append(Event(UNKNOWN, (bytes(data[self.offset:end]),)))
+                self.messages.append((None, end - self.offset))
+                packets[None] = packets.get(None, 0) + 1
+                self.offset = end
+                continue
 
-        while len(self.data) > 1:
-            packet_id, = unpack('<H', self.data[:2])
+            batch = batches.get(packet_id)
+            if batch is not None:
+                message, batch_handler = batch
+                count = run_length(message, data, self.offset, size)
+                if count:
+                    values = decode_batch(message, data, self.offset, count)
+                    self.messages.extend([(packet_id, message.record.size)] * count)
+                    packets[packet_id] = packets.get(packet_id, 0) + count
+                    events.append(Event(message.name, (values,), True))
+                    if not detached:
+                        batch_handler(self, values)
+                    self.offset += count * message.record.size
+                    continue
+
+            decode, handler, name = entry
+            start = self.offset
+            try:
+                values, self.offset = decode(data, start + 2, size)
+            except Incomplete:
+                break
+            self.messages.append((packet_id, self.offset - start))
+            packets[packet_id] = packets.get(packet_id, 0) + 1
+            events.append(Event(name, values))
+            if handler is not None and not detached:
+                handler(self, *values)
+
+        self.consumed = self.offset
+        if not detached:
+            self.display()
+
+    @classmethod
+    def restore(cls, session: tuple, is_server: bool, events: list, unknown: bool, data: bytes) -> 'Parse':
+        """
+        Build the parse of the events decoded by a detached parse, so they are applied in this process.
+
+        :type session: tuple
+        :param session: The key of the session of the communication, its first value is the port.
+
+        :type is_server: bool
+        :param is_server: True for the data of the server.
+
+        :type events: list
+        :param events: The decoded events.
+
+        :type unknown: bool
+        :param unknown: True if the data has unknown patterns.
 
-            if packet_id not in ids:
-                is_unknown = True
-                self.should_display_message = True
-                unknown_data += self.data[:1]
-                self.data = self.data[1:]
-                if len(self.data) == 1:
-                    unknown_data += self.data
-                continue
+        :type data: bytes
+        :param data: The complete messages, only needed to show the data with unknown patterns, empty if it is unknown.
+
+        :rtype: Parse
+        :return: The parse with the events.
+        """
+        parse = cls(data)
+        parse.port = session[0]
+        parse.session = session
+        parse.direction = 'Server -> Client' if is_server else 'Client -> Server'
+        parse.events = events
+        parse.unknown = unknown
+        parse.consumed = len(data)
+        return parse
+
+    def apply(self) -> None:
+        """
+        Run the handlers of the events and display them.
+
+        :rtype: None
+        """
+        for event in self.events:
+            handler = HANDLERS.get((event.name, event.batch))
+            if handler is not None:
+                handler(self, *event.values)
+        self.display()
+
+    def display(self) -> None:
+        """
+        Print and log the events if some of them must be shown by its verbosity. By default the events are shown only
+        with the data which has unknown patterns.
+
+        :rtype: None
+        """
+        unknown = self.unknown and VERBOSITY.level(UNKNOWN) != OFF
+        forced = VERBOSITY.forced
+        if not unknown and not (forced and any(event.name in forced for event in self.events)):
+            return
 
-            if is_unknown:
-                is_unknown = False
-                self.show_data = True
-                self.message += f'|-> Unknown ---> Hex: {unknown_data.hex()}\n'
-                self.message += f'|-> Unknown ---> Raw: {unknown_data}\n'
-                self.message += f'|-> -----------------\n'
-                unknown_data = bytearray()
-
-            packet_id = self._get_number_short_unsigned()
-            ids.get(packet_id)()
-
-        if is_unknown:
-            self.show_data = True
-            self.message += f'|-> Unknown ---> Hex: {unknown_data.hex()}\n'
-            self.message += f'|-> Unknown ---> Raw: {unknown_data}\n'
-            self.message += f'|-> -----------------\n'
-
-        if self.should_display_message and len(self.message) > 20:
-            if self.show_data:
-                self.message += f'|-> Hex: {self.data_original.hex()}\n'
-                self.message += f'|-> Raw: {self.data_original}\n'
-            self.show_data = False
-            print(self.message)
-            debug(self.message)
+        message = self.render(unknown)
+        if message:
+            print(message)
+            debug(message)
+
+    def render(self, unknown: bool = False) -> str:
+        """
+        Build the text of the events by their verbosity.
+
+        :type unknown: bool
+        :param unknown: True to show the events with the verbosity 'auto' and the raw data.
+
+        :rtype: str
+        :return: The text, empty if there is not any event to show.
+        """
+        lines = [f'{self.direction} [{self.port}]: {datetime.now()}\n']
+        for event in self.events:
+            level = VERBOSITY.level(event.name)
+            if level == ON or (unknown and level == AUTO):
+                show = getattr(self, f'_show_{event.name}_batch' if event.batch else f'_show_{event.name}')
+                lines.append(show(*event.values))
+        if len(lines) == 1:
+            return ''
+
+        if unknown and self.consumed:
+            data = bytes(self.data[:self.consumed])
+            lines.append(f'|-> Hex: {data.hex()}\n')
+            lines.append(f'|-> Raw: {data}\n')
+        return ''.join(lines)
+
+
+CLIENT = PROTOCOL.table(PROTOCOL.client, Parse)
+SERVER = PROTOCOL.table(PROTOCOL.server, Parse)
+CLIENT_RESYNC = PROTOCOL.resync(PROTOCOL.client)
+SERVER_RESYNC = PROTOCOL.resync(PROTOCOL.server)
+CLIENT_BATCH = PROTOCOL.batches(PROTOCOL.client, Parse)
+SERVER_BATCH = PROTOCOL.batches(PROTOCOL.server, Parse)
+HANDLERS = {
+    **{(name, False): handler for _, handler, name in (*CLIENT.values(), *SERVER.values()) if handler is not None},
+    **{(message.name, True): handler for message, handler in (*CLIENT_BATCH.values(), *SERVER_BATCH.values())},
+}
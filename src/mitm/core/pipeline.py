@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Parse the packages out of the forwarding path. The data is forwarded first and a copy is sent to a bounded queue which
+is consumed by a worker thread. When the queue is full the oldest package is dropped, so a slow terminal never delays
+the traffic of the game. The stream of a dropped package has a gap, so its resync function is called before its next
+package is parsed, in the thread of the worker.
+"""
+from collections import deque
+from sys import exc_info
+from threading import Condition, Thread
+from traceback import format_exception
+from typing import Callable, Optional
+
+
+class Pipeline(Thread):
+    """
+    Worker which consumes the copies of the packages and parse them.
+    """
+
+    def __init__(self, size: int = 1024) -> None:
+        """
+        Constructor which init the class.
+
+        :type size: int
+        :param size: Maximum number of packages waiting to be parsed.
+
+        :rtype: Pipeline
+        :return: The object instanced of this class.
+        """
+        super(Pipeline, self).__init__()
+        self.name = 'Parse Pipeline'
+        self.daemon = True
+        self.size = size
+        self.dropped = 0
+        self.processed = 0
+        self._running = True
+        self._queue = deque(maxlen=size)
+        self._resync = set()
+        self._condition = Condition()
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of packages waiting to be parsed.
+
+        :rtype: int
+        :return: The length of the queue.
+        """
+        return len(self._queue)
+
+    def put(self, callback: Callable, data: bytes, resync: Optional[Callable] = None) -> None:
+        """
+        Add a package to the queue, if it is full the oldest one is dropped.
+
+        :type callback: Callable
+        :param callback: Function which parse the data.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :type resync: Callable
+        :param resync: Function which discards the pending data of the stream when one of its packages is dropped.
+
+        :rtype: None
+        """
+        with self._condition:
+            if len(self._queue) == self.size:
+                self.dropped += 1
+                _, _, dropped = self._queue[0]
+                if dropped is not None:
+                    self._resync.add(dropped)
+            self._queue.append((callback, bytes(data), resync))
+            self._condition.notify()
+
+    def terminate(self) -> None:
+        """
+        Stop the execution of the worker.
+
+        :rtype: None
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def run(self) -> None:
+        """
+        Parse the packages in the order which they were received.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                callback, data, resync = self._queue.popleft()
+                gap = resync in self._resync
+                self._resync.discard(resync)
+
+            try:
+                if gap:
+                    resync()
+                callback(data)
+            except Exception as e:
+                error_type, value, traceback = exc_info()
+                print(f'ERROR: Pipeline: {e}\n{"".join(format_exception(error_type, value, traceback))}')
+            self.processed += 1
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Declaration of the messages of Pwn Adventure 3 which are known. The opcode is the packet ID read as little endian
+unsigned short, the comment shows the bytes as they come in the network.
+
+To add a new message, register it here and add the method '_' + name in core.parser.Parse.
+"""
+from core.schema import Blob, Fixed, OptionalBool, Schema, String
+
+PROTOCOL = Schema()
+
+POSITION = ('fff4shbb', 'x', 'y', 'z', 'view', 'view_limit', 'dy', 'dx')
+
+# Client and server
+for opcode in (788, 789, 790, 791):  # 0x1403, 0x1503, 0x1603, 0x1703
+    PROTOCOL.register('both', opcode, 'general_constant_information', Fixed('2s', 'unknown_1'), Blob('unknown_2'))
+PROTOCOL.register('both', 15731, 'general_weapon_slot', Fixed('b', 'weapon_slot'))  # 0x733D
+
+# Client
+PROTOCOL.register('client', 15729, 'client_quest_selected', String('name'))  # 0x713D
+PROTOCOL.register('client', 25957, 'client_item', Fixed('I', 'idx'))  # 0x6565
+PROTOCOL.register('client', 26922, 'client_shoot', String('name'), Fixed('fff', 'x', 'y', 'z'))  # 0x2A69
+PROTOCOL.register('client', 27762, 'client_weapon_reload')  # 0x726C
+PROTOCOL.register('client', 28778, 'client_jump', Fixed('?', 'ready'))  # 0x6A70
+PROTOCOL.register('client', 29286, 'client_shooting', Fixed('?', 'value'))  # 0x6672
+PROTOCOL.register('client', 30317, 'client_position', Fixed(*POSITION))  # 0x6D76
+
+# Server
+PROTOCOL.register('server', 11051, 'server_health', Fixed('Ii', 'idx', 'health'))  # 0x2b2b
+PROTOCOL.register('server', 24940, 'server_gun_shoot', String('weapon'), Fixed('I', 'bullets'))  # 0x6c61
+PROTOCOL.register('server', 24941, 'server_magic_shoot', Fixed('I', 'counter'))  # 0x6d61
+PROTOCOL.register('server', 27501, 'server_init',  # 0x6d6b
+                  Fixed('I4sb', 'idx', 'unknown_1', 'boolean'), String('name'),
+                  Fixed('fff4s2sI', 'x', 'y', 'z', 'd', 'unknown_2', 'type_object'))
+PROTOCOL.register('server', 27762, 'server_weapon_reload',  # 0x726C
+                  String('weapon'), String('ammo'), Fixed('I', 'bullets'))
+PROTOCOL.register('server', 28771, 'server_item_recollection', String('name'), Fixed('I', 'amount'))  # 0x6370
+PROTOCOL.register('server', 28784, 'server_constant_information', Fixed('32s', 'data'))  # 0x7070
+PROTOCOL.register('server', 29300, 'server_character_events',  # 0x7472
+                  Fixed('I', 'idx'), String('name'), Fixed('4s', 'data'))
+PROTOCOL.register('server', 29552, 'server_character_position',  # 0x7073
+                  Fixed('I', 'idx'), Fixed(*POSITION), Fixed('I', 'idx_2'))
+PROTOCOL.register('server', 29811, 'server_character_action',  # 0x7374
+                  Fixed('I', 'idx'), String('action'), OptionalBool('status'))
+PROTOCOL.register('server', 30317, 'server_my_position',  # 0x6d76
+                  Fixed('I', 'idx'), Fixed(*POSITION), Fixed('I', 'idx_2'),
+                  Fixed('fff4shbb', 'x_2', 'y_2', 'z_2', 'view_2', 'view_limit_2', 'dy_2', 'dx_2'), Fixed('I', 'idx_3'))
+PROTOCOL.register('server', 30840, 'server_monsters_list', Fixed('I', 'idx'))  # 0x7878
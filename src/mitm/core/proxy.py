@@ -4,74 +4,192 @@
 Create a Proxy which intercept the network sockets with specific IP's and Port's. This proxy working for client and the
 server. Also it is running in threads to improve the performance and catch all the requests and responses.
 
+All the ports of the topology are listened by one thread with a selector. The threads of a port are created when a
+client connects to it, so the idle ports do not hold any thread. The connection to the server is taken from the pool
+of the upstream when it is warm.
+
+The sessions are identified by the port and the address of the client, so many clients could connect to the same port.
+A session is forgotten when both of its directions are finished, that is when its sockets are closed.
+
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from logging import basicConfig, DEBUG
-from threading import Thread
+from logging import debug
+from selectors import DefaultSelector, EVENT_READ
+from socket import socket, AF_INET, IPPROTO_TCP, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR, TCP_NODELAY
+from threading import Lock, Thread
+from typing import Optional
 
 from core.client_to_server import ClientToServer
+from core.lifecycle import JOIN_TIMEOUT
+from core.metrics import METRICS
+from core.queue import Queue, session_key
 from core.server_to_client import ServerToClient
+from core.topology import Route, Topology
+from core.upstream import Upstream
+from core.world import WORLDS
 
 
 class Proxy(Thread):
     """
-    Start the communication between both, the client and server.
+    Start the communication between both, the client and server, for all the ports of the topology.
     """
 
-    def __init__(self, from_host: str, to_host: str, port: int) -> None:
+    def __init__(self, topology: Topology, upstream: Optional[Upstream] = None) -> None:
         """
         Constructor which init the class.
 
-        :type from_host: str
-        :param from_host: The IP which is received by the client. Zeros means any IP (0.0.0.0)
-
-        :type to_host: str
-        :param to_host: The IP which is send to the Server.
+        :type topology: Topology
+        :param topology: The ports and the addresses of each one.
 
-        :type port: int
-        :param port: The number of the port for the communication.
+        :type upstream: Upstream
+        :param upstream: The connector of the servers, without pool by default.
 
         :rtype: Proxy
         :return: The object instanced of this class.
         """
         super(Proxy, self).__init__()
-        self.name = f'Proxy [{port}]'
-        self.from_host = from_host
-        self.to_host = to_host
-        self.port = port
-        self.running = False
+        self.name = 'Proxy'
+        self.daemon = True
+        self.topology = topology
+        self.upstream = upstream if upstream is not None else Upstream(topology)
+        self.sessions = {}
+        self.lock = Lock()
         self._running = True
-        basicConfig(filename='./debug.log', filemode='w', level=DEBUG, format='%(message)s')
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if there is at least one connection established.
+
+        :rtype: bool
+        :return: True if some port has a session.
+        """
+        return len(self.sessions) > 0
+
+    def terminate(self) -> None:
+        """
+        Stop listening, the established connections are stopped too before the thread ends.
+
+        :rtype: None
+        """
+        self._running = False
 
     def run(self) -> None:
         """
-        Start the execution of the proxy.
+        Listen in all the ports and start the connections.
         Run in a new thread.
 
         :rtype: None
         """
-        connection_thread = []
+        selector = DefaultSelector()
+        for route in self.topology:
+            try:
+                sock = socket(AF_INET, SOCK_STREAM)
+                sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+                sock.bind((route.listen, route.port))
+                sock.listen()
+                sock.setblocking(False)
+            except OSError as e:
+                print(f'ERROR: Proxy [{route.port}]: {e}')
+                continue
+            selector.register(sock, EVENT_READ, route)
+        print(f'Proxy: Listening {len(selector.get_map())} ports')
+
         while self._running:
-            print(f'Proxy [{self.port}]: Setting up')
-            client_to_server = ClientToServer(self.from_host, self.port)
-            server_to_client = ServerToClient(self.to_host, self.port)
-
-            print(f'Proxy [{self.port}]: Connection established')
-            client_to_server.server = server_to_client.server
-            server_to_client.client = client_to_server.client
-            self.running = True
-
-            if connection_thread:
-                client_thread, server_thread = connection_thread.pop(0)
-                client_thread.terminate()
-                server_thread.terminate()
-
-            client_to_server.start()
-            server_to_client.start()
-            connection_thread.append((client_to_server, server_to_client))
-
-        if connection_thread:
-            client_thread, server_thread = connection_thread.pop(0)
-            client_thread.terminate()
-            server_thread.terminate()
+            for key, _ in selector.select(timeout=0.5):
+                try:
+                    client, address = key.fileobj.accept()
+                except BlockingIOError:
+                    continue
+                client.setblocking(True)
+                client.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+                # The server is connected in its own thread, so a slow server does not stop the other ports.
+                Thread(target=self._connect, args=(key.data, client, session_key(key.data.port, address)),
+                       name=f'Connect [{key.data.port}]', daemon=True).start()
+            self._reap()
+
+        for key in list(selector.get_map().values()):
+            selector.unregister(key.fileobj)
+            key.fileobj.close()
+        selector.close()
+        with self.lock:
+            sessions = list(self.sessions.items())
+            self.sessions.clear()
+        for key, session in sessions:
+            self._terminate(session)
+            Queue.remove(key)
+            WORLDS.remove(key)
+
+    def _reap(self) -> None:
+        """
+        Forget the sessions whose threads are finished, their sockets are already closed. Their channels and worlds are
+        dropped, so the packages queued for them are not sent to the next connection.
+
+        :rtype: None
+        """
+        with self.lock:
+            finished = [key for key, session in self.sessions.items() if not any(map(Thread.is_alive, session))]
+            for key in finished:
+                del self.sessions[key]
+        for key in finished:
+            Queue.remove(key)
+            WORLDS.remove(key)
+
+    def _connect(self, route: Route, client: socket, key: tuple) -> None:
+        """
+        Connect a new client with the server and start the threads of both directions.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :type client: socket
+        :param client: The connection accepted from the client.
+
+        :type key: tuple
+        :param key: The port, the host and the port of the client which identify the session.
+
+        :rtype: None
+        """
+        try:
+            server_to_client = ServerToClient(self.upstream.connect(route), route.port, key)
+        except OSError as e:
+            print(f'ERROR: Proxy [{route.port}]: {route.upstream} {e}')
+            client.close()
+            return
+
+        client_to_server = ClientToServer(client, route.port, key)
+        client_to_server.server = server_to_client.server
+        server_to_client.client = client_to_server.client
+        print(f'Proxy [{route.port}]: Connection established')
+        METRICS.connected(route.port)
+
+        client_to_server.start()
+        server_to_client.start()
+        with self.lock:
+            if self._running:
+                self.sessions[key] = (client_to_server, server_to_client)
+                return
+        # The proxy was stopped while the server was connected.
+        self._terminate((client_to_server, server_to_client))
+        Queue.remove(key)
+        WORLDS.remove(key)
+
+    @staticmethod
+    def _terminate(session: tuple) -> None:
+        """
+        Stop a session and wait for its threads, the threads which do not stop are reported.
+
+        :type session: tuple
+        :param session: The threads of both directions.
+
+        :rtype: None
+        """
+        for thread in session:
+            thread.terminate()
+        for thread in session:
+            thread.join(JOIN_TIMEOUT)
+            if thread.is_alive():
+                message = f'ERROR: Proxy: {thread.name} did not stop, it is leaked'
+                print(message)
+                debug(message)
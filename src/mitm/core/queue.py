@@ -1,14 +1,270 @@
 #!/usr/bin/env python3
 # -*- coding: UTF-8 -*-
 """
-Create a singleton class to keep the references of the Queue list of packages.
+Create a singleton class to keep the references of the queues of packages.
+
+There is one channel for each session and destination. A session is one connection of a client: it is identified by
+the port of the proxy and the host and the port of the client, so the clients connected to the same port do not receive
+the packages of each other. The channels are deques of packages and the time when they were queued: append and popleft
+are O(1) and atomic, so the producers (the parser, the console) and the consumer (the package of the connection) do not
+need a lock. The channels of a session are removed when it finishes.
 """
+from collections import deque
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+
+def session_key(port: int, address: Optional[tuple] = None) -> tuple:
+    """
+    Build the key of a session.
+
+    :type port: int
+    :param port: The number of the port of the proxy.
+
+    :type address: tuple
+    :param address: The address of the client, the host and the port. Without it (the replay, the benchmarks) there is
+        one session for each port.
+
+    :rtype: tuple
+    :return: The port, the host and the port of the client.
+    """
+    return (port, *address[:2]) if address else (port, '', 0)
+
+
+class Channel:
+    """
+    Queue of the packages for one destination of one connection with its metrics.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type name: str
+        :param name: Name of the channel to display it.
+
+        :rtype: Channel
+        :return: The object instanced of this class.
+        """
+        self.name = name
+        self.items = deque()
+        self.enqueued = 0
+        self.sent = 0
+        self.latency = 0.0
+        self.latency_max = 0.0
+        self.sends = 0
+        self.saved = 0
+        self.notify: Optional[Callable[[], None]] = None
+
+    def __len__(self) -> int:
+        """
+        Get the number of packages waiting in the channel.
+
+        :rtype: int
+        :return: The depth of the channel.
+        """
+        return len(self.items)
+
+    @property
+    def depth(self) -> int:
+        """
+        Get the number of packages waiting in the channel.
+
+        :rtype: int
+        :return: The depth of the channel.
+        """
+        return len(self.items)
+
+    @property
+    def latency_mean(self) -> float:
+        """
+        Get the mean of the seconds which the packages waited in the channel.
+
+        :rtype: float
+        :return: Seconds.
+        """
+        return self.latency / self.sent if self.sent else 0.0
+
+    def put(self, item: Any) -> None:
+        """
+        Add a package at the end of the channel and wake its writer, if it has one.
+
+        :type item: Any
+        :param item: The package.
+
+        :rtype: None
+        """
+        self.items.append((perf_counter(), item))
+        self.enqueued += 1
+        notify = self.notify
+        if notify is not None:
+            notify()
+
+    def get(self) -> Optional[Any]:
+        """
+        Take the first package of the channel.
+
+        :rtype: Any
+        :return: The package or None if the channel is empty.
+        """
+        try:
+            queued, item = self.items.popleft()
+        except IndexError:
+            return None
+        latency = perf_counter() - queued
+        self.sent += 1
+        self.latency += latency
+        self.latency_max = max(self.latency_max, latency)
+        return item
+
+    def drain(self) -> list:
+        """
+        Take all the packages of the channel.
+
+        :rtype: list
+        :return: The packages in order.
+        """
+        items = []
+        item = self.get()
+        while item is not None:
+            items.append(item)
+            item = self.get()
+        return items
+
+    def clear(self) -> None:
+        """
+        Discard the packages of the channel.
+
+        :rtype: None
+        """
+        self.items.clear()
 
 
 class Queue:
     """
-    Keep the Queue of the packages.
+    Keep the channels of the packages. The key of a channel is the session, see session_key, and the destination,
+    'server' or 'client'.
     """
-    SERVER_QUEUE = []
-    CLIENT_QUEUE = []
-    HACKS = []
+    CHANNELS = {}
+
+    @classmethod
+    def channel(cls, session: tuple, destination: str) -> Channel:
+        """
+        Get the channel of a session, it is created the first time.
+
+        :type session: tuple
+        :param session: The key of the session.
+
+        :type destination: str
+        :param destination: The destination of the packages, 'server' or 'client'.
+
+        :rtype: Channel
+        :return: The channel.
+        """
+        key = (session, destination)
+        channel = cls.CHANNELS.get(key)
+        if channel is None:
+            port, host, client = session
+            name = f'{destination}[{port} {host}:{client}]' if host else f'{destination}[{port}]'
+            channel = cls.CHANNELS.setdefault(key, Channel(name))
+        return channel
+
+    @classmethod
+    def send(cls, session: tuple, destination: str, package: bytes) -> None:
+        """
+        Queue a package for a destination of one session.
+
+        :type session: tuple
+        :param session: The key of the session.
+
+        :type destination: str
+        :param destination: The destination of the package, 'server' or 'client'.
+
+        :type package: bytes
+        :param package: Raw data.
+
+        :rtype: None
+        """
+        cls.channel(session, destination).put(package)
+
+    @classmethod
+    def broadcast(cls, destination: str, package: bytes, port: Optional[int] = None) -> int:
+        """
+        Queue a package for a destination of all the known sessions.
+
+        :type destination: str
+        :param destination: The destination of the package, 'server' or 'client'.
+
+        :type package: bytes
+        :param package: Raw data.
+
+        :type port: int
+        :param port: Only the sessions of this port, all by default.
+
+        :rtype: int
+        :return: The number of sessions where it was queued.
+        """
+        channels = [channel for (session, name), channel in list(cls.CHANNELS.items())
+                    if name == destination and port in (None, session[0])]
+        for channel in channels:
+            channel.put(package)
+        return len(channels)
+
+    @classmethod
+    def depth(cls, port: int, destination: str) -> int:
+        """
+        Get the number of packages waiting for a destination in all the sessions of a port.
+
+        :type port: int
+        :param port: The number of the port.
+
+        :type destination: str
+        :param destination: The destination of the packages, 'server' or 'client'.
+
+        :rtype: int
+        :return: The depth of the channels.
+        """
+        return sum(channel.depth for (session, name), channel in list(cls.CHANNELS.items())
+                   if name == destination and session[0] == port)
+
+    @classmethod
+    def remove(cls, session: tuple) -> None:
+        """
+        Remove the channels of a finished session, the packages which were not sent are discarded.
+
+        :type session: tuple
+        :param session: The key of the session.
+
+        :rtype: None
+        """
+        for destination in ('server', 'client'):
+            channel = cls.CHANNELS.pop((session, destination), None)
+            if channel is not None:
+                channel.notify = None
+                channel.clear()
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Discard the packages of all the channels.
+
+        :rtype: None
+        """
+        for channel in list(cls.CHANNELS.values()):
+            channel.clear()
+
+    @classmethod
+    def report(cls) -> str:
+        """
+        Build the table of the metrics of the channels.
+
+        :rtype: str
+        :return: The table.
+        """
+        lines = []
+        for channel in sorted(list(cls.CHANNELS.values()), key=lambda item: item.name):
+            lines.append(f'| {channel.name:>30} | Depth {channel.depth:>5} | Queued {channel.enqueued:>7} | '
+                         f'Sent {channel.sent:>7} | Latency mean {channel.latency_mean * 1000:>8.3f} ms | '
+                         f'max {channel.latency_max * 1000:>8.3f} ms | Sends {channel.sends:>8} | '
+                         f'Saved {channel.saved:>7} |')
+        return '\n'.join(lines)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Hot reload of the parser. The module is only reloaded when its file changes on disk, so the forwarding path does not
+pay for the import machinery on every package.
+"""
+from importlib import reload
+from os import stat
+from threading import Lock
+from time import monotonic
+from types import ModuleType
+
+import core.parser
+
+
+class Reloader:
+    """
+    Watch the modification time of a module and swap the class exported by it when the file changes.
+    """
+
+    def __init__(self, module: ModuleType, name: str, interval: float = 1.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type module: ModuleType
+        :param module: The module which is watched.
+
+        :type name: str
+        :param name: The name of the class exported by the module.
+
+        :type interval: float
+        :param interval: Minimum seconds between two checks of the file.
+
+        :rtype: None
+        """
+        self.module = module
+        self.name = name
+        self.interval = interval
+        self.enabled = True
+        self.reloads = 0
+        self._lock = Lock()
+        self._next_check = 0.0
+        self._mtime = self._get_mtime()
+        self._class = getattr(module, name)
+
+    def _get_mtime(self) -> float:
+        """
+        Get the modification time of the file of the module.
+
+        :rtype: float
+        :return: The modification time, zero if the file is not available.
+        """
+        try:
+            return stat(self.module.__file__).st_mtime
+        except OSError:
+            return 0.0
+
+    def get(self) -> type:
+        """
+        Get the current class. The file is checked at most once per interval and the module is reloaded only if the
+        file was modified.
+
+        :rtype: type
+        :return: The class exported by the module.
+        """
+        if not self.enabled:
+            return self._class
+
+        now = monotonic()
+        if now < self._next_check:
+            return self._class
+
+        with self._lock:
+            if now < self._next_check:
+                return self._class
+            self._next_check = now + self.interval
+
+            mtime = self._get_mtime()
+            if mtime == self._mtime:
+                return self._class
+            self._mtime = mtime
+
+            try:
+                module = reload(self.module)
+            except Exception as e:
+                print(f'ERROR: Reload {self.module.__name__} ---> {e}')
+                return self._class
+
+            self.module = module
+            self._class = getattr(module, self.name)
+            self.reloads += 1
+            print(f'--*-- Reloaded {self.module.__name__} ({self.reloads})')
+        return self._class
+
+
+PARSER = Reloader(core.parser, 'Parse')
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Replay a capture through the same inject and parse path of the proxy without the game.
+
+The fast mode feeds the records to Package.handle as fast as possible, without sockets and without pacing. The time
+accurate mode reproduces the original pacing of one port: a local fake server sends the data of the server through a
+real socket, the client data is sent to it at its original time.
+"""
+from collections import Counter
+from socket import socket, create_server, SHUT_WR
+from threading import Thread
+from time import perf_counter, sleep
+from typing import Callable, Optional
+
+from core.capture import CaptureReader
+from core.package import Package
+from core.protocol import PROTOCOL
+from core.statistics import SPAN, TrafficStatistics
+
+
+class Statistics:
+    """
+    Count the messages and the bytes for each direction and type of message. The messages are added to the traffic
+    statistics too, with the timestamp of their record.
+    """
+
+    def __init__(self, span: int = SPAN) -> None:
+        """
+        Constructor which init the class.
+
+        :type span: int
+        :param span: Seconds of the sliding window of the traffic statistics.
+
+        :rtype: Statistics
+        :return: The object instanced of this class.
+        """
+        self.packets = Counter()
+        self.bytes = Counter()
+        self.reads = 0
+        self.read_bytes = 0
+        self.sent_bytes = 0
+        self.traffic = TrafficStatistics(span)
+        self.timestamp: Optional[float] = None
+
+    def add(self, is_server: bool, messages: list) -> None:
+        """
+        Add the messages of one read.
+
+        :type is_server: bool
+        :param is_server: True if the data was sent by the server.
+
+        :type messages: list
+        :param messages: The ID and the size of each message.
+
+        :rtype: None
+        """
+        for packet_id, size in messages:
+            self.packets[(is_server, packet_id)] += 1
+            self.bytes[(is_server, packet_id)] += size
+        self.traffic.add(is_server, Counter(messages), self.timestamp)
+
+    def check(self) -> list:
+        """
+        Compare the counters of each direction and type of message with the traffic statistics, both are fed with the
+        same messages so they must be equal.
+
+        :rtype: list
+        :return: The description of each difference, empty if there is none.
+        """
+        errors = []
+        traffic = self.traffic.table
+        for key in sorted(set(self.packets) | set(traffic), key=lambda item: (item[0], item[1] is None, item[1])):
+            statistics = traffic.get(key)
+            expected = (self.packets[key], self.bytes[key])
+            found = (statistics.count, statistics.bytes) if statistics is not None else (0, 0)
+            if expected != found:
+                name = statistics.name if statistics is not None else str(key[1])
+                errors.append(f'{"server" if key[0] else "client"} {name}: {expected[0]} messages and {expected[1]} '
+                              f'bytes, the traffic statistics have {found[0]} messages and {found[1]} bytes')
+        return errors
+
+    def report(self, elapsed: float) -> str:
+        """
+        Build the table of the rates.
+
+        :type elapsed: float
+        :param elapsed: Seconds of the replay.
+
+        :rtype: str
+        :return: The table.
+        """
+        elapsed = max(elapsed, 1e-9)
+        lines = [f'Reads: {self.reads} | Bytes read: {self.read_bytes} | Bytes sent: {self.sent_bytes} | '
+                 f'Time: {elapsed:.3f} s | {self.reads / elapsed:,.0f} reads/s | '
+                 f'{self.read_bytes / elapsed / 1e6:,.2f} MB/s']
+        for (is_server, packet_id), packets in self.packets.most_common():
+            size = self.bytes[(is_server, packet_id)]
+            direction = 'server' if is_server else 'client'
+            messages = PROTOCOL.server if is_server else PROTOCOL.client
+            name = messages[packet_id].name if packet_id in messages else 'unknown'
+            lines.append(f'| {direction:>6} | {name:>30} | {packets:>9} packets | {size:>11} bytes | '
+                         f'{packets / elapsed:>12,.0f} packets/s | {size / elapsed / 1e6:>9,.2f} MB/s |')
+        return '\n'.join(lines)
+
+
+class Sink:
+    """
+    Destination without a socket, it only counts the bytes.
+    """
+
+    def __init__(self, statistics: Statistics) -> None:
+        """
+        Constructor which init the class.
+
+        :type statistics: Statistics
+        :param statistics: Where the bytes are counted.
+
+        :rtype: Sink
+        :return: The object instanced of this class.
+        """
+        self.statistics = statistics
+
+    def sendall(self, data: bytes) -> None:
+        """
+        Count the data instead of sending it.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: None
+        """
+        self.statistics.sent_bytes += len(data)
+
+    def shutdown(self, how: int) -> None:
+        """
+        Nothing to shut down, there is no socket.
+
+        :type how: int
+        :param how: The directions of the socket.
+
+        :rtype: None
+        """
+
+
+class ReplayPackage(Package):
+    """
+    Package which adds the messages of each read to the statistics.
+    """
+
+    def __init__(self, is_server: bool, source: Optional[socket], destination, port: int,
+                 statistics: Statistics) -> None:
+        """
+        Constructor which init the class.
+
+        :type is_server: bool
+        :param is_server: True if the data was sent by the server.
+
+        :type source: socket
+        :param source: Object with the source connection, None in the fast mode.
+
+        :type destination: socket | Sink
+        :param destination: Object with the destination connection.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type statistics: Statistics
+        :param statistics: Where the messages are counted.
+
+        :rtype: ReplayPackage
+        :return: The object instanced of this class.
+        """
+        super(ReplayPackage, self).__init__(is_server, source, destination, port)
+        self.statistics = statistics
+
+    def handle(self, data: bytes) -> list:
+        """
+        Handle the data like the proxy and count it.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: list
+        :return: The buffers which must be sent to the destination, in order.
+        """
+        buffers = super(ReplayPackage, self).handle(data)
+        self.statistics.reads += 1
+        self.statistics.read_bytes += len(data)
+        self.statistics.add(self.is_server, self.messages)
+        return buffers
+
+
+class FakeServer(Thread):
+    """
+    Local server which sends the recorded data of the server with the original pacing.
+    """
+
+    def __init__(self, records: list, speed: float) -> None:
+        """
+        Constructor which init the class.
+
+        :type records: list
+        :param records: Time since the first record and raw data of the server.
+
+        :type speed: float
+        :param speed: Multiplier of the original pacing.
+
+        :rtype: FakeServer
+        :return: The object instanced of this class.
+        """
+        super(FakeServer, self).__init__()
+        self.name = 'Fake Server'
+        self.daemon = True
+        self.records = records
+        self.speed = speed
+        self.late = 0.0
+        self.listener = create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+
+    def run(self) -> None:
+        """
+        Accept the replay client and send the data.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        connection, _ = self.listener.accept()
+        self.listener.close()
+        drain = Thread(target=_drain, args=(connection,), name='Fake Server Drain', daemon=True)
+        drain.start()
+        self.late = _paced_send(self.records, self.speed, connection.sendall)
+        drain.join()
+        connection.shutdown(SHUT_WR)
+        connection.close()
+
+
+def _drain(connection: socket) -> None:
+    """
+    Read and discard the data sent by the client until it closes its side of the connection.
+
+    :type connection: socket
+    :param connection: The connection of the client.
+
+    :rtype: None
+    """
+    while connection.recv(65536):
+        pass
+
+
+def _paced_send(records: list, speed: float, send: Callable) -> float:
+    """
+    Send each record at its original time.
+
+    :type records: list
+    :param records: Time since the first record and raw data.
+
+    :type speed: float
+    :param speed: Multiplier of the original pacing.
+
+    :type send: Callable
+    :param send: Function which sends the data.
+
+    :rtype: float
+    :return: The maximum delay in seconds of a record from its original time.
+    """
+    late = 0.0
+    start = perf_counter()
+    for delay, data in records:
+        wait = start + delay / speed - perf_counter()
+        if wait > 0:
+            sleep(wait)
+        else:
+            late = max(late, -wait)
+        send(data)
+    return late
+
+
+class Replay:
+    """
+    Replay a capture.
+    """
+
+    def __init__(self, path: str, port: Optional[int] = None, span: int = SPAN) -> None:
+        """
+        Constructor which init the class.
+
+        :type path: str
+        :param path: The file of the capture.
+
+        :type port: int
+        :param port: Replay only this port, all by default.
+
+        :type span: int
+        :param span: Seconds of the sliding window of the traffic statistics.
+
+        :rtype: Replay
+        :return: The object instanced of this class.
+        """
+        self.path = path
+        self.port = port
+        self.statistics = Statistics(span)
+        self.late = (0.0, 0.0)
+
+    def run(self) -> float:
+        """
+        Feed all the records to the packages as fast as possible.
+
+        :rtype: float
+        :return: Seconds of the replay.
+        """
+        packages = {}
+        sink = Sink(self.statistics)
+        with CaptureReader(self.path) as reader:
+            start = perf_counter()
+            for record in reader:
+                if self.port is not None and record.port != self.port:
+                    continue
+                key = (record.port, record.is_server)
+                package = packages.get(key)
+                if package is None:
+                    package = ReplayPackage(record.is_server, None, sink, record.port, self.statistics)
+                    packages[key] = package
+                self.statistics.timestamp = record.timestamp
+                for buffer in package.coalesce(package.handle(bytes(record.data))):
+                    sink.sendall(buffer)
+            elapsed = perf_counter() - start
+        return elapsed
+
+    def run_realtime(self, speed: float = 1.0) -> float:
+        """
+        Replay one port with the original pacing against a local fake server. The maximum delays of the client and
+        the server from the original times are kept in the late attribute.
+
+        :type speed: float
+        :param speed: Multiplier of the original pacing.
+
+        :rtype: float
+        :return: Seconds of the replay.
+        """
+        client, server = self._load()
+        fake_server = FakeServer(server, speed)
+        fake_server.start()
+
+        connection = socket()
+        connection.connect(('127.0.0.1', fake_server.port))
+        server_to_client = ReplayPackage(True, connection, Sink(self.statistics), self.port, self.statistics)
+        client_to_server = ReplayPackage(False, None, connection, self.port, self.statistics)
+        reader = Thread(target=server_to_client.start, name='Replay Server -> Client', daemon=True)
+
+        def send(data: bytes) -> None:
+            for buffer in client_to_server.coalesce(client_to_server.handle(data)):
+                connection.sendall(buffer)
+
+        start = perf_counter()
+        reader.start()
+        late = _paced_send(client, speed, send)
+        connection.shutdown(SHUT_WR)
+        fake_server.join()
+        reader.join()
+        elapsed = perf_counter() - start
+        self.late = (late, fake_server.late)
+        return elapsed
+
+    def _load(self) -> tuple:
+        """
+        Load the records of the port with their time since the first record. Without port the busiest one is used.
+
+        :rtype: tuple
+        :return: The records of the client and the records of the server.
+        """
+        with CaptureReader(self.path) as reader:
+            if self.port is None:
+                ports = Counter(record.port for record in reader)
+                if not ports:
+                    return [], []
+                self.port = ports.most_common(1)[0][0]
+            client, server = [], []
+            first = None
+            for record in reader:
+                if record.port != self.port:
+                    continue
+                if first is None:
+                    first = record.timestamp
+                records = server if record.is_server else client
+                records.append((record.timestamp - first, bytes(record.data)))
+        return client, server
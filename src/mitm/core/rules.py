@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Rules which modify the data before it is sent to its destination. The rules are indexed by the destination and the
+packet ID at the start of the data, so each read is matched with one lookup in a dict, no matter how many rules there
+are.
+
+Each rule is one line, from the console or from a file (the lines starting with '#' are comments):
+    <destination> <packet> <action> [arguments] [xCOUNT]
+
+    destination: 'server' for the data sent by the client, 'client' for the data sent by the server.
+    packet:      the packet ID in hexadecimal like it comes in the network (0x6d76), in decimal, or the name of the
+                 message (client_position).
+    action:      rewrite OFFSET HEX  replace the bytes from the offset of the data, the packet ID is at the offset 0.
+                 prepend HEX         send the bytes before the data.
+                 drop                do not send the data.
+    xCOUNT:      the rule is removed after COUNT matches, without it the rule is kept.
+
+The rules of the same packet are applied in the order they were added. For example:
+    server 0x6d76 rewrite 2 34972ac7f26a5ac766bca143 x5
+    server 0x6d76 prepend 656501000000 x5
+"""
+from logging import debug
+from struct import unpack
+from threading import Lock
+from typing import Optional
+
+from core.protocol import PROTOCOL
+
+REWRITE = 'rewrite'
+PREPEND = 'prepend'
+DROP = 'drop'
+ACTIONS = (REWRITE, PREPEND, DROP)
+DESTINATIONS = ('server', 'client')
+
+
+class Rule:
+    """
+    One modification of the data of a packet.
+    """
+    __slots__ = ('idx', 'destination', 'opcode', 'action', 'offset', 'data', 'remaining', 'hits', 'name')
+
+    def __init__(self, destination: str, opcode: int, action: str, offset: int = 0, data: bytes = b'',
+                 count: Optional[int] = None, name: str = '') -> None:
+        """
+        Constructor which init the class.
+
+        :type destination: str
+        :param destination: The destination of the data, 'server' or 'client'.
+
+        :type opcode: int
+        :param opcode: The packet ID at the start of the data.
+
+        :type action: str
+        :param action: 'rewrite', 'prepend' or 'drop'.
+
+        :type offset: int
+        :param offset: First byte which is replaced by the rewrite.
+
+        :type data: bytes
+        :param data: The bytes which are written or prepended.
+
+        :type count: int
+        :param count: Number of matches before the rule is removed, None keeps it.
+
+        :type name: str
+        :param name: The hack which added the rule, or its line.
+
+        :rtype: Rule
+        :return: The object instanced of this class.
+        """
+        self.idx = 0
+        self.destination = destination
+        self.opcode = opcode
+        self.action = action
+        self.offset = offset
+        self.data = data
+        self.remaining = count
+        self.hits = 0
+        self.name = name
+
+    def __repr__(self) -> str:
+        """
+        Show the rule like its line.
+
+        :rtype: str
+        :return: The description of the rule.
+        """
+        opcode = self.opcode.to_bytes(2, 'little').hex()
+        arguments = {REWRITE: f' {self.offset} {self.data.hex()}', PREPEND: f' {self.data.hex()}'}.get(self.action, '')
+        count = f' x{self.remaining}' if self.remaining is not None else ''
+        return f'{self.destination} 0x{opcode} {self.action}{arguments}{count}'
+
+    def apply(self, data: bytes) -> bytes:
+        """
+        Modify the data.
+
+        :type data: bytes
+        :param data: Raw data which starts with the packet ID of the rule.
+
+        :rtype: bytes
+        :return: The modified data.
+        """
+        if self.action == PREPEND:
+            return self.data + data
+        if self.action == REWRITE:
+            end = self.offset + len(self.data)
+            if len(data) < end:
+                return data
+            return data[:self.offset] + self.data + data[end:]
+        return b''
+
+
+def parse_opcode(destination: str, term: str) -> int:
+    """
+    Read the packet ID of a rule.
+
+    :type destination: str
+    :param destination: The destination of the data, 'server' or 'client'.
+
+    :type term: str
+    :param term: The packet ID in network hexadecimal (0x6d76), in decimal or the name of the message.
+
+    :rtype: int
+    :return: The packet ID read as little endian.
+    """
+    if term.startswith('0x'):
+        opcode, = unpack('<H', bytes.fromhex(term[2:].zfill(4)))
+        return opcode
+    if term.isdigit():
+        return int(term)
+    messages = PROTOCOL.client if destination == 'server' else PROTOCOL.server
+    for opcode, message in messages.items():
+        if message.name == term:
+            return opcode
+    raise ValueError(f'Unknown message for the {destination}: {term}')
+
+
+def parse_rule(line: str, name: str = '') -> Rule:
+    """
+    Read a rule of one line.
+
+    :type line: str
+    :param line: The rule, like 'server 0x6d76 prepend 656501000000 x5'.
+
+    :type name: str
+    :param name: The hack which adds the rule, the line by default.
+
+    :rtype: Rule
+    :return: The rule.
+    """
+    terms = line.split()
+    count = None
+    if terms and terms[-1][0] == 'x' and terms[-1][1:].isdigit():
+        count = int(terms.pop()[1:])
+    if len(terms) < 3 or terms[0] not in DESTINATIONS or terms[2] not in ACTIONS:
+        raise ValueError(f'Invalid rule, it must be <{"|".join(DESTINATIONS)}> <packet> <{"|".join(ACTIONS)}> '
+                         f'[arguments] [xCOUNT]: {line}')
+    destination, opcode, action, arguments = terms[0], parse_opcode(terms[0], terms[1]), terms[2], terms[3:]
+    if action == REWRITE and len(arguments) == 2:
+        return Rule(destination, opcode, action, int(arguments[0]), bytes.fromhex(arguments[1]), count, name or line)
+    if action == PREPEND and len(arguments) == 1:
+        return Rule(destination, opcode, action, 0, bytes.fromhex(arguments[0]), count, name or line)
+    if action == DROP and not arguments:
+        return Rule(destination, opcode, action, count=count, name=name or line)
+    raise ValueError(f'Invalid arguments of {action}: {line}')
+
+
+class Rules:
+    """
+    The rules indexed by the destination and the packet ID. The lists of rules are replaced instead of modified, so
+    the connections read them without the lock.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Rules
+        :return: The object instanced of this class.
+        """
+        self.table = {}
+        self.matches = 0
+        self._idx = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        """
+        Get the number of rules.
+
+        :rtype: int
+        :return: The number of rules.
+        """
+        return sum(len(rules) for rules in self.table.values())
+
+    def add(self, rule: Rule) -> Rule:
+        """
+        Add a rule after the rules of the same packet.
+
+        :type rule: Rule
+        :param rule: The rule.
+
+        :rtype: Rule
+        :return: The rule with its ID.
+        """
+        with self._lock:
+            self._idx += 1
+            rule.idx = self._idx
+            key = (rule.destination, rule.opcode)
+            self.table[key] = (*self.table.get(key, ()), rule)
+        return rule
+
+    def remove(self, idx: int) -> Optional[Rule]:
+        """
+        Remove a rule.
+
+        :type idx: int
+        :param idx: ID of the rule.
+
+        :rtype: Rule
+        :return: The removed rule, or None if it does not exist.
+        """
+        with self._lock:
+            for key, rules in self.table.items():
+                for rule in rules:
+                    if rule.idx == idx:
+                        self._discard(key, rule)
+                        return rule
+        return None
+
+    def _discard(self, key: tuple, rule: Rule) -> None:
+        """
+        Remove a rule of the table, the lock must be held.
+
+        :type key: tuple
+        :param key: The destination and the packet ID.
+
+        :type rule: Rule
+        :param rule: The rule.
+
+        :rtype: None
+        """
+        rules = tuple(item for item in self.table.get(key, ()) if item is not rule)
+        if rules:
+            self.table[key] = rules
+        else:
+            self.table.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all the rules.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.table = {}
+
+    def load(self, lines: list, name: str = '', count: Optional[int] = None) -> list:
+        """
+        Add the rules of some lines, the empty lines and the comments are skipped. All the lines are read before
+        any rule is added, so an invalid line does not add half of them.
+
+        :type lines: list
+        :param lines: The rules, one by line.
+
+        :type name: str
+        :param name: The hack which adds the rules.
+
+        :type count: int
+        :param count: Replace the count of all the rules.
+
+        :rtype: list
+        :return: The added rules.
+        """
+        rules = []
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                rule = parse_rule(line, name)
+                if count is not None:
+                    rule.remaining = count
+                rules.append(rule)
+        return [self.add(rule) for rule in rules]
+
+    def load_file(self, filename: str) -> list:
+        """
+        Add the rules of a file.
+
+        :type filename: str
+        :param filename: The file with one rule by line.
+
+        :rtype: list
+        :return: The added rules.
+        """
+        with open(filename) as file:
+            return self.load(file.readlines())
+
+    def apply(self, destination: str, data: bytes) -> bytes:
+        """
+        Apply the rules of the packet at the start of the data.
+
+        :type destination: str
+        :param destination: The destination of the data, 'server' or 'client'.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: bytes
+        :return: The modified data.
+        """
+        if not self.table or len(data) < 2:
+            return data
+        rules = self.table.get((destination, data[0] | data[1] << 8))
+        if rules is None:
+            return data
+
+        for rule in rules:
+            with self._lock:
+                finished = False
+                if rule.remaining is not None:
+                    if rule.remaining < 1:
+                        continue
+                    rule.remaining -= 1
+                    finished = rule.remaining == 0
+                    if finished:
+                        self._discard((destination, rule.opcode), rule)
+                rule.hits += 1
+                self.matches += 1
+            data = rule.apply(data)
+            debug(f'*** Injection: [{rule.idx}] {rule.name}')
+            if finished:
+                message = f'*** Injection: Finished [{rule.idx}] {rule.name}'
+                print(message)
+                debug(message)
+            if not data:
+                break
+        return data
+
+    def report(self) -> str:
+        """
+        Build the list of the rules.
+
+        :rtype: str
+        :return: The list.
+        """
+        rules = sorted((rule for rules in self.table.values() for rule in rules), key=lambda item: item.idx)
+        lines = [f'| {rule.idx:>4} | {rule.hits:>6} hits | {rule!r}' for rule in rules]
+        return '\n'.join([*lines, f'Rules: {len(rules)} | Matches {self.matches}'])
+
+
+RULES = Rules()
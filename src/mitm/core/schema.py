@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Registry of the messages of the protocol. Each message declares its fields once and a decoder function is generated
+and compiled for it when the message is registered, so the parser does not read the fields by hand.
+
+A decoder receives the data (bytes or memoryview), the offset after the packet ID and the size of the data. It returns
+the tuple of the values and the offset after the message, or raises Incomplete if the message does not fit in the data.
+"""
+from re import Pattern, compile as compile_pattern, escape
+from struct import Struct
+from typing import Callable, Optional
+
+from core.framing import Incomplete
+
+USHORT = Struct('<H')
+UBYTE = Struct('<B')
+BOOL = Struct('<?')
+
+
+class Fixed:
+    """
+    Values with a fixed size, they are read with a struct. Consecutive fixed fields are merged in one struct.
+    """
+
+    def __init__(self, fmt: str, *names: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type fmt: str
+        :param fmt: Format of the struct without the byte order, it is always little endian.
+
+        :type names: str
+        :param names: One name for each value of the format.
+
+        :rtype: Fixed
+        :return: The object instanced of this class.
+        """
+        self.fmt = fmt
+        self.names = names
+        structure = Struct(f'<{fmt}')
+        if len(structure.unpack(bytes(structure.size))) != len(names):
+            raise ValueError(f'The format {fmt} does not match the names {names}')
+
+
+class String:
+    """
+    UTF-8 text prefixed by its length as unsigned short.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type name: str
+        :param name: Name of the value.
+
+        :rtype: String
+        :return: The object instanced of this class.
+        """
+        self.names = (name,)
+
+
+class Blob:
+    """
+    Raw bytes prefixed by their length as unsigned byte.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type name: str
+        :param name: Name of the value.
+
+        :rtype: Blob
+        :return: The object instanced of this class.
+        """
+        self.names = (name,)
+
+
+class OptionalBool:
+    """
+    Boolean at the end of the message, it is only present if the next byte is zero or one. Otherwise the value is None.
+    When the message ends with the data the decoder waits for the next byte, so a status split by TCP is not lost.
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type name: str
+        :param name: Name of the value.
+
+        :rtype: OptionalBool
+        :return: The object instanced of this class.
+        """
+        self.names = (name,)
+
+
+class Message:
+    """
+    Declaration of one message and its compiled decoder.
+    """
+
+    def __init__(self, opcode: int, name: str, fields: tuple) -> None:
+        """
+        Constructor which init the class.
+
+        :type opcode: int
+        :param opcode: The unique ID of the package, read as little endian unsigned short.
+
+        :type name: str
+        :param name: Name of the message, the method of the parser which receives the values is '_' + name.
+
+        :type fields: tuple
+        :param fields: The fields in the order of the data.
+
+        :rtype: Message
+        :return: The object instanced of this class.
+        """
+        self.opcode = opcode
+        self.name = name
+        self.handler = f'_{name}'
+        self.fields = fields
+        self.names = tuple(name for field in fields for name in field.names)
+        self.source = ''
+        self.decode = self._compile()
+        self.record: Optional[Struct] = None
+        if all(isinstance(field, Fixed) for field in fields):
+            self.record = Struct('<H' + ''.join(field.fmt for field in fields))
+
+    def _compile(self) -> Callable:
+        """
+        Generate the source code of the decoder and compile it.
+
+        :rtype: Callable
+        :return: The decoder.
+        """
+        namespace = {'Incomplete': Incomplete, 'USHORT': USHORT, 'UBYTE': UBYTE}
+        lines = [f'def decode_{self.name}(data, offset, size):']
+        values = []
+
+        def check(size: str) -> None:
+            lines.append(f'    end = offset + {size}')
+            lines.append(f'    if end > size:')
+            lines.append(f'        raise Incomplete()')
+
+        fields = list(self.fields)
+        while fields:
+            field = fields.pop(0)
+            if isinstance(field, Fixed):
+                fmt = field.fmt
+                names = list(field.names)
+                while fields and isinstance(fields[0], Fixed):
+                    fmt += fields[0].fmt
+                    names += fields.pop(0).names
+                structure = Struct(f'<{fmt}')
+                struct_name = f'S{len(namespace)}'
+                namespace[struct_name] = structure
+                variables = [f'f_{name}' for name in names]
+                check(str(structure.size))
+                lines.append(f'    {", ".join(variables)}, = {struct_name}.unpack_from(data, offset)')
+                lines.append(f'    offset = end')
+                values += variables
+            elif isinstance(field, (String, Blob)):
+                variable = f'f_{field.names[0]}'
+                length = 'USHORT' if isinstance(field, String) else 'UBYTE'
+                check(str(namespace[length].size))
+                lines.append(f'    length, = {length}.unpack_from(data, offset)')
+                lines.append(f'    offset = end')
+                check('length')
+                if isinstance(field, String):
+                    lines.append(f'    {variable} = str(data[offset:end], "UTF-8")')
+                else:
+                    lines.append(f'    {variable} = bytes(data[offset:end])')
+                lines.append(f'    offset = end')
+                values.append(variable)
+            elif isinstance(field, OptionalBool):
+                variable = f'f_{field.names[0]}'
+                lines.append(f'    {variable} = None')
+                # The next byte could be the status which comes in the next read.
+                lines.append(f'    if offset == size:')
+                lines.append(f'        raise Incomplete()')
+                lines.append(f'    if data[offset] < 2:')
+                lines.append(f'        {variable} = data[offset] == 1')
+                lines.append(f'        offset += 1')
+                values.append(variable)
+            else:
+                raise TypeError(f'Unknown field {field!r} in {self.name}')
+
+        lines.append(f'    return ({"".join(f"{value}, " for value in values)}), offset')
+        self.source = '\n'.join(lines) + '\n'
+        exec(compile(self.source, f'<schema {self.name}>', 'exec'), namespace)
+        return namespace[f'decode_{self.name}']
+
+    def encode(self, *values) -> bytes:
+        """
+        Build the raw data of the message, the packet ID included. It is the inverse of the decoder.
+
+        :type values: Any
+        :param values: One value for each name of the message.
+
+        :rtype: bytes
+        :return: Raw data.
+        """
+        if len(values) != len(self.names):
+            raise ValueError(f'{self.name} needs {len(self.names)} values: {self.names}')
+        data = bytearray(USHORT.pack(self.opcode))
+        values = list(values)
+        for field in self.fields:
+            if isinstance(field, Fixed):
+                data += Struct(f'<{field.fmt}').pack(*values[:len(field.names)])
+                del values[:len(field.names)]
+                continue
+            value = values.pop(0)
+            if isinstance(field, String):
+                value = value.encode('UTF-8')
+                data += USHORT.pack(len(value)) + value
+            elif isinstance(field, Blob):
+                data += UBYTE.pack(len(value)) + value
+            elif value is not None:
+                data += BOOL.pack(value)
+        return bytes(data)
+
+
+class Schema:
+    """
+    Registry of the messages for each direction.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Schema
+        :return: The object instanced of this class.
+        """
+        self.client = {}
+        self.server = {}
+
+    def register(self, directions: str, opcode: int, name: str, *fields) -> Message:
+        """
+        Declare a message and compile its decoder.
+
+        :type directions: str
+        :param directions: Who sends the message: 'client', 'server' or 'both'.
+
+        :type opcode: int
+        :param opcode: The unique ID of the package.
+
+        :type name: str
+        :param name: Name of the message, the method of the parser which receives the values is '_' + name.
+
+        :type fields: Fixed | String | Blob | OptionalBool
+        :param fields: The fields in the order of the data.
+
+        :rtype: Message
+        :return: The declared message.
+        """
+        message = Message(opcode, name, fields)
+        if directions in ('client', 'both'):
+            self.client[opcode] = message
+        if directions in ('server', 'both'):
+            self.server[opcode] = message
+        return message
+
+    @staticmethod
+    def table(messages: dict, parser: type) -> dict:
+        """
+        Build the dispatch table of one direction.
+
+        :type messages: dict
+        :param messages: The messages of the direction by opcode.
+
+        :type parser: type
+        :param parser: The class which has the handlers.
+
+        :rtype: dict
+        :return: The decoder, the handler and the name of each opcode. The handler is None if the parser only shows
+                 the message.
+        """
+        return {opcode: (message.decode, getattr(parser, message.handler, None), message.name)
+                for opcode, message in messages.items()}
+
+    @staticmethod
+    def batches(messages: dict, parser: type) -> dict:
+        """
+        Build the table of the messages of one direction which are decoded in runs. The message must have a fixed size
+        and the parser a handler '_' + name + '_batch'.
+
+        :type messages: dict
+        :param messages: The messages of the direction by opcode.
+
+        :type parser: type
+        :param parser: The class which has the handlers.
+
+        :rtype: dict
+        :return: The message and the batch handler of each opcode.
+        """
+        return {opcode: (message, getattr(parser, f'{message.handler}_batch')) for opcode, message in messages.items()
+                if message.record is not None and hasattr(parser, f'{message.handler}_batch')}
+
+    @staticmethod
+    def resync(messages: dict) -> Pattern:
+        """
+        Build the pattern which finds the next known packet ID of one direction in a single scan of the data.
+
+        :type messages: dict
+        :param messages: The messages of the direction by opcode.
+
+        :rtype: Pattern
+        :return: The compiled pattern of the known packet IDs as they come in the network.
+        """
+        return compile_pattern(b'|'.join(escape(USHORT.pack(opcode)) for opcode in sorted(messages)))
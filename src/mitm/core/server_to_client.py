@@ -6,9 +6,11 @@ Manage the connection from the Server to the Client.
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from socket import socket, AF_INET, SOCK_STREAM
+from socket import socket
 from threading import Thread
+from typing import Optional
 
+from core.lifecycle import shutdown
 from core.package import Package
 
 
@@ -17,16 +19,19 @@ class ServerToClient(Thread):
     Get, analyze and modify the data from server and send to the client.
     """
 
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, server: socket, port: int, session: Optional[tuple] = None) -> None:
         """
         Constructor which init the class.
 
-        :type host: str
-        :param host: The server's IP.
+        :type server: socket
+        :param server: The connection with the server.
 
         :type port: int
         :param port: The number of the port for the communication.
 
+        :type session: tuple
+        :param session: The key of the session of the connection, the port, the host and the port of the client.
+
         :rtype: ServerToClient
         :return: The object instanced of this class.
         """
@@ -35,17 +40,20 @@ class ServerToClient(Thread):
         self._running = True
         self.client = None
         self.port = port
-        self.server = socket(AF_INET, SOCK_STREAM)
-        self.server.connect((host, port))
+        self.session = session
+        self.server = server
         self.package = None
 
     def terminate(self) -> None:
         """
-        Stop the execution of the current thread proxy.
+        Stop the execution of the current thread proxy. The server is shut down, so the thread stops even if its
+        package was not created yet.
 
         :rtype: None
         """
-        self.package.terminate()
+        if self.package is not None:
+            self.package.terminate()
+        shutdown(self.server)
 
     def run(self) -> None:
         """
@@ -54,5 +62,5 @@ class ServerToClient(Thread):
 
         :rtype: None
         """
-        self.package = Package(True, self.server, self.client, self.port)
+        self.package = Package(True, self.server, self.client, self.port, self.session)
         self.package.start()
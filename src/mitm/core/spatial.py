@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Spatial index of the entities with a uniform grid over the axis X and Y. Each position update moves the entity between
+cells in O(1), and the radius and nearest queries only visit the cells around the point. The distances use the three
+axes.
+"""
+from math import floor, sqrt
+from typing import Callable, Optional
+
+
+class Grid:
+    """
+    Uniform grid of square cells with the IDs of the entities which are inside.
+    """
+
+    def __init__(self, cell: float = 1000.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type cell: float
+        :param cell: Size of the side of each cell, in units of the game.
+
+        :rtype: Grid
+        :return: The object instanced of this class.
+        """
+        self.cell = cell
+        self.cells = {}
+        self.points = {}
+        self._bounds = None
+
+    def __len__(self) -> int:
+        """
+        Get the number of entities.
+
+        :rtype: int
+        :return: The number of entities.
+        """
+        return len(self.points)
+
+    def _key(self, x: float, y: float) -> tuple:
+        """
+        Get the cell of a position.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :rtype: tuple
+        :return: The column and the row of the cell.
+        """
+        return floor(x / self.cell), floor(y / self.cell)
+
+    def update(self, idx: int, x: float, y: float, z: float) -> None:
+        """
+        Add an entity or move it to its new position.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: None
+        """
+        key = self._key(x, y)
+        point = self.points.get(idx)
+        if point is None or point[3] != key:
+            if point is not None:
+                self._discard(idx, point[3])
+            self.cells.setdefault(key, set()).add(idx)
+            column, row = key
+            if self._bounds is None:
+                self._bounds = [column, row, column, row]
+            else:
+                bounds = self._bounds
+                bounds[0] = min(bounds[0], column)
+                bounds[1] = min(bounds[1], row)
+                bounds[2] = max(bounds[2], column)
+                bounds[3] = max(bounds[3], row)
+        self.points[idx] = (x, y, z, key)
+
+    def remove(self, idx: int) -> None:
+        """
+        Remove an entity.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :rtype: None
+        """
+        point = self.points.pop(idx, None)
+        if point is not None:
+            self._discard(idx, point[3])
+
+    def _discard(self, idx: int, key: tuple) -> None:
+        """
+        Remove an entity from a cell, the empty cells are removed.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :type key: tuple
+        :param key: The column and the row of the cell.
+
+        :rtype: None
+        """
+        cell = self.cells.get(key)
+        if cell is not None:
+            cell.discard(idx)
+            if not cell:
+                del self.cells[key]
+
+    def clear(self) -> None:
+        """
+        Remove all the entities.
+
+        :rtype: None
+        """
+        self.cells.clear()
+        self.points.clear()
+        self._bounds = None
+
+    def _ring(self, column: int, row: int, distance: int) -> tuple:
+        """
+        Get the occupied cells at a distance of cells from a cell. When the ring has more cells than the grid, the
+        occupied cells at that distance or farther are returned, so the caller does not need more rings.
+
+        :type column: int
+        :param column: Column of the center.
+
+        :type row: int
+        :param row: Row of the center.
+
+        :type distance: int
+        :param distance: Number of cells from the center.
+
+        :rtype: list
+        :return: The sets of IDs of the cells and True if they include all the farther cells.
+        """
+        cells = self.cells
+        if distance == 0:
+            cell = cells.get((column, row))
+            return [cell] if cell else [], False
+        if 8 * distance > len(cells):
+            return [cell for (x, y), cell in cells.items() if max(abs(x - column), abs(y - row)) >= distance], True
+        found = []
+        for x in range(column - distance, column + distance + 1):
+            for y in (row - distance, row + distance):
+                cell = cells.get((x, y))
+                if cell:
+                    found.append(cell)
+        for y in range(row - distance + 1, row + distance):
+            for x in (column - distance, column + distance):
+                cell = cells.get((x, y))
+                if cell:
+                    found.append(cell)
+        return found, False
+
+    def radius(self, x: float, y: float, z: float, radius: float,
+               accept: Optional[Callable[[int], bool]] = None) -> list:
+        """
+        Find the entities inside a sphere.
+
+        :type x: float
+        :param x: Center in the axis X.
+
+        :type y: float
+        :param y: Center in the axis Y.
+
+        :type z: float
+        :param z: Center in the axis Z.
+
+        :type radius: float
+        :param radius: Radius of the sphere.
+
+        :type accept: Callable
+        :param accept: Filter of the IDs, all the entities by default.
+
+        :rtype: list
+        :return: The distance and the ID of each entity, nearest first.
+        """
+        points = self.points
+        limit = radius * radius
+        first_column, first_row = self._key(x - radius, y - radius)
+        last_column, last_row = self._key(x + radius, y + radius)
+        if (last_column - first_column + 1) * (last_row - first_row + 1) > len(self.cells):
+            cells = [cell for (column, row), cell in self.cells.items()
+                     if first_column <= column <= last_column and first_row <= row <= last_row]
+        else:
+            cells = [self.cells[(column, row)] for column in range(first_column, last_column + 1)
+                     for row in range(first_row, last_row + 1) if (column, row) in self.cells]
+
+        found = []
+        for cell in cells:
+            for idx in cell:
+                px, py, pz, _ = points[idx]
+                distance = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                if distance <= limit and (accept is None or accept(idx)):
+                    found.append((distance, idx))
+        found.sort()
+        return [(sqrt(distance), idx) for distance, idx in found]
+
+    def nearest(self, x: float, y: float, z: float, k: int = 1,
+                accept: Optional[Callable[[int], bool]] = None) -> list:
+        """
+        Find the nearest entities. The rings of cells around the point are visited until the next ring can not have a
+        nearer entity.
+
+        :type x: float
+        :param x: Center in the axis X.
+
+        :type y: float
+        :param y: Center in the axis Y.
+
+        :type z: float
+        :param z: Center in the axis Z.
+
+        :type k: int
+        :param k: Number of entities.
+
+        :type accept: Callable
+        :param accept: Filter of the IDs, all the entities by default.
+
+        :rtype: list
+        :return: The distance and the ID of each entity, nearest first.
+        """
+        if not self.points or k <= 0:
+            return []
+        points = self.points
+        column, row = self._key(x, y)
+        bounds = self._bounds
+        last = max(column - bounds[0], row - bounds[1], bounds[2] - column, bounds[3] - row)
+        found = []
+        distance = 0
+        while distance <= last:
+            cells, complete = self._ring(column, row, distance)
+            for cell in cells:
+                for idx in cell:
+                    if accept is not None and not accept(idx):
+                        continue
+                    px, py, pz, _ = points[idx]
+                    found.append(((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2, idx))
+            if complete:
+                break
+            if len(found) >= k:
+                found.sort()
+                del found[k:]
+                # Any entity out of the visited rings is farther than the edge of the last ring.
+                if found[-1][0] <= (distance * self.cell) ** 2:
+                    break
+            distance += 1
+        found.sort()
+        return [(sqrt(squared), idx) for squared, idx in found[:k]]
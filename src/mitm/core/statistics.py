@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Statistics of the traffic of each packet ID and direction: messages, bytes, a histogram of the sizes and the rates
+over a sliding window. The memory does not grow with the traffic: the histogram has one bucket by power of two and the
+window is a ring of one slot by second, so each packet ID keeps a fixed number of counters.
+
+The reads are added with their messages grouped by ID and size, which are few because the runs of the same message
+have the same size. The time of each read is the time of the system for the live traffic, or the timestamp of the
+record for a capture, so the windows of a capture show the rates of the original session.
+"""
+from threading import Lock
+from time import time
+from typing import Optional
+
+from core.protocol import PROTOCOL
+
+SPAN = 60
+SIZES = 25
+SHADES = ' .:-=+*#%@'
+
+
+class OpcodeStatistics:
+    """
+    Counters of one packet ID in one direction.
+    """
+    __slots__ = ('packet_id', 'is_server', 'count', 'bytes', 'sizes', 'span', 'seconds', 'counts', 'window_bytes')
+
+    def __init__(self, packet_id: Optional[int], is_server: bool, span: int = SPAN) -> None:
+        """
+        Constructor which init the class.
+
+        :type packet_id: int
+        :param packet_id: The packet ID, None for the unknown data.
+
+        :type is_server: bool
+        :param is_server: True for the messages sent by the server.
+
+        :type span: int
+        :param span: Seconds of the sliding window.
+
+        :rtype: OpcodeStatistics
+        :return: The object instanced of this class.
+        """
+        self.packet_id = packet_id
+        self.is_server = is_server
+        self.count = 0
+        self.bytes = 0
+        self.sizes = [0] * SIZES
+        self.span = span
+        self.seconds = [-1] * span
+        self.counts = [0] * span
+        self.window_bytes = [0] * span
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the message of the packet ID.
+
+        :rtype: str
+        :return: The name, or its ID in hexadecimal like it comes in the network if it is not in the protocol.
+        """
+        if self.packet_id is None:
+            return 'unknown'
+        message = (PROTOCOL.server if self.is_server else PROTOCOL.client).get(self.packet_id)
+        return message.name if message is not None else f'0x{self.packet_id.to_bytes(2, "little").hex()}'
+
+    def add(self, size: int, count: int, second: int) -> None:
+        """
+        Add some messages of the same size.
+
+        :type size: int
+        :param size: Bytes of each message.
+
+        :type count: int
+        :param count: Number of messages.
+
+        :type second: int
+        :param second: The second of the read.
+
+        :rtype: None
+        """
+        self.count += count
+        self.bytes += size * count
+        self.sizes[min(size.bit_length(), SIZES - 1)] += count
+        slot = second % self.span
+        if self.seconds[slot] != second:
+            self.seconds[slot] = second
+            self.counts[slot] = 0
+            self.window_bytes[slot] = 0
+        self.counts[slot] += count
+        self.window_bytes[slot] += size * count
+
+    def window(self, now: int, seconds: int) -> tuple:
+        """
+        Sum the messages and the bytes of the last seconds.
+
+        :type now: int
+        :param now: The current second.
+
+        :type seconds: int
+        :param seconds: Seconds of the window, up to the span.
+
+        :rtype: tuple
+        :return: The messages and the bytes.
+        """
+        start = now - min(seconds, self.span)
+        count = size = 0
+        for second, messages, data in zip(self.seconds, self.counts, self.window_bytes):
+            if start < second <= now:
+                count += messages
+                size += data
+        return count, size
+
+    def second(self, second: int) -> int:
+        """
+        Get the bytes of one second of the window.
+
+        :type second: int
+        :param second: The second.
+
+        :rtype: int
+        :return: The bytes, 0 if the second is out of the window.
+        """
+        slot = second % self.span
+        return self.window_bytes[slot] if self.seconds[slot] == second else 0
+
+    def quantile(self, ratio: float) -> int:
+        """
+        Estimate a quantile of the sizes with the upper bound of its power of two.
+
+        :type ratio: float
+        :param ratio: Quantile between 0 and 1.
+
+        :rtype: int
+        :return: The size in bytes.
+        """
+        rank = ratio * self.count
+        total = 0
+        for bits, count in enumerate(self.sizes):
+            total += count
+            if count and total >= rank:
+                return (1 << bits) - 1
+        return 0
+
+
+class TrafficStatistics:
+    """
+    The statistics of all the packet IDs of both directions.
+    """
+
+    def __init__(self, span: int = SPAN) -> None:
+        """
+        Constructor which init the class.
+
+        :type span: int
+        :param span: Seconds of the sliding window.
+
+        :rtype: TrafficStatistics
+        :return: The object instanced of this class.
+        """
+        self.span = span
+        self.table = {}
+        self.last = 0
+        self._lock = Lock()
+
+    def add(self, is_server: bool, sizes: dict, timestamp: Optional[float] = None) -> None:
+        """
+        Add the messages of one read.
+
+        :type is_server: bool
+        :param is_server: True for the messages sent by the server.
+
+        :type sizes: dict
+        :param sizes: The number of messages of each pair of ID and size, the ID is None for the unknown data.
+
+        :type timestamp: float
+        :param timestamp: Time of the read, now by default.
+
+        :rtype: None
+        """
+        second = int(time() if timestamp is None else timestamp)
+        with self._lock:
+            table = self.table
+            if second > self.last:
+                self.last = second
+            for (packet_id, size), count in sizes.items():
+                statistics = table.get((is_server, packet_id))
+                if statistics is None:
+                    statistics = table[(is_server, packet_id)] = OpcodeStatistics(packet_id, is_server, self.span)
+                statistics.add(size, count, second)
+
+    def clear(self) -> None:
+        """
+        Remove all the statistics.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.table = {}
+            self.last = 0
+
+    def top(self, count: int = 10, now: Optional[float] = None) -> list:
+        """
+        Get the packet IDs with more bytes in the window, or in total when the window is empty.
+
+        :type count: int
+        :param count: Number of packet IDs.
+
+        :type now: float
+        :param now: End of the window, the last read by default.
+
+        :rtype: list
+        :return: The statistics, the messages and the bytes in the window of each packet ID.
+        """
+        now = self.last if now is None else int(now)
+        rows = [(statistics, *statistics.window(now, self.span)) for statistics in list(self.table.values())]
+        if any(size for _, _, size in rows):
+            rows.sort(key=lambda row: row[2], reverse=True)
+        else:
+            rows.sort(key=lambda row: row[0].bytes, reverse=True)
+        return rows[:count]
+
+    def report(self, count: int = 10, now: Optional[float] = None) -> str:
+        """
+        Build the table of the packet IDs with more bytes.
+
+        :type count: int
+        :param count: Number of packet IDs.
+
+        :type now: float
+        :param now: End of the window, the last read by default.
+
+        :rtype: str
+        :return: The table.
+        """
+        table = list(self.table.values())
+        if not table:
+            return 'Statistics: no traffic'
+        lines = []
+        for is_server, direction in ((False, 'client'), (True, 'server')):
+            total = sum(statistics.bytes for statistics in table if statistics.is_server == is_server)
+            unknown = sum(statistics.bytes for statistics in table
+                          if statistics.is_server == is_server and statistics.packet_id is None)
+            lines.append(f'{direction}: {total} bytes | Unknown {unknown} bytes '
+                         f'({unknown / total if total else 0:.1%})')
+        everything = sum(statistics.bytes for statistics in table) or 1
+        lines.append(f'| {"source":>6} | {"message":>30} | {"messages":>9} | {"bytes":>11} | {"share":>6} | '
+                     f'{"avg size":>8} | {"p99 <=":>6} | {f"msg/s {self.span}s":>10} | {f"B/s {self.span}s":>10} |')
+        for statistics, messages, size in self.top(count, now):
+            direction = 'server' if statistics.is_server else 'client'
+            lines.append(f'| {direction:>6} | {statistics.name:>30} | {statistics.count:>9} | {statistics.bytes:>11} | '
+                         f'{statistics.bytes / everything:>6.1%} | {statistics.bytes / statistics.count:>8.1f} | '
+                         f'{statistics.quantile(0.99):>6} | {messages / self.span:>10,.1f} | '
+                         f'{size / self.span:>10,.0f} |')
+        return '\n'.join(lines)
+
+    def heatmap(self, count: int = 10, now: Optional[float] = None) -> str:
+        """
+        Build a map of the bytes of each second of the window for the packet IDs with more bytes. The darker the
+        cell, the more bytes in that second.
+
+        :type count: int
+        :param count: Number of packet IDs.
+
+        :type now: float
+        :param now: End of the window, the last read by default.
+
+        :rtype: str
+        :return: The map, one line by packet ID and the oldest second on the left.
+        """
+        now = self.last if now is None else int(now)
+        rows = [(statistics, [statistics.second(second) for second in range(now - self.span + 1, now + 1)])
+                for statistics, _, _ in self.top(count, now)]
+        if not rows:
+            return 'Statistics: no traffic'
+        peak = max(max(cells) for _, cells in rows) or 1
+        lines = [f'| {"source":>6} | {"message":>30} | -{self.span}s{" " * (self.span - len(str(self.span)) - 5)}now |']
+        for statistics, cells in rows:
+            direction = 'server' if statistics.is_server else 'client'
+            shades = ''.join(SHADES[-(-size * (len(SHADES) - 1) // peak)] for size in cells)
+            lines.append(f'| {direction:>6} | {statistics.name:>30} | {shades} |')
+        return '\n'.join(lines)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Topology of the proxy: which ports are listened, in which address, and the upstream host of each port. It is read from
+a JSON file and from the command line, a route of the command line replaces the route of the file with the same port.
+
+The JSON file has the default listen address and upstream host, and the routes with their ports. Each route could
+change the listen address or the upstream host of its ports:
+    {
+        "listen": "0.0.0.0",
+        "upstream": "192.168.100.230",
+        "routes": [
+            {"ports": "3333"},
+            {"ports": "3000-3005,3010", "upstream": "192.168.100.231"}
+        ]
+    }
+
+The ports are a number, a range 'first-last', or a list of them separated by commas.
+"""
+from json import load
+from typing import Iterator, NamedTuple, Optional
+
+LISTEN = '0.0.0.0'
+UPSTREAM = '192.168.100.230'
+PORTS = '3333,3000-3005'
+
+
+class Route(NamedTuple):
+    """
+    The addresses of one port.
+    """
+    port: int
+    listen: str
+    upstream: str
+
+
+def parse_ports(spec: str) -> list:
+    """
+    Read the ports of a specification like '3333,3000-3005'.
+
+    :type spec: str
+    :param spec: Numbers and ranges separated by commas, the ranges include the last port.
+
+    :rtype: list
+    :return: The numbers of the ports.
+    """
+    ports = []
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        first = int(first)
+        last = int(last) if last else first
+        if not 0 < first <= last < 65536:
+            raise ValueError(f'Invalid range of ports: {part}')
+        ports.extend(range(first, last + 1))
+    return ports
+
+
+class Topology:
+    """
+    The routes of the proxy by port.
+    """
+
+    def __init__(self, listen: str = LISTEN, upstream: str = UPSTREAM) -> None:
+        """
+        Constructor which init the class.
+
+        :type listen: str
+        :param listen: The default IP which is received by the client. Zeros means any IP (0.0.0.0)
+
+        :type upstream: str
+        :param upstream: The default IP of the server.
+
+        :rtype: Topology
+        :return: The object instanced of this class.
+        """
+        self.listen = listen
+        self.upstream = upstream
+        self.routes = {}
+
+    def __iter__(self) -> Iterator[Route]:
+        """
+        Iterate the routes by port.
+
+        :rtype: Iterator
+        :return: The routes.
+        """
+        return iter(sorted(self.routes.values()))
+
+    def __len__(self) -> int:
+        """
+        Get the number of ports.
+
+        :rtype: int
+        :return: The number of routes.
+        """
+        return len(self.routes)
+
+    def add(self, spec: str, upstream: Optional[str] = None, listen: Optional[str] = None) -> None:
+        """
+        Add the routes of some ports, they replace the routes with the same ports.
+
+        :type spec: str
+        :param spec: The ports, like '3333,3000-3005'.
+
+        :type upstream: str
+        :param upstream: IP of the server of these ports, the default upstream if it is missing.
+
+        :type listen: str
+        :param listen: IP which is listened in these ports, the default listen if it is missing.
+
+        :rtype: None
+        """
+        for port in parse_ports(spec):
+            self.routes[port] = Route(port, listen or self.listen, upstream or self.upstream)
+
+    def get(self, port: int) -> Optional[Route]:
+        """
+        Get the route of a port.
+
+        :type port: int
+        :param port: The number of the port.
+
+        :rtype: Route
+        :return: The route, or None if the port is not in the topology.
+        """
+        return self.routes.get(port)
+
+    @classmethod
+    def load(cls, filename: str, listen: Optional[str] = None, upstream: Optional[str] = None) -> 'Topology':
+        """
+        Read the topology of a JSON file.
+
+        :type filename: str
+        :param filename: The JSON file.
+
+        :type listen: str
+        :param listen: Replace the default listen address of the file.
+
+        :type upstream: str
+        :param upstream: Replace the default upstream host of the file.
+
+        :rtype: Topology
+        :return: The topology.
+        """
+        with open(filename) as file:
+            config = load(file)
+        topology = cls(listen or config.get('listen', LISTEN), upstream or config.get('upstream', UPSTREAM))
+        for route in config.get('routes', []):
+            topology.add(route['ports'], route.get('upstream'), route.get('listen'))
+        return topology
+
+    def report(self) -> str:
+        """
+        Build the list of the routes, the consecutive ports with the same addresses are joined.
+
+        :rtype: str
+        :return: The list.
+        """
+        lines = []
+        first = last = None
+        for route in self:
+            if last is not None and route.port == last.port + 1 and route[1:] == last[1:]:
+                last = route
+                continue
+            if first is not None:
+                lines.append((first, last))
+            first = last = route
+        if first is not None:
+            lines.append((first, last))
+        ports = (f'{first.port}-{last.port}' if first != last else f'{first.port}' for first, last in lines)
+        return '\n'.join(f'| {port:>11} | {first.listen:>15} -> {first.upstream:<15} |'
+                         for port, (first, _) in zip(ports, lines))
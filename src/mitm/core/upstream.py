@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Connect the proxy with the servers. The connections could be opened before the client arrives: a pool keeps some idle
+connections to each port of the topology, and a new client takes one of them instead of waiting for the handshake
+with the server, so the change of zone does not wait for an extra round trip.
+
+The idle connections are checked before they are handed off and by the pool thread: a connection closed by the server
+or older than the maximum age is replaced. All the connections to the servers have TCP_NODELAY, the small messages of
+the game are sent without waiting to join them.
+"""
+from collections import deque
+from socket import socket, create_connection, IPPROTO_TCP, TCP_NODELAY, MSG_PEEK
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Optional
+
+from core.topology import Route, Topology
+
+RETRY = 5.0
+
+
+def alive(sock: socket) -> bool:
+    """
+    Check without blocking that the server did not close an idle connection.
+
+    :type sock: socket
+    :param sock: The connection.
+
+    :rtype: bool
+    :return: True if the connection is open.
+    """
+    try:
+        sock.settimeout(0)
+        return sock.recv(1, MSG_PEEK) != b''
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        try:
+            sock.settimeout(None)
+        except OSError:
+            pass
+
+
+class Upstream(Thread):
+    """
+    Open the connections to the servers and keep a pool of idle connections of each port.
+    """
+
+    def __init__(self, topology: Topology, size: int = 0, max_age: float = 30.0, timeout: float = 5.0,
+                 interval: float = 1.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type topology: Topology
+        :param topology: The ports and the servers of each one.
+
+        :type size: int
+        :param size: Number of idle connections of each port, 0 connects when the client arrives.
+
+        :type max_age: float
+        :param max_age: Seconds before an idle connection is replaced, the servers could drop the idle connections.
+
+        :type timeout: float
+        :param timeout: Seconds to wait for the connection to a server.
+
+        :type interval: float
+        :param interval: Seconds between two checks of the pool.
+
+        :rtype: Upstream
+        :return: The object instanced of this class.
+        """
+        super(Upstream, self).__init__()
+        self.name = 'Upstream'
+        self.daemon = True
+        self.topology = topology
+        self.size = size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.interval = interval
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.failures = 0
+        self._pools = {}
+        self._retry = {}
+        self._lock = Lock()
+        self._wake = Event()
+        self._running = True
+
+    def _open(self, route: Route) -> socket:
+        """
+        Open a connection to the server of a route.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :rtype: socket
+        :return: The connection, blocking and with TCP_NODELAY.
+        """
+        sock = create_connection((route.upstream, route.port), self.timeout)
+        sock.settimeout(None)
+        sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        return sock
+
+    def take(self, route: Route) -> Optional[socket]:
+        """
+        Take an idle connection of the pool without blocking.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :rtype: socket
+        :return: A healthy connection, or None if the pool of the port is empty.
+        """
+        with self._lock:
+            pool = self._pools.get(route.port)
+            while pool:
+                created, sock = pool.popleft()
+                if monotonic() - created < self.max_age and alive(sock):
+                    self.hits += 1
+                    self._wake.set()
+                    return sock
+                self.stale += 1
+                sock.close()
+        return None
+
+    def connect(self, route: Route) -> socket:
+        """
+        Get a connection to the server of a route, from the pool or a new one.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :rtype: socket
+        :return: The connection, blocking and with TCP_NODELAY.
+        """
+        sock = self.take(route)
+        if sock is not None:
+            return sock
+        self.misses += 1
+        return self._open(route)
+
+    def terminate(self) -> None:
+        """
+        Stop the pool and close the idle connections.
+
+        :rtype: None
+        """
+        self._running = False
+        self._wake.set()
+
+    def run(self) -> None:
+        """
+        Fill the pools and replace the idle connections which are closed or too old.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while self._running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            for route in self.topology:
+                if not self._running:
+                    break
+                self._check(route)
+                self._fill(route)
+        self.clear()
+
+    def _check(self, route: Route) -> None:
+        """
+        Remove the idle connections of a port which are closed or too old.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :rtype: None
+        """
+        with self._lock:
+            pool = self._pools.get(route.port)
+            if not pool:
+                return
+            now = monotonic()
+            healthy = deque()
+            for created, sock in pool:
+                if now - created < self.max_age and alive(sock):
+                    healthy.append((created, sock))
+                else:
+                    self.stale += 1
+                    sock.close()
+            self._pools[route.port] = healthy
+
+    def _fill(self, route: Route) -> None:
+        """
+        Open the connections which are missing in the pool of a port. When a server does not answer, its port is not
+        tried again for RETRY seconds.
+
+        :type route: Route
+        :param route: The addresses of the port.
+
+        :rtype: None
+        """
+        if monotonic() < self._retry.get(route.port, 0):
+            return
+        while self._running and len(self._pools.get(route.port, ())) < self.size:
+            try:
+                sock = self._open(route)
+            except OSError:
+                self.failures += 1
+                self._retry[route.port] = monotonic() + RETRY
+                return
+            with self._lock:
+                self._pools.setdefault(route.port, deque()).append((monotonic(), sock))
+
+    def clear(self) -> None:
+        """
+        Close all the idle connections.
+
+        :rtype: None
+        """
+        with self._lock:
+            for pool in self._pools.values():
+                for _, sock in pool:
+                    sock.close()
+            self._pools.clear()
+
+    def report(self) -> str:
+        """
+        Build the state of the pool.
+
+        :rtype: str
+        :return: The state.
+        """
+        idle = sum(len(pool) for pool in self._pools.values())
+        return f'Upstream: Pool {self.size} by port | Idle {idle} | Hits {self.hits} | Misses {self.misses} | ' \
+               f'Stale {self.stale} | Failures {self.failures}'
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Parse the packages in worker processes, so the decode of many sessions is not limited by the GIL of the proxy.
+
+The data is not pickled: the socket threads copy each read in a free slot of a ring of shared memory and send only
+the slot and the size to the task queue of the worker of its connection. Each connection maps to one worker, which
+keeps its reassembler, so the messages of a connection are decoded in order. The connections are the sessions of the
+proxy, so the clients of the same port do not mix their streams, and the state of a connection is released when it
+finishes. The worker sends back the decoded events
+and the slot, and the collector thread of the main process frees the slot, runs the handlers of the events (the world
+and the injections) and displays them.
+
+When there are not enough free slots for the whole read it is not parsed and it is counted as dropped, the traffic is
+never delayed. The slots of a read are reserved at once, so a read is never parsed in part, and the reassembler of its
+connection is reset before the next read, so the messages after the gap are not joined with the data before it.
+
+The data with unknown patterns is not sent back either: the worker sends its size and the collector reads it from the
+slot before freeing it.
+"""
+from collections import Counter, deque
+from logging import debug
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from sys import exc_info
+from threading import Lock, Thread
+from time import perf_counter_ns
+from traceback import format_exception
+from typing import Optional
+
+from core.framing import Reassembler
+from core.metrics import METRICS
+from core.reloader import PARSER
+from core.statistics import TrafficStatistics
+
+
+def work(name: str, slot_size: int, tasks, results) -> None:
+    """
+    Decode the reads of the connections of one worker until it receives None.
+    Run in a worker process.
+
+    :type name: str
+    :param name: Name of the shared memory.
+
+    :type slot_size: int
+    :param slot_size: Size of each slot of the ring.
+
+    :type tasks: SimpleQueue
+    :param tasks: The session, the direction, the slot and the size of each read. A negative size resets the
+        connection.
+
+    :type results: SimpleQueue
+    :param results: The slot, the session, the direction, the events, the unknown flag, the size of the complete
+        messages at the start of the slot when they have unknown patterns (-1 if they start in a previous read), the
+        discarded bytes, the error, the nanoseconds of the parse, the number of messages by packet ID and the number of
+        messages by packet ID and size of each read.
+
+    :rtype: None
+    """
+    # The workers are spawned, they share the resource tracker of the main process which unlinks the memory.
+    memory = SharedMemory(name)
+    reassemblers = {}
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        session, is_server, slot, size = task
+        port = session[0]
+        if size < 0:
+            reassemblers.pop((session, is_server), None)
+            continue
+        reassembler = reassemblers.get((session, is_server))
+        if reassembler is None:
+            reassembler = reassemblers[(session, is_server)] = Reassembler()
+
+        start = slot * slot_size
+        view = memory.buf[start:start + size]
+        pending = reassembler.pending
+        data = reassembler.feed(view)
+        view.release()
+
+        events, unknown, length, discarded, error, packets, sizes = [], False, 0, 0, '', {}, {}
+        start = perf_counter_ns()
+        try:
+            parse = PARSER.get()(data)
+            parse.detached = True
+            if is_server:
+                parse.server(port, session)
+            else:
+                parse.client(port, session)
+            events, unknown, consumed = parse.events, parse.unknown, parse.consumed
+            packets = parse.packets
+            sizes = Counter(parse.messages)
+            if unknown:
+                length = consumed if not pending else -1
+            del parse
+            data.release()
+            discarded = reassembler.consume(consumed)
+        except Exception as e:
+            data.release()
+            reassembler.consume(reassembler.pending)
+            error_type, value, traceback = exc_info()
+            error = f'{e}\n{"".join(format_exception(error_type, value, traceback))}'
+        elapsed = perf_counter_ns() - start
+        results.put((slot, session, is_server, events, unknown, length, discarded, error, elapsed, packets, sizes))
+    memory.close()
+
+
+class Workers(Thread):
+    """
+    Pool of parser processes and the collector thread of their events.
+    """
+
+    def __init__(self, count: int = 2, slots: int = 1024, slot_size: int = 8192,
+                 traffic: Optional[TrafficStatistics] = None) -> None:
+        """
+        Constructor which init the class.
+
+        :type count: int
+        :param count: Number of worker processes.
+
+        :type slots: int
+        :param slots: Number of slots of the ring, the reads waiting to be parsed.
+
+        :type slot_size: int
+        :param slot_size: Size of each slot, a bigger read takes several slots.
+
+        :type traffic: TrafficStatistics
+        :param traffic: Where the messages of each packet ID are added, None does not add them.
+
+        :rtype: Workers
+        :return: The object instanced of this class.
+        """
+        super(Workers, self).__init__()
+        self.name = 'Parse Workers'
+        self.daemon = True
+        self.count = count
+        self.slots = slots
+        self.slot_size = slot_size
+        self.traffic = traffic
+        self.processed = 0
+        self.dropped = 0
+        self.memory = SharedMemory(create=True, size=slots * slot_size)
+        self._free = deque(range(slots))
+        self._lock = Lock()
+        self._gaps = set()
+        self._connections = {}
+        self._turns = 0
+
+        context = get_context('spawn')
+        self._results = context.SimpleQueue()
+        self._tasks = [context.SimpleQueue() for _ in range(count)]
+        self._processes = [context.Process(target=work, args=(self.memory.name, slot_size, tasks, self._results),
+                                           name=f'Parse Worker {idx}', daemon=True)
+                           for idx, tasks in enumerate(self._tasks)]
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of slots waiting to be parsed.
+
+        :rtype: int
+        :return: The used slots.
+        """
+        return self.slots - len(self._free)
+
+    def start(self) -> None:
+        """
+        Start the worker processes and the collector thread.
+
+        :rtype: None
+        """
+        for process in self._processes:
+            process.start()
+        super(Workers, self).start()
+
+    def _tasks_of(self, session: tuple, is_server: bool) -> object:
+        """
+        Get the task queue of the worker of a connection, the connections are assigned in turns.
+
+        :type session: tuple
+        :param session: The key of the session of the connection.
+
+        :type is_server: bool
+        :param is_server: True for the data of the server.
+
+        :rtype: SimpleQueue
+        :return: The task queue.
+        """
+        key = (session, is_server)
+        idx = self._connections.get(key)
+        if idx is None:
+            with self._lock:
+                idx = self._connections.get(key)
+                if idx is None:
+                    idx = self._connections[key] = self._turns % self.count
+                    self._turns += 1
+        return self._tasks[idx]
+
+    def reset(self, session: tuple, is_server: bool) -> None:
+        """
+        Discard the pending data of the stream of a connection, the next read does not complete it.
+
+        :type session: tuple
+        :param session: The key of the session of the connection.
+
+        :type is_server: bool
+        :param is_server: True for the data of the server.
+
+        :rtype: None
+        """
+        self._tasks_of(session, is_server).put((session, is_server, 0, -1))
+
+    def release(self, session: tuple, is_server: bool) -> None:
+        """
+        Forget a finished connection: its worker discards the reassembler after the pending reads, and the connection
+        is not assigned to the worker anymore.
+
+        :type session: tuple
+        :param session: The key of the session of the connection.
+
+        :type is_server: bool
+        :param is_server: True for the data of the server.
+
+        :rtype: None
+        """
+        self.reset(session, is_server)
+        with self._lock:
+            self._gaps.discard((session, is_server))
+            self._connections.pop((session, is_server), None)
+
+    def put(self, session: tuple, is_server: bool, data: bytes) -> None:
+        """
+        Copy a read in the ring and send it to the worker of its connection. All the slots of the read are reserved
+        before the copy, without enough free slots the whole read is dropped.
+
+        :type session: tuple
+        :param session: The key of the session of the connection, the hacks of its events are queued in it.
+
+        :type is_server: bool
+        :param is_server: True for the data of the server.
+
+        :type data: bytes
+        :param data: Raw data.
+
+        :rtype: None
+        """
+        tasks = self._tasks_of(session, is_server)
+        view = memoryview(data)
+        buffer = self.memory.buf
+        starts = range(0, len(view), self.slot_size)
+        with self._lock:
+            if len(self._free) < len(starts):
+                self.dropped += 1
+                self._gaps.add((session, is_server))
+                return
+            slots = [self._free.popleft() for _ in starts]
+            gap = (session, is_server) in self._gaps
+            self._gaps.discard((session, is_server))
+        if gap:
+            self.reset(session, is_server)
+        for start, slot in zip(starts, slots):
+            chunk = view[start:start + self.slot_size]
+            offset = slot * self.slot_size
+            buffer[offset:offset + len(chunk)] = chunk
+            tasks.put((session, is_server, slot, len(chunk)))
+
+    def run(self) -> None:
+        """
+        Free the slots and apply the events decoded by the workers.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while True:
+            result = self._results.get()
+            if result is None:
+                return
+            slot, session, is_server, events, unknown, length, discarded, error, elapsed, packets, sizes = result
+            raw = b''
+            if length > 0:
+                offset = slot * self.slot_size
+                raw = bytes(self.memory.buf[offset:offset + length])
+            self._free.append(slot)
+            self.processed += 1
+
+            port = session[0]
+            source = 'server' if is_server else 'client'
+            metrics = METRICS.connection(port, source)
+            metrics.parse.observe(elapsed)
+            metrics.packets.update(packets)
+            if self.traffic is not None and sizes:
+                self.traffic.add(is_server, sizes)
+            if error:
+                message = f'ERROR: {source}[{port}]: {error}'
+                print(message)
+                debug(message)
+            if discarded:
+                message = f'--*-- Discard {discarded} bytes from {source}[{port}]: incomplete message'
+                print(message)
+                debug(message)
+            if not events:
+                continue
+            try:
+                PARSER.get().restore(session, is_server, events, unknown, raw).apply()
+            except Exception as e:
+                error_type, value, traceback = exc_info()
+                print(f'ERROR: Parse Workers: {e}\n{"".join(format_exception(error_type, value, traceback))}')
+
+    def terminate(self) -> None:
+        """
+        Stop the workers and the collector, and release the shared memory.
+
+        :rtype: None
+        """
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(5)
+        self._results.put(None)
+        if self.is_alive():
+            self.join(5)
+        self.memory.close()
+        self.memory.unlink()
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Keep the state of the world which is decoded from the packages: the entities with their name, position, health and
+last action, and the drops which are not picked up yet. The parser updates it for each message, so the hacks and the
+console query the current state without reading the logs again.
+
+The positions are indexed in a uniform grid to find the entities near your character.
+
+A drop is picked up when the server confirms it with the item recollection, the pick up sent by the client or by the
+auto loot is only a request. The requests are confirmed in order, the server does not send the ID of the drop.
+
+There is one world for each session of the proxy, the clients of the same port play in different worlds. The worlds
+are kept in the module singleton WORLDS, so they are kept when the parser is reloaded, and the world of a session is
+removed when the session ends. The console queries the world of the last session.
+"""
+from threading import Lock
+from time import time
+from typing import Callable, Optional
+
+from core.spatial import Grid
+
+
+class Entity:
+    """
+    Compact record of one entity of the world.
+    """
+    __slots__ = ('idx', 'name', 'type_object', 'x', 'y', 'z', 'health', 'action', 'is_drop', 'requested', 'picked',
+                 'updated')
+
+    def __init__(self, idx: int) -> None:
+        """
+        Constructor which init the class.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :rtype: Entity
+        :return: The object instanced of this class.
+        """
+        self.idx = idx
+        self.name = ''
+        self.type_object = 0
+        self.x = 0.0
+        self.y = 0.0
+        self.z = 0.0
+        self.health: Optional[int] = None
+        self.action = ''
+        self.is_drop = False
+        self.requested = False
+        self.picked = False
+        self.updated = time()
+
+    def __repr__(self) -> str:
+        """
+        Display the entity.
+
+        :rtype: str
+        :return: The description of the entity.
+        """
+        return f'ID: {self.idx:<5} | {self.name or "?":>20} | {self.x:10.2f} X | {self.y:10.2f} Y | ' \
+               f'{self.z:10.2f} Z | Health: {self.health} | Action: {self.action or "-"} | Drop: {self.is_drop} | ' \
+               f'Requested: {self.requested} | Picked: {self.picked}'
+
+
+class World:
+    """
+    Table of the entities indexed by ID and by name.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: World
+        :return: The object instanced of this class.
+        """
+        self.entities = {}
+        self.names = {}
+        self.drops = set()
+        self.requests = []
+        self.me: Optional[int] = None
+        self.position = (0.0, 0.0, 0.0)
+        self.grid = Grid()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        """
+        Get the number of entities.
+
+        :rtype: int
+        :return: The number of entities.
+        """
+        return len(self.entities)
+
+    def _entity(self, idx: int) -> Entity:
+        """
+        Get an entity, it is created the first time. The lock must be acquired.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :rtype: Entity
+        :return: The entity.
+        """
+        entity = self.entities.get(idx)
+        if entity is None:
+            entity = Entity(idx)
+            self.entities[idx] = entity
+        return entity
+
+    def spawn(self, idx: int, name: str, x: float, y: float, z: float, type_object: int) -> Entity:
+        """
+        Add or update an entity with its initial information. The names with 'Drop' are drops.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :type name: str
+        :param name: Name of the entity.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :type type_object: int
+        :param type_object: Type of the entity.
+
+        :rtype: Entity
+        :return: The entity.
+        """
+        with self._lock:
+            entity = self._entity(idx)
+            if entity.name != name:
+                if entity.name:
+                    self.names.get(entity.name, set()).discard(idx)
+                self.names.setdefault(name, set()).add(idx)
+                entity.name = name
+            entity.type_object = type_object
+            entity.x, entity.y, entity.z = x, y, z
+            self.grid.update(idx, x, y, z)
+            entity.is_drop = 'Drop' in name
+            entity.requested = False
+            entity.picked = False
+            if idx in self.requests:
+                self.requests.remove(idx)
+            entity.updated = time()
+            if entity.is_drop:
+                self.drops.add(idx)
+            else:
+                self.drops.discard(idx)
+            return entity
+
+    def move(self, idx: int, x: float, y: float, z: float) -> None:
+        """
+        Update the position of an entity.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: None
+        """
+        with self._lock:
+            entity = self._entity(idx)
+            entity.x, entity.y, entity.z = x, y, z
+            entity.updated = time()
+            self.grid.update(idx, x, y, z)
+
+    def move_many(self, ids: list, xs: list, ys: list, zs: list) -> None:
+        """
+        Update the positions of many entities at once.
+
+        :type ids: list
+        :param ids: IDs of the entities.
+
+        :type xs: list
+        :param xs: Positions in the axis X.
+
+        :type ys: list
+        :param ys: Positions in the axis Y.
+
+        :type zs: list
+        :param zs: Positions in the axis Z.
+
+        :rtype: None
+        """
+        now = time()
+        with self._lock:
+            for idx, x, y, z in zip(ids, xs, ys, zs):
+                entity = self._entity(idx)
+                entity.x, entity.y, entity.z = x, y, z
+                entity.updated = now
+                self.grid.update(idx, x, y, z)
+
+    def locate(self, x: float, y: float, z: float, idx: Optional[int] = None) -> None:
+        """
+        Update the position of your character. The ID is known from the messages of the server.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :type idx: int
+        :param idx: ID of your character, if it is known.
+
+        :rtype: None
+        """
+        if idx is not None:
+            self.me = idx
+        self.position = (x, y, z)
+        if self.me is not None:
+            self.move(self.me, x, y, z)
+
+    def health(self, idx: int, health: int) -> None:
+        """
+        Update the health of an entity.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :type health: int
+        :param health: Health of the entity.
+
+        :rtype: None
+        """
+        with self._lock:
+            entity = self._entity(idx)
+            entity.health = health
+            entity.updated = time()
+
+    def action(self, idx: int, action: str) -> None:
+        """
+        Update the last action of an entity.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :type action: str
+        :param action: Name of the action.
+
+        :rtype: None
+        """
+        with self._lock:
+            entity = self._entity(idx)
+            entity.action = action
+            entity.updated = time()
+
+    def request(self, idx: int) -> None:
+        """
+        Mark a drop as requested to pick up, it is still pending until the server confirms it.
+
+        :type idx: int
+        :param idx: ID of the drop.
+
+        :rtype: None
+        """
+        with self._lock:
+            entity = self.entities.get(idx)
+            if entity is not None and entity.is_drop and not entity.picked and not entity.requested:
+                entity.requested = True
+                self.requests.append(idx)
+
+    def pick_up(self, name: str) -> Optional[Entity]:
+        """
+        Confirm the oldest request of a drop with the item recollected. A drop whose name contains the name of the
+        item is preferred.
+
+        :type name: str
+        :param name: Name of the item recollected.
+
+        :rtype: Entity
+        :return: The drop picked up or None if there is no request.
+        """
+        with self._lock:
+            if not self.requests:
+                return None
+            idx = next((idx for idx in self.requests if name and name in self.entities[idx].name), self.requests[0])
+            self.requests.remove(idx)
+            self.drops.discard(idx)
+            entity = self.entities[idx]
+            entity.requested = False
+            entity.picked = True
+            return entity
+
+    def get(self, idx: int) -> Optional[Entity]:
+        """
+        Find an entity by its ID.
+
+        :type idx: int
+        :param idx: ID of the entity.
+
+        :rtype: Entity
+        :return: The entity or None if it is unknown.
+        """
+        return self.entities.get(idx)
+
+    def find(self, name: str) -> list:
+        """
+        Find the entities by their name.
+
+        :type name: str
+        :param name: Name of the entity, it is not case sensitive if there is no exact match.
+
+        :rtype: list
+        :return: The entities.
+        """
+        with self._lock:
+            ids = self.names.get(name)
+            if not ids:
+                name = name.lower()
+                ids = [idx for key, values in self.names.items() if key.lower() == name for idx in values]
+            return [self.entities[idx] for idx in ids]
+
+    def pending_drops(self) -> list:
+        """
+        Get the drops which are not picked up yet.
+
+        :rtype: list
+        :return: The entities.
+        """
+        with self._lock:
+            return [self.entities[idx] for idx in self.drops]
+
+    def nearest(self, k: int = 1, drops: bool = False) -> list:
+        """
+        Find the entities nearest to your character.
+
+        :type k: int
+        :param k: Number of entities.
+
+        :type drops: bool
+        :param drops: Only the drops which are not picked up yet.
+
+        :rtype: list
+        :return: The distance and the entity, nearest first.
+        """
+        with self._lock:
+            found = self.grid.nearest(*self.position, k, self._accept(drops))
+            return [(distance, self.entities[idx]) for distance, idx in found]
+
+    def around(self, radius: float, drops: bool = False) -> list:
+        """
+        Find the entities inside a radius of your character.
+
+        :type radius: float
+        :param radius: Distance in units of the game.
+
+        :type drops: bool
+        :param drops: Only the drops which are not picked up yet.
+
+        :rtype: list
+        :return: The distance and the entity, nearest first.
+        """
+        with self._lock:
+            found = self.grid.radius(*self.position, radius, self._accept(drops))
+            return [(distance, self.entities[idx]) for distance, idx in found]
+
+    def _accept(self, drops: bool) -> Callable[[int], bool]:
+        """
+        Build the filter of the queries, your character is never included.
+
+        :type drops: bool
+        :param drops: Only the drops which are not picked up yet.
+
+        :rtype: Callable
+        :return: Function which accepts an ID.
+        """
+        me = self.me
+        if drops:
+            return lambda idx: idx in self.drops
+        return lambda idx: idx != me
+
+    def clear(self) -> None:
+        """
+        Forget all the entities.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.grid.clear()
+            self.entities.clear()
+            self.names.clear()
+            self.drops.clear()
+            self.requests.clear()
+            self.me = None
+            self.position = (0.0, 0.0, 0.0)
+
+
+class Worlds:
+    """
+    The world of each session, it is created with the first message of the session.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: Worlds
+        :return: The object instanced of this class.
+        """
+        self.worlds = {}
+        self.last: Optional[tuple] = None
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        """
+        Get the number of worlds.
+
+        :rtype: int
+        :return: The number of sessions with a world.
+        """
+        return len(self.worlds)
+
+    def get(self, session: tuple) -> World:
+        """
+        Get the world of a session, it is created the first time.
+
+        :type session: tuple
+        :param session: The key of the session, see core.queue.session_key.
+
+        :rtype: World
+        :return: The world.
+        """
+        world = self.worlds.get(session)
+        if world is None:
+            with self._lock:
+                world = self.worlds.get(session)
+                if world is None:
+                    world = self.worlds[session] = World()
+                    self.last = session
+        return world
+
+    def current(self) -> World:
+        """
+        Get the world of the last session, an empty world without sessions.
+
+        :rtype: World
+        :return: The world.
+        """
+        with self._lock:
+            return self.worlds[self.last] if self.last is not None else World()
+
+    def items(self) -> list:
+        """
+        Get the world of each session.
+
+        :rtype: list
+        :return: The session and its world, in the order they were created.
+        """
+        with self._lock:
+            return list(self.worlds.items())
+
+    def remove(self, session: tuple) -> None:
+        """
+        Forget the world of a finished session, its entities are not valid for the next one.
+
+        :type session: tuple
+        :param session: The key of the session.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.worlds.pop(session, None)
+            if self.last == session:
+                self.last = next(reversed(self.worlds), None)
+
+    def clear(self) -> None:
+        """
+        Forget all the worlds.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.worlds.clear()
+            self.last = None
+
+
+WORLDS = Worlds()
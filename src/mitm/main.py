@@ -4,12 +4,78 @@
 Entrypoint of the application. Main in the Middle Attack is basically a proxy which get and send the package between the
 client and server but we have the opportunity to analyze or modify this information.
 """
-from os import kill
-from signal import SIGTERM
+from argparse import ArgumentParser, Namespace
 from threading import enumerate as threading_enumerate
+from time import time
 
+from core.async_proxy import AsyncProxy
+from core.capture import Capture
+from core.events import VERBOSITY, find_names
+from core.hack import Hack
+from core.injector import Injector
+from core.lifecycle import Lifecycle
+from core.log import LOG
+from core.metrics import METRICS
+from core.package import Package
+from core.pipeline import Pipeline
 from core.proxy import Proxy
 from core.queue import Queue
+from core.reloader import PARSER
+from core.rules import RULES
+from core.statistics import SPAN, TrafficStatistics
+from core.topology import LISTEN, PORTS, UPSTREAM, Topology
+from core.upstream import Upstream
+from core.workers import Workers
+from core.world import WORLDS
+
+
+def get_arguments() -> Namespace:
+    """
+    Read the arguments of the command line.
+
+    :rtype: Namespace
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description='Man in the middle proxy for Pwn Adventure 3.')
+    parser.add_argument('--config', metavar='FILE',
+                        help='JSON file with the topology: ports, listen and upstream hosts.')
+    parser.add_argument('--listen', metavar='HOST', help='Default IP which is listened, 0.0.0.0 by default.')
+    parser.add_argument('--upstream', metavar='HOST', help='Default IP of the server, 192.168.100.230 by default.')
+    parser.add_argument('--ports', action='append', metavar='PORTS[=HOST]',
+                        help=f'Ports to proxy like 3000-3005,3333 with an optional upstream host, it could be '
+                             f'repeated. {PORTS} by default if there is no config.')
+    parser.add_argument('--warm', type=int, default=0, metavar='COUNT',
+                        help='Keep COUNT idle connections to the server of each port, so a new client does not wait '
+                             'for the connection. 0 connects when the client arrives.')
+    parser.add_argument('--engine', choices=('thread', 'asyncio'), default='thread',
+                        help='Proxy engine: one thread per port and direction, or one asyncio loop for all the ports.')
+    parser.add_argument('--pipeline', type=int, default=0, metavar='SIZE',
+                        help='Forward first and parse in a worker thread, keeping up to SIZE packages in its queue.')
+    parser.add_argument('--workers', type=int, default=0, metavar='COUNT',
+                        help='Parse in COUNT worker processes, the reads are passed through shared memory. It replaces '
+                             'the pipeline.')
+    parser.add_argument('--statistics', type=int, default=0, metavar='SECONDS',
+                        help='Count the messages and the bytes of each packet ID with rates over a window of SECONDS, '
+                             'see the top command. 0 disables them until top on, which uses the same window or '
+                             f'{SPAN} seconds.')
+    parser.add_argument('--capture', metavar='FILE',
+                        help='Record the raw traffic of all the connections in a binary capture.')
+    parser.add_argument('--coalesce', type=int, default=Package.coalesce_size, metavar='SIZE',
+                        help='Join the injected packages and the forwarded data in one send up to SIZE bytes, '
+                             '0 sends each one alone.')
+    parser.add_argument('--log', default='./debug.log', metavar='FILE', help='File of the debug log.')
+    parser.add_argument('--log-size', type=int, default=10, metavar='MB',
+                        help='Rotate the debug log when it reaches MB megabytes, 0 never rotates.')
+    parser.add_argument('--log-backups', type=int, default=5, metavar='COUNT', help='Number of rotated logs to keep.')
+    parser.add_argument('--log-compress', action='store_true', help='Compress the rotated logs with gzip.')
+    parser.add_argument('--log-json', action='store_true', help='Write the debug log as JSON lines.')
+    parser.add_argument('--rules', metavar='FILE', help='Load the injection rules of a file, see core/rules.py.')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Export the metrics of the connections when it quits, as JSON if FILE ends with .json, '
+                             'otherwise in the text format of Prometheus.')
+    parser.add_argument('--no-reload', action='store_true',
+                        help='Do not watch core/parser.py for changes, disable the hot reload.')
+    return parser.parse_args()
 
 
 def main() -> None:
@@ -18,50 +84,187 @@ def main() -> None:
 
     :rtype: None
     """
-    from_host = '0.0.0.0'
-    to_host = '192.168.100.230'
-    port_server = 3333
-    ports_client = range(3000, 3006)
+    arguments = get_arguments()
+    lifecycle = Lifecycle()
+    LOG.start(arguments.log, arguments.log_size * 1024 * 1024, arguments.log_backups, arguments.log_compress,
+              arguments.log_json)
+    lifecycle.add('Log', LOG.stop)
+    PARSER.enabled = not arguments.no_reload
+    Package.coalesce_size = arguments.coalesce
+    if arguments.capture:
+        Package.capture = Capture(arguments.capture)
+        lifecycle.add('Capture', Package.capture.close)
+    if arguments.metrics:
+        lifecycle.add('Metrics', lambda: METRICS.export(arguments.metrics))
+    if arguments.pipeline > 0:
+        Package.pipeline = Pipeline(arguments.pipeline)
+        Package.pipeline.start()
+        lifecycle.add('Pipeline', Package.pipeline.terminate, Package.pipeline)
+    if arguments.statistics > 0:
+        Package.traffic = TrafficStatistics(arguments.statistics)
+    if arguments.workers > 0:
+        Package.workers = Workers(arguments.workers, traffic=Package.traffic)
+        Package.workers.start()
+        lifecycle.add('Workers', Package.workers.terminate, Package.workers)
+    if arguments.rules:
+        RULES.load_file(arguments.rules)
 
-    server = Proxy(from_host, to_host, port_server)
-    server.start()
+    if arguments.config:
+        topology = Topology.load(arguments.config, arguments.listen, arguments.upstream)
+    else:
+        topology = Topology(arguments.listen or LISTEN, arguments.upstream or UPSTREAM)
+    for route in arguments.ports or ([] if arguments.config else [PORTS]):
+        ports, _, upstream = route.partition('=')
+        topology.add(ports, upstream)
 
-    clients = []
-    for port in ports_client:
-        client_server = Proxy(from_host, to_host, port)
-        client_server.start()
-        clients.append(client_server)
+    upstream = Upstream(topology, arguments.warm)
+    if arguments.warm > 0:
+        upstream.start()
+    lifecycle.add('Upstream', upstream.terminate, upstream)
+    if arguments.engine == 'asyncio':
+        proxy = AsyncProxy(topology, upstream)
+    else:
+        Package.injector = Injector()
+        Package.injector.start()
+        lifecycle.add('Injector', Package.injector.terminate, Package.injector)
+        proxy = Proxy(topology, upstream)
+    proxy.start()
+    lifecycle.add('Proxy', proxy.terminate, proxy)
+    lifecycle.handle_signals()
 
     while True:
         try:
-            cmd = input('>>> ').lower()
+            line = input('>>> ')
+            cmd = line.lower()
             if cmd == 'hello':
                 print('Hello World!')
             elif cmd in ('quit', 'q', 'exit'):
-                for thread in threading_enumerate():
-                    kill(thread.native_id, SIGTERM)
+                break
             elif cmd in ('t', 'thread', 'threads'):
                 for thread in threading_enumerate():
                     message = f'| {thread.name:>25} | PID {thread.native_id} | ID {thread.ident} | ' \
                               f'Alive {thread.is_alive()} | Daemon {thread.daemon} |'
                     print(message)
+                print(lifecycle.report())
+            elif cmd in ('ports', 'topology'):
+                print(topology.report())
+                sessions = ', '.join(f'{port} {host}:{client}' for port, host, client in sorted(proxy.sessions))
+                print(f'Sessions: {sessions or "none"}')
+                print(upstream.report())
+            elif cmd in ('r', 'reload', 'reloads'):
+                print(f'Parser reloads: {PARSER.reloads} | Enabled: {PARSER.enabled}')
+            elif cmd in ('p', 'pipeline'):
+                if Package.workers is not None:
+                    print(f'Workers: {Package.workers.count} | Slots {Package.workers.depth}/{Package.workers.slots} | '
+                          f'Processed {Package.workers.processed} | Dropped {Package.workers.dropped}')
+                elif Package.pipeline is None:
+                    print('Pipeline: disabled')
+                else:
+                    print(f'Pipeline: Depth {Package.pipeline.depth}/{Package.pipeline.size} | '
+                          f'Processed {Package.pipeline.processed} | Dropped {Package.pipeline.dropped}')
+            elif cmd in ('cap', 'capture'):
+                if Package.capture is None:
+                    print('Capture: disabled')
+                else:
+                    Package.capture.flush()
+                    print(f'Capture: {Package.capture.path} | Records {Package.capture.records} | '
+                          f'Bytes {Package.capture.size}')
+            elif cmd in ('l', 'log'):
+                print(LOG.report())
+            elif cmd in ('w', 'world'):
+                worlds = WORLDS.items()
+                if not worlds:
+                    print('World: no session')
+                for session, world in worlds:
+                    current = ' (current)' if session == WORLDS.last else ''
+                    print(f'World {session}{current}: Entities {len(world)} | Drops not picked up {len(world.drops)} | '
+                          f'Requested {len(world.requests)} | Me {world.me} | Position {world.position}')
+            elif cmd[0:2] == 'w ':
+                key = cmd[2:].strip()
+                world = WORLDS.current()
+                entities = [world.get(int(key))] if key.isdigit() else world.find(key)
+                for entity in entities:
+                    print(entity if entity is not None else f'World: Unknown entity {key}')
+            elif cmd == 'near' or cmd[0:5] == 'near ':
+                options = cmd[5:].split()
+                drops = 'drops' in options
+                numbers = [int(option) for option in options if option.isdigit()]
+                for distance, entity in WORLDS.current().nearest(numbers[0] if numbers else 5, drops):
+                    print(f'{distance:10.2f} | {entity}')
+            elif cmd in ('d', 'drops'):
+                for entity in WORLDS.current().pending_drops():
+                    print(entity)
+            elif cmd in ('v', 'verbosity'):
+                print(VERBOSITY.report())
+            elif cmd == 'v reset':
+                VERBOSITY.reset()
+            elif cmd[0:2] == 'v ':
+                term, level = cmd[2:].split()
+                names = find_names(term)
+                for name in names:
+                    VERBOSITY.set(name, level)
+                print(f'Verbosity {level}: {", ".join(names) if names else "no message found"}')
             elif cmd[0:4] == 'hck ':
                 options = cmd[4:].split(' ')
-                target = options[0]
+                target = Hack.find(options[0])
                 retries = 5
                 if len(options) > 1:
                     retries = int(options[1])
-                Queue.HACKS.append((target, retries))
-            elif cmd[0:2] == 's ':
-                for client_server in clients:
-                    if client_server.running:
-                        Queue.SERVER_QUEUE.append(bytearray.fromhex(cmd[2:]))
-            elif cmd[0:2] == 'c ':
-                for client_server in clients:
-                    if client_server.running:
-                        Queue.CLIENT_QUEUE.append(bytearray.fromhex(cmd[2:]))
+                if target:
+                    RULES.load(Hack.rules[target], target, retries)
+                else:
+                    print(f'Unknown hack {options[0]}: {", ".join(Hack.rules)}')
+            elif cmd == 'rules':
+                print(RULES.report())
+            elif cmd == 'rules clear':
+                RULES.clear()
+            elif cmd[0:11] == 'rules load ':
+                print(f'Rules: {len(RULES.load_file(line[11:].strip()))} loaded')
+            elif cmd[0:9] == 'rule del ':
+                rule = RULES.remove(int(cmd[9:]))
+                print(f'Rule removed: {rule!r}' if rule is not None else f'Unknown rule {cmd[9:]}')
+            elif cmd[0:5] == 'rule ':
+                rule, = RULES.load([cmd[5:]])
+                print(f'Rule [{rule.idx}]: {rule!r}')
+            elif cmd in ('queue', 'queues'):
+                print(Queue.report())
+                if Package.injector is not None:
+                    print(f'Injector: Flushes {Package.injector.flushes}')
+            elif cmd in ('m', 'metrics'):
+                print(METRICS.report())
+            elif cmd == 'm reset':
+                METRICS.reset()
+            elif cmd[0:9] == 'm export ':
+                filename = line[9:].strip()
+                METRICS.export(filename)
+                print(f'Metrics: exported to {filename}')
+            elif cmd[0:5] == 'prof ':
+                port, source = cmd[5:].split()
+                print(METRICS.profile(int(port), source))
+            elif cmd in ('top on', 'top off'):
+                Package.traffic = TrafficStatistics(arguments.statistics or SPAN) if cmd == 'top on' else None
+                if Package.workers is not None:
+                    Package.workers.traffic = Package.traffic
+                print(f'Statistics: {"enabled" if Package.traffic is not None else "disabled"}')
+            elif cmd == 'top reset' and Package.traffic is not None:
+                Package.traffic.clear()
+            elif cmd == 'top' or cmd[0:4] in ('top ', 'heat'):
+                if Package.traffic is None:
+                    print('Statistics: disabled, use --statistics SECONDS or top on')
+                else:
+                    _, _, count = cmd.partition(' ')
+                    report = Package.traffic.heatmap if cmd[0:4] == 'heat' else Package.traffic.report
+                    print(report(int(count or 10), time()))
+            elif cmd[0:2] in ('s ', 'c '):
+                destination = 'server' if cmd[0] == 's' else 'client'
+                port, _, data = cmd[2:].rpartition(':')
+                sessions = Queue.broadcast(destination, bytes.fromhex(data), int(port) if port else None)
+                print(f'Queued for the {destination} of {sessions} connections')
+        except (EOFError, KeyboardInterrupt):
+            break
         except Exception as e:
             print(f'ERROR: Input section ---> {e}')
+    print(lifecycle.stop())
 
 
 if __name__ == "__main__":
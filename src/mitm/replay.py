@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Replay a capture recorded with 'main.py --capture FILE' through the inject and parse path of the proxy, without the
+game client and without the server. It is useful to test the changes of the parser.
+"""
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from os import devnull
+from sys import exit
+
+from core.replay import Replay
+from core.statistics import SPAN
+
+
+def get_arguments() -> Namespace:
+    """
+    Read the arguments of the command line.
+
+    :rtype: Namespace
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description='Replay a capture through the parser of the proxy.')
+    parser.add_argument('capture', help='File of the capture.')
+    parser.add_argument('--port', type=int, help='Replay only this port.')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Reproduce the original pacing of one port against a local fake server.')
+    parser.add_argument('--speed', type=float, default=1.0, help='Multiplier of the original pacing.')
+    parser.add_argument('--quiet', action='store_true', help='Do not print the output of the parser.')
+    parser.add_argument('--top', type=int, default=0, metavar='COUNT',
+                        help='Print the COUNT packet IDs with more bytes, with their rates over the last window of the '
+                             'capture.')
+    parser.add_argument('--heatmap', action='store_true', help='Print the bytes of each second of the top packet IDs.')
+    parser.add_argument('--window', type=int, default=SPAN, metavar='SECONDS',
+                        help='Seconds of the window of --top and --heatmap.')
+    parser.add_argument('--check', action='store_true',
+                        help='Check that the traffic statistics count each message once, exit with 1 if they do not.')
+    return parser.parse_args()
+
+
+def run(replay: Replay, arguments: Namespace) -> float:
+    """
+    Run the replay in the selected mode.
+
+    :type replay: Replay
+    :param replay: The replay of the capture.
+
+    :type arguments: Namespace
+    :param arguments: The parsed arguments.
+
+    :rtype: float
+    :return: Seconds of the replay.
+    """
+    if arguments.realtime:
+        return replay.run_realtime(arguments.speed)
+    return replay.run()
+
+
+def main() -> None:
+    """
+    Replay the capture and print the statistics.
+
+    :rtype: None
+    """
+    arguments = get_arguments()
+    replay = Replay(arguments.capture, arguments.port, arguments.window)
+
+    if arguments.quiet:
+        with open(devnull, 'w') as null, redirect_stdout(null):
+            elapsed = run(replay, arguments)
+    else:
+        elapsed = run(replay, arguments)
+
+    if arguments.realtime:
+        print(f'Port: {replay.port} | Maximum delay: client {replay.late[0] * 1000:.2f} ms | '
+              f'server {replay.late[1] * 1000:.2f} ms')
+    print(replay.statistics.report(elapsed))
+    if arguments.top > 0:
+        print(replay.statistics.traffic.report(arguments.top))
+        if arguments.heatmap:
+            print(replay.statistics.traffic.heatmap(arguments.top))
+    if arguments.check:
+        errors = replay.statistics.check()
+        for error in errors:
+            print(f'ERROR: {error}')
+        print(f'Check: {len(errors)} errors')
+        if errors:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()